@@ -0,0 +1,94 @@
+'''generates synthetic METAFONT sources for the benchmarks
+
+The size of a source is set by the number of glyphs, the number of filled
+contours, pen strokes, cull commands and weighted contours per glyph and the
+number of kerning pairs in the ligtable. The same arguments always give the
+same source.
+'''
+import argparse
+from random import Random
+
+# default size of a generated source, see generate()
+DEFAULT_SIZE = {
+    'glyphs': 50,
+    'contours': 4,
+    'strokes': 4,
+    'culls': 1,
+    'weights': 1,
+    'ligtable': 50,
+}
+
+def generate(glyphs, contours, strokes, culls, weights, ligtable, seed=0):
+    '''return the code of a synthetic METAFONT source
+
+    The glyphs are 1000 pixels wide and high. Run mf2ff with ppi 72.27, so
+    the pixels are the units of the font.
+
+    Args:
+        glyphs (int): number of glyphs, codes above 255 use charext
+        contours (int): number of filled contours per glyph
+        strokes (int): number of paths drawn with a pen per glyph
+        culls (int): number of cull commands per glyph
+        weights (int): number of contours filled with weight 2 or -1 per glyph
+        ligtable (int): number of kerning pairs in the ligtable
+        seed (int, optional): seed of the random coordinates
+
+    Returns:
+        str: mf code
+    '''
+    random = Random(seed)
+    def point():
+        return '(' + str(random.randint(100, 900)) + ',' + str(random.randint(100, 900)) + ')'
+    def shape():
+        if random.random() < 0.5:
+            return 'fullcircle scaled ' + str(random.randint(50, 400)) + ' shifted ' + point()
+        # a counterclockwise triangle, METAFONT complains about other
+        # turning numbers
+        cross = 0
+        while cross == 0:
+            (x1, y1), (x2, y2), (x3, y3) = [(random.randint(100, 900), random.randint(100, 900)) for _ in range(3)]
+            cross = (x2 - x1)*(y3 - y1) - (y2 - y1)*(x3 - x1)
+        if cross < 0:
+            (x2, y2), (x3, y3) = (x3, y3), (x2, y2)
+        return '(%d,%d)--(%d,%d)--(%d,%d)--cycle' % (x1, y1, x2, y2, x3, y3)
+
+    lines = ['mode_setup;', '']
+    for k in range(glyphs):
+        lines.append('beginchar(' + str(k % 256) + ', 1000, 1000, 0);')
+        lines.append('  charext := ' + str(k // 256) + ';')
+        for _ in range(contours):
+            lines.append('  fill ' + shape() + ';')
+        for i in range(strokes):
+            pen = ('pencircle', 'pensquare', 'pencircle xscaled 2 rotated 30')[i % 3]
+            lines.append('  pickup ' + pen + ' scaled ' + str(random.randint(10, 60)) + ';')
+            lines.append('  draw ' + point() + '..' + point() + '..' + point() + ';')
+        for i in range(weights):
+            lines.append('  fill ' + shape() + ' withweight ' + ('2' if i % 2 == 0 else '-1') + ';')
+        for i in range(culls):
+            if i % 2 == 0:
+                lines.append('  cull currentpicture keeping (1,infinity);')
+            else:
+                lines.append('  cull currentpicture dropping (-infinity,0);')
+        lines.append('endchar;')
+        lines.append('')
+
+    codes = max(1, min(glyphs, 256))
+    for _ in range(ligtable):
+        lines.append(
+            'ligtable ' + str(random.randrange(codes)) + ': '
+            + str(random.randrange(codes)) + ' kern ' + str(random.randint(-50, 50)) + ';'
+        )
+    lines.append('end')
+    return '\n'.join(lines) + '\n'
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('output', help='path of the generated .mf file')
+    for name, value in DEFAULT_SIZE.items():
+        parser.add_argument('--' + name, type=int, default=value, help='default: ' + str(value))
+    parser.add_argument('--seed', type=int, default=0, help='default: 0')
+    args = parser.parse_args()
+
+    size = {name: getattr(args, name) for name in DEFAULT_SIZE}
+    with open(args.output, 'w') as f:
+        f.write(generate(seed=args.seed, **size))
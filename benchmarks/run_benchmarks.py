@@ -0,0 +1,162 @@
+'''runs mf2ff on synthetic METAFONT sources and compares the times with a
+baseline
+
+The default source and every benchmark are generated by generate_corpus.py.
+Every benchmark changes one size of the default source to one of the values
+in AXES. mf2ff runs with option profile, so the wall time of every phase of
+Mf2ff.run() is measured. A phase is a regression if it takes more than
+--tolerance longer than in the baseline and at least --min-delta seconds
+more. METAFONT (mf) needs to be installed, nothing is downloaded.
+'''
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+from mf2ff import Mf2ff
+
+from generate_corpus import DEFAULT_SIZE, generate
+
+# values of the sizes used by the benchmarks, each benchmark changes one size
+# of DEFAULT_SIZE
+AXES = {
+    'glyphs': (25, 100, 400),
+    'contours': (1, 8, 32),
+    'strokes': (0, 8, 32),
+    'culls': (0, 2, 8),
+    'weights': (0, 4, 16),
+    'ligtable': (0, 500, 2000),
+}
+
+def get_benchmarks(axes):
+    '''return the sizes of the benchmarks
+
+    Args:
+        axes (list[str]): names of the sizes which are changed
+
+    Returns:
+        dict[str, dict]: size of every benchmark by its name
+    '''
+    benchmarks = {'default': dict(DEFAULT_SIZE)}
+    for axis in axes:
+        for value in AXES[axis]:
+            size = dict(DEFAULT_SIZE)
+            size[axis] = value
+            benchmarks[axis + '-' + str(value)] = size
+    return benchmarks
+
+def run_benchmark(name, size, output_dir, options):
+    '''generates the source of a benchmark and runs mf2ff on it
+
+    Args:
+        name (str): name of the benchmark, used as jobname
+        size (dict): arguments of generate_corpus.generate()
+        output_dir (Path): directory of the source and the generated files
+        options (dict): options of mf2ff
+
+    Returns:
+        dict[str, float]: wall time of the whole run (total) and of every
+            phase in seconds
+    '''
+    input_file = output_dir / (name + '.mf')
+    with open(input_file, 'w') as f:
+        f.write(generate(**size))
+
+    mf2ff = Mf2ff()
+    mf2ff.ppi = 72.27 # coordinates in mf are the same in font
+    mf2ff.input_file = str(input_file)
+    jobname = output_dir / name
+    mf2ff.jobname = str(jobname)
+    mf2ff.mf_options.append('-jobname=' + str(jobname))
+    mf2ff.options.update(options)
+    mf2ff.options['profile'] = True
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        mf2ff.run()
+
+    with open(str(jobname) + '.profile.json', 'r') as f:
+        profile = json.load(f)
+    times = {'total': profile['total']['wall']}
+    for phase, data in profile['phases'].items():
+        times[phase] = data['wall']
+    return times
+
+def find_regressions(results, baseline, tolerance, min_delta):
+    '''return the phases which take longer than in the baseline
+
+    Args:
+        results (dict): times of the benchmarks from run_benchmark()
+        baseline (dict): times of the benchmarks in the baseline
+        tolerance (float): allowed relative increase of a time
+        min_delta (float): min. increase of a regression in seconds
+
+    Returns:
+        list[tuple]: benchmark, phase, time in the baseline and time
+    '''
+    regressions = []
+    for name, times in results.items():
+        for phase, time in times.items():
+            baseline_time = baseline.get(name, {}).get(phase)
+            if baseline_time is None:
+                continue
+            if time > baseline_time*(1 + tolerance) and time - baseline_time >= min_delta:
+                regressions.append((name, phase, baseline_time, time))
+    return regressions
+
+if __name__ == '__main__':
+    benchmarks_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', 1)[0].replace('\n', ' '))
+    parser.add_argument('--axes', nargs='+', choices=list(AXES), default=list(AXES),
+        help='sizes which are changed (default: all)')
+    parser.add_argument('--repeat', type=int, default=3,
+        help='number of runs of every benchmark, the fastest time of every phase is used (default: 3)')
+    parser.add_argument('--jobs', type=int, default=1, help='option jobs of mf2ff (default: 1)')
+    parser.add_argument('--output-dir', type=Path, default=benchmarks_dir / 'output',
+        help='directory of the sources, the generated files and the results (default: benchmarks/output)')
+    parser.add_argument('--baseline', type=Path, default=benchmarks_dir / 'baseline.json',
+        help='file of the baseline (default: benchmarks/baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true',
+        help='save the results as baseline instead of comparing them')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+        help='allowed relative increase of a time (default: 0.2)')
+    parser.add_argument('--min-delta', type=float, default=0.05,
+        help='min. increase of a regression in seconds (default: 0.05)')
+    args = parser.parse_args()
+
+    if shutil.which('mf') is None:
+        print('! METAFONT (mf) wasn\'t found. It needs to be installed to run the benchmarks.')
+        sys.exit(2)
+
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    results = {}
+    for name, size in get_benchmarks(args.axes).items():
+        times = {}
+        for _ in range(args.repeat):
+            for phase, time in run_benchmark(name, size, args.output_dir, {'jobs': args.jobs}).items():
+                times[phase] = min(time, times.get(phase, time))
+        results[name] = times
+        slowest = sorted((phase for phase in times if phase != 'total'), key=lambda phase: -times[phase])[:3]
+        print(f'{name:16} {times["total"]:8.3f} s  ' + ', '.join(f'{phase} {times[phase]:.3f} s' for phase in slowest))
+
+    with open(args.output_dir / 'results.json', 'w') as f:
+        json.dump(results, f, indent=1)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=1)
+        print(f'baseline saved to {args.baseline}')
+        sys.exit()
+
+    try:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    except IOError:
+        print(f'no baseline found at {args.baseline}, run with --save-baseline to create one')
+        sys.exit()
+    regressions = find_regressions(results, baseline, args.tolerance, args.min_delta)
+    for name, phase, baseline_time, time in regressions:
+        print(f'! regression in {name}, {phase}: {baseline_time:.3f} s -> {time:.3f} s')
+    if regressions:
+        sys.exit(1)
+    print('no regressions')
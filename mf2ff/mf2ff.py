@@ -1,14 +1,26 @@
+import cProfile
+import contextlib
+import difflib
+import glob
+import gzip
+import hashlib
+import io
+import json
 import os
 import platform
 import re
+import shutil
 import subprocess
 import sys
 import unicodedata
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from copy import deepcopy
-from functools import reduce
-from itertools import combinations, permutations
-from math import atan2, sqrt
-from time import time
+from itertools import chain, islice
+from math import atan2, floor, sqrt
+from time import process_time, sleep, time
 
 try:
     import fontforge
@@ -21,8 +33,19 @@ except ImportError:
         print('! No module named \'fontforge\'. Check that fontforge is installed and that the module can be found in PYTHONPATH.')
         sys.exit()
 
+try:
+    import resource
+except ImportError:
+    # not available on Windows, the profile doesn't contain METAFONT's
+    # resource usage there
+    resource = None
+
 __version__ = '0.3.0'
 
+# versions of the METAFONT executables run by this process, see
+# Mf2ff.get_mf_version()
+MF_VERSIONS = {}
+
 class Mf2ff():
     '''The main class of mf2ff
 
@@ -36,19 +59,29 @@ class Mf2ff():
     # "[...] a complex pen is one whose boundary contains at least two points." (The METAFONTbook, p. 119)
     SIMPLE_PENS = ('(0,0) .. cycle', '(0,0)..controls (0,0) and (0,0) ..cycle')
 
+    # options which don't change the glyphs
+    OUTPUT_OPTIONS = ('base-cache', 'batch', 'clean-log', 'cprofile', 'debug', 'from-log',
+        'glyph-cache', 'hint', 'incremental', 'jobs', 'log-protocol',
+        'mf-shards', 'otf', 'pipeline', 'profile', 'sfd', 'store', 'time',
+        'transport', 'ttf')
+    # options which don't change the generated files
+    RUN_OPTIONS = ('base-cache', 'batch', 'cprofile', 'debug', 'from-log',
+        'glyph-cache', 'incremental', 'jobs', 'mf-shards', 'pipeline',
+        'profile', 'store', 'time')
+    # extensions of the files kept in the store
+    STORED_EXTENSIONS = ('.sfd', '.otf', '.ttf', '.log', '.errors.json')
+    # version of the data in the glyph cache, increased when it changes
+    GLYPH_CACHE_FORMAT = 2
+    # markers enclosing the commands in the log file for every version of the
+    # log protocol, see get_redefinitions(). Version 2 is more compact: it
+    # writes turningnumber only if it's used and the pen only if it changed.
+    LOG_PROTOCOLS = {1: '@mf2vec@', 2: '@v@'}
+
     def __init__(self):
-        self.MARKER = '@mf2vec@'
-        M = self.MARKER
-        # all command names which are written into the log file, g means >
-        # (greater), p means | (pipe) # TODO explain why replacement is needed
-        self.command_pattern = re.compile(M+
-            r'(addto|also|contour|doublepath|turningcheck|turningnumber|withpen|withweight'
-            r'|cull|keeping|dropping'
-            r'|picture|pic_eqn|pic|as|eq|mi|pl'
-            r'|shipout'
-            r'|ligtable|:|::|pp:|kern|=:|p=:|p=:g|=:p|=:pg|p=:p|p=:pg|p=:pgg|skipto'
-            r'|fontdimen|end)'
-            r'(?:>> (?:(?:Path|Pen polygon) at line (\d+):)?(.*?))?'+M, re.DOTALL)
+        self.set_log_protocol(1)
+        # file the commands are written to by the redefinitions, 'log' or
+        # 'gf', see run()
+        self.transport = 'log'
         # The begin of every message to the log file (also part of the above
         # pattern), used to split up multiple pieces of information written to
         # the log file by a single command.
@@ -58,15 +91,30 @@ class Mf2ff():
         self.join_pattern = re.compile(r'\.\.controls \((.*?),(.*?)\) and \((.*?),(.*?)\) \.\.(?:\((.*?),(.*?)\)|(cycle))')
         # all information given at the shipout of a character.
         self.shipout_pattern = re.compile(r'(.*?)>> (.*?)>> (.*?)>> (.*?)>> (.*?)>> (.*?)>> (.*?)>> (.*?)>> (.*?)>> (.*?)$')
-        # all information in a metafont error
-        self.error_pattern = re.compile(r'^! (?:.|\n)*?^l.(?:.|\n)*?\n\n', re.MULTILINE)
+        # line number in the context of a metafont error
+        self.error_line_pattern = re.compile(r'l\.(\d+)')
 
         self.last_known_line = 0
+        # METAFONT errors found in the log file, see parse_commands()
+        self.errors = []
+        self.profiler = Profiler()
+        # cProfile.Profile of the run if option cprofile is set
+        self.cprofile = None
+        # size of the log file and number of characters read from it, used to
+        # show the progress
+        self.log_size = 0
+        self.log_chars_read = 0
 
         # set default values
         self.cwd = os.getcwd()
         self.mf_options = ['-interaction=batchmode', '-output-directory=' + self.cwd]
         self.mf_first_line = ''
+        # first line METAFONT was run with when it wrote the log file of
+        # option from-log, see run(). If it is None, the first line is the one
+        # METAFONT would be run with now.
+        self.log_first_line = None
+        # environment of the METAFONT processes, None for mf2ff's environment
+        self.mf_env = None
         self.jobname = ''
         self.base = ''
         self.ascent = 0
@@ -91,17 +139,31 @@ class Mf2ff():
         self.upos = -10
         self.uwidth = 2
         self.options = {
+            'base-cache': '', # directory of the precompiled METAFONT bases, disabled if empty
+            'batch': '', # manifest of the fonts built instead of a single font, disabled if empty
+            'clean-log': True, # remove the commands from the log file
+            'cprofile': '', # file of the cProfile statistics, disabled if empty
             'cull-at-shipout': False,
             'debug': False,
             'extrema': False,
+            'log-protocol': 1, # version of the log protocol, see LOG_PROTOCOLS
+            'from-log': '', # raw or gzip-compressed log file processed instead of running METAFONT, disabled if empty
+            'glyph-cache': '', # directory of the glyph cache, disabled if empty
             'hint': False,
+            'incremental': False,
             'is_type': False,
+            'jobs': 1, # number of processes used for processing the glyphs
+            'mf-shards': 1, # number of METAFONT processes the characters are split up into
             'otf': False,
+            'pipeline': False,
+            'profile': False, # write the times of the phases and glyphs to jobname.profile.json
             'remove-artifacts': False,
             'sfd': True,
             'stroke-simplify': True,
             'stroke-accuracy': None, # use fontforge's default (should be 0.25)
+            'store': '', # directory of the build store, disabled if empty
             'time': False,
+            'transport': 'log', # file the commands are written to, 'log' or 'gf' (the GF file's specials)
             'ttf': False,
         }
         self.input_file = ''
@@ -114,8 +176,25 @@ class Mf2ff():
                 },
             },
             'remove-overlap': {
+                'backend': 'fontforge', # 'fontforge' or 'python', see remove_overlap()
                 'scale-factor': 1000,
             },
+            'pipeline': {
+                'poll-interval': 0.05, # seconds between checks for new lines
+            },
+            'log-protocol': {
+                'max-print-line': 1000000, # length of METAFONT's lines in the log file with version 2
+            },
+            'store': {
+                'manifest-entries': 16, # number of input file states kept per manifest
+            },
+            'stroke-cache': {
+                'size': 256, # number of stroke results kept, 0 disables the cache
+            },
+            'regions': {
+                'grid-size': 1/256, # distance of the grid's points, see Regions
+                'flatness': 1/16, # max. distance of a curve from the lines it is flattened to
+            },
         }
 
         # On Windows, ANSI Control Sequence are not available by default. They
@@ -128,9 +207,23 @@ class Mf2ff():
         '''run mf2ff
         '''
 
-        M = self.MARKER
-
-        if not self.input_file and not self.mf_first_line:
+        if self.options['cprofile'] and self.cprofile is None:
+            self.cprofile = cProfile.Profile()
+            try:
+                self.cprofile.runcall(self.run)
+            finally:
+                self.cprofile.dump_stats(self.options['cprofile'])
+                self.cprofile = None
+            return
+
+        if self.options['batch']:
+            results = self.run_batch(self.options['batch'])
+            if any(result['error'] is not None for result in results):
+                sys.exit(1)
+            return
+
+        from_log = self.options['from-log']
+        if not self.input_file and not self.mf_first_line and not from_log:
             print('! No input')
             sys.exit()
 
@@ -138,125 +231,641 @@ class Mf2ff():
             if self.input_file:
                 self.jobname = self.input_file
                 self.mf_options.append('-jobname=' + self.jobname)
+            elif from_log:
+                # name the files after the replayed log file, e.g. font.log.gz
+                self.jobname = os.path.basename(from_log).split('.')[0]
             else:
                 # use plain since it's used as the jobname by mf in this case
                 self.jobname = 'plain'
 
+        user_first_line = self.mf_first_line
+
+        # A replayed log file isn't tied to the current input files, so it is
+        # neither stored nor generated incrementally.
+        if self.options['store'] and not from_log:
+            # METAFONT writes the input files it reads to the .fls file.
+            if '-recorder' not in self.mf_options:
+                self.mf_options.append('-recorder')
+            store_key = self.get_store_key(user_first_line)
+            if self.restore_from_store(store_key):
+                print('Done.')
+                return
+
+        self.profiler = Profiler(self.options['profile'])
+
+        result = self.generate_font(user_first_line, from_log)
+        if result is None:
+            # Characters were added, removed or moved. Changed lines may have
+            # been assigned to the wrong characters.
+            print('')
+            print('The characters changed, generating all characters.')
+            result = self.generate_font(user_first_line, from_log, rebuild_all=True)
+        start_time_ff, dependency_settings = result
+
+        self.write_error_report()
+
+        if self.options['mf-shards'] > 1:
+            # The log file of the first shard contains everything outside of
+            # the characters.
+            log_path = self.get_shard_jobname(0) + '.log'
+        else:
+            log_path = self.jobname + '.log'
+        if self.options['debug']:
+            clean_log_path = self.jobname + '.clean.log'
+        else:
+            clean_log_path = self.jobname + '.log'
+        # The replayed log file is kept as it is.
+        clean_log = self.options['clean-log'] and not from_log
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            if clean_log:
+                # The log file is cleaned up while the font is saved.
+                start_time_log = time()
+                clean_log_future = executor.submit(self.write_clean_log, log_path, clean_log_path)
+            self.apply_font_options_and_save()
+
+        if self.options['mf-shards'] > 1:
+            recorder_path = self.get_shard_jobname(0) + '.fls'
+        else:
+            recorder_path = self.jobname + '.fls'
+        if self.options['incremental'] and not from_log:
+            self.write_dependency_index(dependency_settings, recorder_path)
+
+        print('')
+        if self.options['glyph-cache']:
+            print('Reused ' + str(self.glyph_cache_hits) + ' of '
+                + str(self.glyph_cache_hits + self.glyph_cache_misses)
+                + ' glyphs from the glyph cache')
+        if self.options['debug']:
+            print('Reused ' + str(self.stroke_cache_hits) + ' of '
+                + str(self.stroke_cache_hits + self.stroke_cache_misses)
+                + ' strokes from the stroke cache')
+
+        end_time_ff = time()
+        if self.options['time']:
+            print('  (took ' + '%.2f' % (end_time_ff-start_time_ff) + 's)')
+
+        if clean_log:
+            try:
+                clean_log_future.result()
+            except IOError:
+                print('! I can\'t find file: `' + clean_log_path + '\'.')
+                sys.exit()
+            if self.options['mf-shards'] > 1 and not self.options['debug']:
+                for k in range(self.options['mf-shards']):
+                    os.remove(self.get_shard_jobname(k) + '.log')
+            end_time_log = time()
+            print('Log file cleaned up')
+            if self.options['time']:
+                print('  (took ' + '%.2f' % (end_time_log-start_time_log) + 's)')
+        else:
+            clean_log_path = log_path
+        if self.options['store'] and not from_log:
+            self.add_to_store(store_key, recorder_path, clean_log_path)
+        if self.options['profile']:
+            with open(self.jobname + '.profile.json', 'w') as f:
+                json.dump(self.profiler.report(), f, indent=1)
+            print('Profile written to ' + self.jobname + '.profile.json')
+        print('Done.')
+
+    def generate_font(self, user_first_line, from_log, rebuild_all=False):
+        '''runs METAFONT, or reads the log file of option from-log, and
+        generates self.font from its commands
+
+        Args:
+            user_first_line (str): first line given by the user
+            from_log (str): log file of option from-log, empty if METAFONT is
+                run
+            rebuild_all (bool, optional): whether all characters are generated
+                although option incremental is set
+
+        Returns:
+            tuple: the time the processing started and the dependency settings
+                of option incremental (None if it isn't set), or None if only
+                the changed characters were generated but the characters were
+                added, removed or moved
+        '''
+        # charcodes of the characters generated again if only the characters
+        # affected by changes of the input files are generated
+        self.rebuilt_charcodes = None
+        # mf code selecting the characters written to the log file
+        selection = None
+        self.sources = None
+        dependency_settings = None
+        if self.options['incremental'] and not from_log:
+            # METAFONT writes the input files it reads to the .fls file.
+            if '-recorder' not in self.mf_options:
+                self.mf_options.append('-recorder')
+            dependency_settings = self.get_dependency_settings(user_first_line)
+            if not rebuild_all:
+                self.rebuilt_charcodes = self.get_changed_charcodes(dependency_settings)
+            if self.rebuilt_charcodes is None:
+                print('generating all characters')
+                selection = 'true'
+            else:
+                print('generating ' + str(len(self.rebuilt_charcodes)) + ' changed characters')
+                selection = ' or '.join(
+                    '__mfIIvec__code__ = ' + str(charcode)
+                    for charcode in sorted(self.rebuilt_charcodes)
+                ) or 'false'
+            self.sources = SourceTracker(self.cwd)
+        self.set_log_protocol(self.options['log-protocol'])
+        if self.log_protocol >= 2:
+            # METAFONT doesn't wrap the lines of the log file, so the commands
+            # don't need to be joined.
+            self.mf_env = dict(self.mf_env or os.environ,
+                max_print_line=str(self.params['log-protocol']['max-print-line']))
+        # The commands are written to the GF file only if a single METAFONT
+        # process is run and its output is read after it finished.
+        self.transport = self.options['transport']
+        if self.transport == 'gf' and (from_log or selection is not None
+                or self.options['mf-shards'] > 1 or self.options['pipeline']):
+            self.transport = 'log'
+        if from_log and self.log_first_line is not None:
+            self.mf_first_line = self.log_first_line
+        elif self.options['base-cache'] and self.options['mf-shards'] <= 1:
+            # The shards load the base in run_mf_shards().
+            self.mf_first_line = self.get_mf_first_line(user_first_line, selection, self.get_mf_base(selection))
+        else:
+            self.mf_first_line = self.get_mf_first_line(user_first_line, selection)
+
+        self.log_size = 0
+        self.log_chars_read = 0
+        self.errors = []
+        gf_path = None
+        if from_log:
+            # The commands of an existing log file are processed without
+            # running METAFONT.
+            print('processing ' + from_log + '...')
+            start_time_ff = time()
+            try:
+                log_file, self.log_size = open_log(from_log)
+            except IOError as e:
+                print('! I can\'t find file: `' + from_log + '\'.')
+                print(e)
+                sys.exit()
+        elif self.options['mf-shards'] > 1:
+            # The characters are split up into shards, each of them is
+            # generated by a separate METAFONT process.
+            log_files, cmds = self.run_mf_shards(user_first_line, selection)
+            start_time_ff = time()
+        elif self.options['pipeline']:
+            # METAFONT keeps running while its log file is processed. The
+            # commands are processed as soon as they are written to the log
+            # file.
+            print('running METAFONT and processing its output...')
+            if os.path.exists(self.jobname + '.log'):
+                # don't read the log file of a previous run
+                os.remove(self.jobname + '.log')
+            log_file = self.follow_log(self.jobname + '.log', self.start_mf())
+            start_time_ff = time()
+        else:
+            if self.transport == 'gf':
+                # don't read the GF file of a previous run
+                for path in glob.glob(glob.escape(self.jobname) + '.*gf'):
+                    os.remove(path)
+            self.run_mf()
+
+            # open and process log file
+            start_time_ff = time()
+            try:
+                log_file = open(self.jobname + '.log', 'r')
+            except IOError as e:
+                print('! I can\'t find file: `' + self.jobname + '.log\'.')
+                print(e)
+                sys.exit()
+            self.log_size = os.path.getsize(self.jobname + '.log')
+            if self.transport == 'gf':
+                # METAFONT names the GF file after the resolution, e.g.
+                # jobname.1000gf. There is none if nothing was written to it.
+                gf_paths = glob.glob(glob.escape(self.jobname) + '.*gf')
+                if gf_paths:
+                    gf_path = gf_paths[0]
+                    self.log_size += os.path.getsize(gf_path)
+        if from_log or self.options['mf-shards'] <= 1:
+            log_files = [log_file]
+            # The log file is not read at once. Instead, the commands are
+            # streamed from it while they are processed, so the memory needed
+            # doesn't depend on the size of the log file.
+            cmds = self.read_commands(log_file, sources=self.sources)
+            if gf_path is not None:
+                # The ligtable and fontdimen commands and the errors are still
+                # written to the log file, they follow the commands of the GF
+                # file.
+                gf_file = open(gf_path, 'rb')
+                log_files.append(gf_file)
+                cmds = chain(self.read_gf_commands(gf_file), cmds)
+
+        print('processing its output...')
+        print('Some error messages below come directly from fontforge and cannot be muted.')
+        print('Line is last known line from current file.')
+
+        if not self.fontname:
+            self.fontname = self.jobname
+        if not self.family_name:
+            self.family_name = self.fontname
+        if not self.fullname:
+            self.fullname = self.fontname
+
+        # Every command is parsed once while it is read, so the bodies aren't
+        # parsed again by the processing.
+        cmds = self.parse_commands(cmds)
+        if self.options['profile']:
+            cmds = self.profiler.tokenize(cmds)
+
+        # set up font object to be filled with
+        if self.rebuilt_charcodes is None:
+            self.font = fontforge.font()
+        else:
+            # Only the changed characters are replaced in the existing font.
+            self.font = fontforge.open(self.jobname + '.sfd')
+            cmds = self.drop_font_tables(cmds)
+        self.set_font_properties()
+
+        self.set_up_processing()
+
+        try:
+            if self.options['jobs'] > 1 or self.options['glyph-cache']:
+                self.process_commands_in_segments(start_time_ff, cmds)
+            else:
+                self.process_commands(start_time_ff, cmds)
+        finally:
+            for log_file in log_files:
+                log_file.close()
+        if gf_path is not None and not self.options['debug']:
+            os.remove(gf_path)
+
+        if self.rebuilt_charcodes is not None:
+            if [char[0] for char in self.sources.chars] != self.indexed_charcodes:
+                # The characters changed, see run().
+                self.font.close()
+                return None
+            # remove the characters which are no longer shipped out
+            shipped_charcodes = set(glyph_code for glyph_code, _ in self.shipped_glyphs)
+            for charcode in self.rebuilt_charcodes - shipped_charcodes:
+                if charcode in self.font:
+                    self.font.removeGlyph(self.font[charcode])
+
+        return start_time_ff, dependency_settings
+
+    def run_batch(self, manifest_path):
+        '''builds the fonts of a manifest in a pool of processes
+
+        The manifest is a JSON object with the list `fonts` and optionally the
+        `options` of all fonts and the number of `processes` building fonts
+        at the same time (default: number of CPUs). Every font is an object
+        with the attributes set in its Mf2ff instance, e.g. `input_file`,
+        `jobname` or `ppi`, and its own `options`. The options of self are
+        the defaults of all fonts.
+
+        Args:
+            manifest_path (str): path of the manifest
+
+        Returns:
+            list[dict]: result of every font, see build_font()
+        '''
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+        options = dict(self.options, batch='')
+        options.update(manifest.get('options', {}))
+        fonts = manifest['fonts']
+        processes = manifest.get('processes') or os.cpu_count() or 1
+        processes = max(1, min(processes, len(fonts)))
+
+        print('building ' + str(len(fonts)) + ' fonts in ' + str(processes) + ' processes...')
+        start_time = time()
+        results = [None] * len(fonts)
+        def finish(k, result):
+            results[k] = result
+            if result['error'] is None:
+                print('  ' + result['jobname'] + ' (took ' + '%.2f' % result['time'] + 's)')
+            else:
+                print('! ' + result['jobname'] + ' failed: ' + result['error'])
+        with ProcessPoolExecutor(processes) as executor:
+            futures = {executor.submit(build_font, options, font): k for k, font in enumerate(fonts)}
+            for future in as_completed(futures):
+                try:
+                    finish(futures[future], future.result())
+                except BrokenProcessPool:
+                    # A process crashed, which breaks the whole pool.
+                    pass
+        # The fonts of a broken pool are built again one by one, so only the
+        # font crashing its process fails.
+        for k, font in enumerate(fonts):
+            if results[k] is None:
+                with ProcessPoolExecutor(1) as executor:
+                    try:
+                        result = executor.submit(build_font, options, font).result()
+                    except BrokenProcessPool:
+                        result = {
+                            'jobname': font.get('jobname') or font.get('input_file', ''),
+                            'time': None,
+                            'error': 'process crashed',
+                            'output': '',
+                        }
+                finish(k, result)
+
+        failed = [result for result in results if result['error'] is not None]
+        print('Built ' + str(len(fonts) - len(failed)) + ' of ' + str(len(fonts)) + ' fonts')
+        if self.options['time']:
+            print('  (took ' + '%.2f' % (time()-start_time) + 's)')
+        for result in failed:
+            print('')
+            print('Output of ' + result['jobname'] + ':')
+            print(result['output'], end='')
+        return results
+
+    def set_log_protocol(self, version):
+        '''sets the version of the log protocol used by the redefinitions and
+        the parsing of the log file
+
+        Args:
+            version (int): key of LOG_PROTOCOLS
+        '''
+        self.log_protocol = version
+        self.MARKER = self.LOG_PROTOCOLS[version]
+        M = self.MARKER
+        # all command names which are written into the log file, g means >
+        # (greater), p means | (pipe) # TODO explain why replacement is needed
+        self.command_pattern = re.compile(re.escape(M)+
+            r'(addto|also|contour|doublepath|turningcheck|turningnumber|withpen|withweight'
+            r'|cull|keeping|dropping'
+            r'|picture|pic_eqn|pic|as|eq|mi|pl'
+            r'|shipout'
+            r'|ligtable|:|::|pp:|kern|=:|p=:|p=:g|=:p|=:pg|p=:p|p=:pg|p=:pgg|skipto'
+            r'|fontdimen|end'
+            r'|char|endchar|skip)'
+            r'(?:>> (?:(?:Path|Pen polygon) at line (\d+):)?(.*?))?'+re.escape(M), re.DOTALL)
+
+    def get_mf_first_line(self, user_first_line, selection=None, base=None):
+        '''return the first line passed to METAFONT
+
+        Args:
+            user_first_line (str): first line given by the user
+            selection (str, optional): mf code selecting the characters which
+                should be generated, see get_redefinitions()
+            base (str, optional): name of a base from get_mf_base() which
+                already contains the redefinitions, they are passed in the
+                first line if it is None
+
+        Returns:
+            str: mf code
+        '''
         # load base file if defined
         if self.base:
             input_base = 'input ' + self.base + ';'
         else:
             input_base = ''
 
-        # If option is_type is given, add the extra definitions is_pen and
-        # is_picture.
-        extra_defs = ''
-        if self.options['is_type']:
-            extra_defs += 'let is_pen = __mfIIvec__orig_pen__;'
-            extra_defs += 'let is_picture = __mfIIvec__orig_picture__;'
+        # The selection is defined here instead of in the redefinitions, so
+        # it doesn't change the base.
+        if selection is not None:
+            define_selection = 'def __mfIIvec__selected__ = (' + selection + ') enddef;'
+        else:
+            define_selection = ''
+
+        if base is not None:
+            # The base is loaded by & before the first line.
+            return ('&' + base + ' \\ '
+                + define_selection
+                + input_base
+                + user_first_line
+                + 'input ' + self.input_file
+            )
 
         # The first line of the mf argument start with a backslash (\\) so mf
         # knows the first argument is not a file to be loaded. After that
         # initial backslash a list of mf commands is passed to mf.
-        self.mf_first_line = ('\\ '
+        return ('\\ '
             # redefinition of mf tokens, extra definitions which depend on
             # options, the input of the base file, the first line given by the
             # user and the input of the given input file.
-            + self.get_redefinitions()
-            + extra_defs
+            + self.get_preloaded_code(selection)
+            + define_selection
             + input_base
-            + self.mf_first_line
+            + user_first_line
             + 'input ' + self.input_file
         )
 
-        self.run_mf()
+    def get_preloaded_code(self, selection=None):
+        '''return the mf code run before the input files, i.e. the
+        redefinitions and the extra definitions which depend on options
 
-        # open and process log file
-        start_time_ff = time()
-        try:
-            with open(self.jobname + '.log', 'r+') as f:
-                orig_log_data = f.read()
-        except IOError as e:
-            print('! I can\'t find file: `' + self.jobname + '.log\'.')
-            print(e)
-            sys.exit()
+        Args:
+            selection (str, optional): mf code selecting the characters which
+                should be generated, see get_redefinitions()
 
-        log_data = self.error_pattern.sub('', orig_log_data)
-        log_data = re.sub('\n', '', log_data)
-        log_data = log_data.split(self.mf_first_line, 1)[1] # interesting info only after the input
-        cmds = self.command_pattern.findall(log_data) # find all commands
+        Returns:
+            str: mf code
+        '''
+        # If option is_type is given, add the extra definitions is_pen and
+        # is_picture.
+        extra_defs = ''
+        if self.options['is_type']:
+            extra_defs += 'let is_pen = __mfIIvec__orig_pen__;'
+            extra_defs += 'let is_picture = __mfIIvec__orig_picture__;'
+        return self.get_redefinitions(selection) + extra_defs
 
-        print('processing its output...')
-        print('Some error messages below come directly from fontforge and cannot be muted.')
-        print('Line is last known line from current file.')
+    def get_mf_base(self, selection=None):
+        '''return the name of a precompiled base containing plain.mf and the
+        code from get_preloaded_code()
 
-        if not self.fontname:
-            self.fontname = self.jobname
-        if not self.family_name:
-            self.family_name = self.fontname
-        if not self.fullname:
-            self.fullname = self.fontname
+        The base is dumped by METAFONT in ini mode into the directory of
+        option base-cache if it isn't there yet. Its name depends on the code
+        and the versions of mf2ff and METAFONT, so it is dumped once for every
+        set of options. The code only depends on whether there is a selection,
+        not on the selection itself, see get_mf_first_line(). The directory
+        is added to METAFONT's search path of bases (MFBASES).
 
-        # set up font object to be filled with
-        self.font = fontforge.font()
-        self.font.ascent = self.ascent
-        self.font.comment = self.comment
-        self.font.copyright = self.copyright
-        self.font.descent = self.descent
-        self.font.design_size = self.designsize
-        self.font.encoding = self.encoding
-        self.font.familyname = self.family_name
-        self.font.fontlog = self.fontlog
-        self.font.fontname = self.fontname
-        self.font.version = self.font_version
-        self.font.fullname = self.fullname
-        self.font.italicangle = self.italicangle
-        self.font.upos = self.upos
-        self.font.uwidth = self.uwidth
+        Args:
+            selection (str, optional): mf code selecting the characters which
+                should be generated, see get_redefinitions()
 
-        # picture variables are processed inside fontforge using layers.
-        # A dict is used to keep track of the pictures
-        self.pictures = {}
-        self.pictures['nullpicture'] = fontforge.layer() # predefined empty picture
+        Returns:
+            str: name of the base, None if it can't be dumped
+        '''
+        directory = os.path.abspath(self.options['base-cache'])
+        code = self.get_preloaded_code(selection)
+        data = json.dumps([__version__, self.get_mf_version(), code])
+        name = 'mf2ff-' + hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+        if not os.path.exists(os.path.join(directory, name + '.base')):
+            print('dumping METAFONT base ' + name + '...')
+            os.makedirs(directory, exist_ok=True)
+            # The base is dumped under a temporary name and renamed afterwards,
+            # so other runs sharing the directory never load an incomplete
+            # base.
+            tmp_name = name + '.' + str(os.getpid()) + '.tmp'
+            # The primitive dump is saved before it could be redefined.
+            first_line = ('\\ input plain.mf; let __mfIIvec__dump__ = dump;'
+                + code + '__mfIIvec__dump__')
+            try:
+                subprocess.run(
+                    ['mf', '-ini', '-interaction=batchmode',
+                        '-output-directory=' + directory, '-jobname=' + tmp_name, first_line],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    cwd=self.cwd
+                )
+                os.replace(os.path.join(directory, tmp_name + '.base'), os.path.join(directory, name + '.base'))
+            except OSError:
+                print('! I can\'t dump the base, see `' + os.path.join(directory, tmp_name + '.log') + '\'.')
+                return None
+            os.remove(os.path.join(directory, tmp_name + '.log'))
+        # An empty entry in the search path stands for the default directories.
+        self.mf_env = dict(self.mf_env or os.environ,
+            MFBASES=directory + os.pathsep + os.environ.get('MFBASES', ''))
+        return name
+
+    def get_shard_jobname(self, k):
+        '''return the jobname of the METAFONT process generating shard k
 
-        # a separate font object with a dedicated glyph is used for
-        # processing
-        internal_font = fontforge.font()
-        self.proc_glyph = internal_font.createChar(-1, 'proc_glyph')
+        Args:
+            k (int): index of the shard
 
-        # keep a record of ligtable's skipto labels
-        self.skiptos = {}
+        Returns:
+            str: jobname
+        '''
+        return self.jobname + '-shard' + str(k)
 
-        self.process_commands(start_time_ff, cmds)
+    def run_mf_shards(self, user_first_line, selection=None):
+        '''runs a METAFONT process for every shard of the characters
 
-        self.apply_font_options_and_save()
+        Every process runs the whole input file, but only the characters whose
+        charcode modulo the number of shards is the index of the process' shard
+        are written to its log file. Everything outside of the characters is
+        taken from the first shard. If option pipeline is enabled, the log
+        files are processed while the processes are running.
 
-        print('')
+        Args:
+            user_first_line (str): first line given by the user
+            selection (str, optional): mf code selecting the characters which
+                should be generated at all, see get_redefinitions()
 
-        end_time_ff = time()
-        if self.options['time']:
-            print('  (took ' + '%.2f' % (end_time_ff-start_time_ff) + 's)')
+        Returns:
+            tuple: list of the log files (to be closed after processing) and
+                generator of the merged commands
+        '''
+        n = self.options['mf-shards']
+        first_lines = []
+        processes = []
+        # All shards load the same base, only their selections differ.
+        if self.options['base-cache']:
+            base = self.get_mf_base('true')
+        else:
+            base = None
+        for k in range(n):
+            shard_selection = '__mfIIvec__code__ mod ' + str(n) + ' = ' + str(k)
+            if selection is not None:
+                shard_selection += ' and (' + selection + ')'
+            first_lines.append(self.get_mf_first_line(user_first_line, shard_selection, base))
+            # replace the jobname, so every process has its own log file
+            mf_options = []
+            skip_value = False
+            for option in self.mf_options:
+                if skip_value:
+                    skip_value = False
+                elif option.lstrip('-').split('=', 1)[0] == 'jobname':
+                    skip_value = '=' not in option
+                else:
+                    mf_options.append(option)
+            mf_options.append('-jobname=' + self.get_shard_jobname(k))
+            log_path = self.get_shard_jobname(k) + '.log'
+            if self.options['pipeline'] and os.path.exists(log_path):
+                # don't read the log file of a previous run
+                os.remove(log_path)
+            processes.append(self.start_mf(mf_options, first_lines[k]))
+        self.mf_first_line = first_lines[0]
+
+        log_files = []
+        if self.options['pipeline']:
+            print('running METAFONT in ' + str(n) + ' processes and processing their output...')
+            for k in range(n):
+                log_path = self.get_shard_jobname(k) + '.log'
+                log_files.append(self.follow_log(log_path, processes[k]))
+        else:
+            print('running METAFONT in ' + str(n) + ' processes...')
+            start_time_mf = time()
+            profile_start = self.profiler.start()
+            for process in processes:
+                process.wait()
+            self.profiler.add_mf(profile_start)
+            end_time_mf = time()
+            if self.options['time']:
+                print('  (took ' + '%.2f' % (end_time_mf-start_time_mf) + 's)')
+            for k in range(n):
+                log_path = self.get_shard_jobname(k) + '.log'
+                try:
+                    log_files.append(open(log_path, 'r'))
+                except IOError as e:
+                    for log_file in log_files:
+                        log_file.close()
+                    print('! I can\'t find file: `' + log_path + '\'.')
+                    print(e)
+                    sys.exit()
+                self.log_size += os.path.getsize(log_path)
+        # The sources are tracked in the first shard, its log file contains all
+        # char and endchar commands.
+        cmds = self.merge_shards([
+            self.read_commands(f, l, self.sources if k == 0 else None)
+            for k, (f, l) in enumerate(zip(log_files, first_lines))
+        ])
+        return log_files, cmds
+
+    def merge_shards(self, shard_cmds):
+        '''yields the commands of all shards in the order of a single
+        METAFONT run
+
+        All shards run the same code, so their char commands (written at every
+        beginchar) match. A character is taken from the shard which generated
+        it or from the first shard if none of them did, everything else from
+        the first shard. The character ends after its shipout and the following
+        picture, at a skip command (written by the other shards instead of the
+        shipout) or at the next character.
 
-        pattern = re.sub(r'(\.|\*|\||\\|\(|\)|\+)', r'\\\1', '\n?'.join(self.mf_first_line), flags=re.DOTALL) \
-            + '\n|\n' + '\n?'.join(M) + '.*?\n' + '\n?'.join(M)
-        start_time_log = time()
-        clean_log = re.sub(pattern, '', orig_log_data, flags=re.DOTALL)
+        Args:
+            shard_cmds (list[iterable]): commands of every shard
 
-        if self.options['debug']:
-            extension = '.clean.log'
-        else:
-            extension = '.log'
-        try:
-            with open(self.jobname + extension, 'w') as outfile:
-                outfile.write(clean_log)
-        except IOError:
-            print('! I can\'t find file: `' + self.jobname + extension + '\'.')
-            sys.exit()
-        end_time_log = time()
-        print('Log file cleaned up')
-        if self.options['time']:
-            print('  (took ' + '%.2f' % (end_time_log-start_time_log) + 's)')
-        print('Done.')
+        Yields:
+            tuple[str]: name, line and body of a command
+        '''
+        streams = [LogCommands(c) for c in shard_cmds]
+        pos = [0] * len(streams)
+        while True:
+            # commands outside of characters up to the next character
+            for k, cmds in enumerate(streams):
+                while cmds.has(pos[k]) and cmds[pos[k]][0] != 'char':
+                    if k == 0:
+                        yield cmds[pos[k]]
+                    pos[k] += 1
+                    cmds.release(pos[k])
+            if not streams[0].has(pos[0]):
+                return
+            # the character, only generated by one of the shards
+            generated = [
+                cmds.has(pos[k]) and cmds[pos[k]][2].split('>> ')[-1] == 'true'
+                for k, cmds in enumerate(streams)
+            ]
+            source = generated.index(True) if True in generated else 0
+            for k, cmds in enumerate(streams):
+                if not cmds.has(pos[k]):
+                    continue
+                if k == source:
+                    yield cmds[pos[k]]
+                pos[k] += 1
+                while cmds.has(pos[k]) and cmds[pos[k]][0] != 'char':
+                    cmd_name = cmds[pos[k]][0]
+                    pos[k] += 1
+                    cmds.release(pos[k])
+                    if k == source:
+                        yield cmds[pos[k]-1]
+                    if cmd_name == 'skip':
+                        break
+                    if cmd_name == 'shipout':
+                        # only written by the shard which generated the character
+                        if cmds.has(pos[k]):
+                            yield cmds[pos[k]]
+                            pos[k] += 1
+                            cmds.release(pos[k])
+                        break
 
     def run_mf(self):
         '''runs METAFONT with self.mf_options and self.mf_first_line.
@@ -264,1099 +873,4046 @@ class Mf2ff():
         '''
         print('running METAFONT...')
         start_time_mf = time()
-        subprocess.call(
-            ['mf'] + self.mf_options + [self.mf_first_line],
-            stdout=subprocess.DEVNULL,
-            cwd=self.cwd
-        )
+        profile_start = self.profiler.start()
+        self.start_mf().wait()
+        self.profiler.add_mf(profile_start)
         end_time_mf = time()
         if self.options['time']:
             print('  (took ' + '%.2f' % (end_time_mf-start_time_mf) + 's)')
 
-    def process_commands(self, start_time_ff, cmds):
-        '''processes the commands cmds
+    def start_mf(self, mf_options=None, mf_first_line=None):
+        '''starts METAFONT with self.mf_options and self.mf_first_line without
+        waiting for it to finish. stdout is devnull
 
-        shows progress and eta based on start_time_ff
+        Args:
+            mf_options (list[str], optional): options used instead of
+                self.mf_options
+            mf_first_line (str, optional): first line used instead of
+                self.mf_first_line
+
+        Returns:
+            subprocess.Popen: the METAFONT process
+        '''
+        if mf_options is None:
+            mf_options = self.mf_options
+        if mf_first_line is None:
+            mf_first_line = self.mf_first_line
+        return subprocess.Popen(
+            ['mf'] + mf_options + [mf_first_line],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            cwd=self.cwd,
+            env=self.mf_env
+        )
+
+    def follow_log(self, log_path, process):
+        '''yields the lines of the log file while it is written by process
+
+        A line is only yielded when it is complete. The log file of a previous
+        run needs to be removed before starting process.
 
         Args:
-            start_time_ff (float): start time of fontforge from time.time()
-            cmds (list[tuple[str]]): list of commands
+            log_path (str): path of the log file
+            process (subprocess.Popen): METAFONT process writing the log file
+
+        Yields:
+            str: line of the log file
         '''
+        start_time_mf = time()
+        profile_start = self.profiler.start()
+        f = None
+        size = 0 # size of the log file included in self.log_size
+        try:
+            # wait for METAFONT to create the log file
+            while f is None:
+                finished = process.poll() is not None
+                try:
+                    f = open(log_path, 'r')
+                except IOError as e:
+                    if finished:
+                        print('! I can\'t find file: `' + log_path + '\'.')
+                        print(e)
+                        sys.exit()
+                    sleep(self.params['pipeline']['poll-interval'])
+
+            line = ''
+            while True:
+                finished = process.poll() is not None
+                line += f.readline()
+                if line[-1:] == '\n':
+                    new_size = os.path.getsize(log_path)
+                    self.log_size += new_size - size
+                    size = new_size
+                    self.log_size = max(self.log_size, self.log_chars_read)
+                    yield line
+                    line = ''
+                elif finished:
+                    # everything is written, nothing more to wait for
+                    if line:
+                        yield line
+                    break
+                else:
+                    sleep(self.params['pipeline']['poll-interval'])
+            self.profiler.add_mf(profile_start)
+            if self.options['time']:
+                print('\n  (METAFONT took ' + '%.2f' % (time()-start_time_mf) + 's)')
+        finally:
+            if f is not None:
+                f.close()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+    def read_commands(self, lines, first_line=None, sources=None):
+        '''yields the commands written to the log file by the redefinitions
+
+        The log file is read line by line. METAFONT's error messages are
+        yielded as error commands with the line number of the error and the
+        error message as body, see parse_commands(). Line breaks are removed
+        and everything up to the end of the first line's echo is ignored. Only
+        the text of the command which is currently read is kept in memory.
+
+        The version of the log protocol is negotiated by the marker of the
+        first command. If the pen of a withpen command wasn't written to the
+        log file since it didn't change (version 2), the previous pen is used.
 
-        i = 0
-        while i < len(cmds):
-            cmd = cmds[i]
-            cmd_name = cmd[0]
-            if cmd[1]:
-                self.last_known_line = int(cmd[1])
-            self.cmd_body = cmd[2]
+        Args:
+            lines (iterable[str]): lines of the log file, e.g. the file object
+            first_line (str, optional): first line passed to METAFONT if it's
+                not self.mf_first_line
+            sources (SourceTracker, optional): tracker of the input files and
+                the characters' lines
+
+        Yields:
+            tuple[str]: name, line and body of a command
+        '''
+        M = self.MARKER
+        if first_line is None:
+            first_line = self.mf_first_line
+        first_line_found = False
+        protocol_found = False
+        pen = '' # body of the last withpen command with a pen
+        def restore_pens(cmds):
+            nonlocal pen
+            for cmd in cmds:
+                if cmd[0] == 'withpen':
+                    if cmd[2]:
+                        pen = cmd[2]
+                    else:
+                        cmd = ('withpen', '', pen)
+                yield cmd
+        error_lines = None # lines of the METAFONT error currently read
+        error_line_found = False # whether the error's l.<line> line was found
+        error_line = '' # line number of the error
+        text = ''
+        for line in lines:
+            self.log_chars_read += len(line)
+            # METAFONT errors start with `! ' and end with an empty line after
+            # the line starting with l.<line number>
+            if error_lines is None and line[:2] == '! ':
+                error_lines = []
+            if error_lines is not None:
+                error_lines.append(line)
+                if not error_line_found:
+                    error_line_found = line[:1] == 'l' and line[1:2] not in ('', '\n')
+                    if error_line_found:
+                        match = self.error_line_pattern.match(line)
+                        error_line = match.group(1) if match else ''
+                elif line == '\n':
+                    if first_line_found:
+                        yield ('error', error_line, ''.join(error_lines[:-1]))
+                    error_lines = None
+                    error_line_found = False
+                continue
+            n = len(text)
+            text += line[:-1] if line[-1:] == '\n' else line
+
+            if not first_line_found:
+                # interesting info only after the input
+                i = text.find(first_line)
+                if i == -1:
+                    text = text[-len(first_line):]
+                    continue
+                first_line_found = True
+                text = text[i+len(first_line):]
+                n = 0
+            elif protocol_found and text.find(M, max(n-len(M)+1, 0)) == -1:
+                # no new marker, so no new complete command
+                continue
+            if not protocol_found:
+                starts = {}
+                for version, marker in self.LOG_PROTOCOLS.items():
+                    start = text.find(marker, max(n-len(marker)+1, 0))
+                    if start != -1:
+                        starts[version] = start
+                if not starts:
+                    continue
+                protocol_found = True
+                version = min(starts, key=starts.get)
+                if version != self.log_protocol:
+                    self.set_log_protocol(version)
+                    M = self.MARKER
+
+            cmds, text = self.split_commands(text, sources)
+            yield from restore_pens(cmds)
+
+        # An error without its l.<line number> line or its terminating empty
+        # line is not an error message.
+        if error_lines is not None and first_line_found:
+            text += ''.join(error_lines).replace('\n', '')
+            cmds, text = self.split_commands(text, sources)
+            yield from restore_pens(cmds)
+        elif not first_line_found:
+            print('! METAFONT\'s first line wasn\'t found in the log file.')
+
+    def split_commands(self, text, sources=None):
+        '''splits text into its complete commands and the rest
+
+        The rest of text is the part which may contain the beginning of an
+        incomplete command.
 
-            self.show_progress(start_time_ff, i, len(cmds))
+        Args:
+            text (str): part of the log file without line breaks
+            sources (SourceTracker, optional): tracker which gets the text
+                outside of the commands and the commands
 
-            # addto\
-            # TODO This section needs to be tested and maybe reworked! mf only
-            # makes one line with each pen stroke so doublepath is needed for a
-            # full stroke. Using contour with a pen results in an offset line,
-            # left or right depending on the direction of the path. One of the
-            # flags removeinternal or removeexternal might be useful to do this.
+        Returns:
+            tuple[list[tuple[str]], str]: name, line and body of all complete
+                commands and the rest of text
+        '''
+        M = self.MARKER
+        cmds = []
+        pos = 0
+        while True:
+            start = text.find(M, pos)
+            if start == -1:
+                # keep a possibly incomplete marker
+                rest_start = max(pos, len(text)-len(M)+1)
+                if sources is not None:
+                    sources.scan(text[pos:rest_start])
+                return cmds, text[rest_start:]
+            if sources is not None:
+                sources.scan(text[pos:start])
+            if text.find(M, start+len(M)) == -1:
+                return cmds, text[start:]
+            match = self.command_pattern.match(text, start)
+            if match:
+                cmds.append(match.groups(''))
+                if sources is not None:
+                    sources.add_command(cmds[-1])
+                pos = match.end()
+            else:
+                pos = start + 1
 
-            if cmd_name == 'addto':
-                addto = self.cmd_body[1:-1] # clip quotes
-                if cmds[i+1][0] == 'turningcheck':
-                    # turningcheck is always followed by turningnumber
-                    turningcheck = int(cmds[i+1][2])
-                    turningnumber = int(cmds[i+2][2])
-                    j = i + 3
+    def read_gf_commands(self, f):
+        '''yields the commands written to the GF file by the redefinitions
+
+        Every command is enclosed in the specials `@@name' and `@@'. Its
+        values are written by __mfIIvec__show__, see get_redefinitions(), and
+        are converted into the text METAFONT's show would have written to the
+        log file, so the commands are the same as the ones of read_commands().
+        The GF file doesn't contain line numbers.
+
+        Args:
+            f (BinaryIO): the GF file opened in binary mode
+
+        Yields:
+            tuple[str]: name, line and body of a command
+        '''
+        name = None # name of the command currently read
+        values = [] # values of the command as they would be shown
+        cyclic = False # whether the pair or path currently read is cyclic
+        count = 0 # number of coordinates of the pair or path not read yet
+        numbers = []
+        pos = f.tell()
+        for special in read_gf_specials(f):
+            if isinstance(special, int):
+                if count:
+                    numbers.append(special)
+                    count -= 1
+                    if not count:
+                        values.append(format_gf_path(numbers, cyclic))
+                        numbers = []
                 else:
-                    j = i + 1
+                    values.append(format_scaled(special))
+                continue
+            if special.startswith('@@'):
+                if special == '@@':
+                    if name is not None:
+                        self.log_chars_read += f.tell() - pos
+                        pos = f.tell()
+                        yield (name, '', '>> '.join(values))
+                    name = None
+                else:
+                    name = special[2:]
+                    values = []
+            elif special.startswith('@s'):
+                values.append('"' + special[2:] + '"')
+            elif special == '@t':
+                values.append('true')
+            elif special == '@f':
+                values.append('false')
+            elif special == '@?':
+                values.append('?')
+            elif special == '@p':
+                cyclic = False
+                count = 2
+            elif special[:2] in ('@c', '@o'):
+                # A path of length n has 3n+1 points and control points, the
+                # last point of a cyclic path is left out.
+                cyclic = special[1] == 'c'
+                count = 2*(3*int(special[2:]) + 1 - cyclic)
+
+    def clean_log(self, lines, first_line=None):
+        '''yields the parts of the cleaned up log file
+
+        The echo of the first line and the text written to the log file by
+        the redefinitions are removed. Both may be split up by line breaks
+        where METAFONT wrapped the lines. Every part of the log file is only
+        looked at a few times, so this takes linear time.
 
-                # next command is also, contour or doublepath
-                addto_next_cmd_name = cmds[j][0]
-                if cmds[j][1]:
-                    self.last_known_line = int(cmds[j][1])
-                addto_next_cmd_body = cmds[j][2]
-                j += 1
+        Args:
+            lines (iterable[str]): lines of the log file, e.g. the file object
+            first_line (str, optional): first line passed to METAFONT if it's
+                not self.mf_first_line
 
-                # pen and weight
-                # set default values
-                # "If no pen is given, the pen is assumed to be 'nullpen'; if no
-                # weight is given, the weight is assumed to be +1."
-                # (The METAFONTbook, p. 118)
-                pen = '(0,0) .. cycle' # this is nullpen; in mf, type: show nullpen;
-                weight = 1
-                # Loop over all commands and overwrite pen and weight if there
-                # are multiple withpen and withweight commands: "If more than one
-                # pen or weight is given, the last specification overrides all
-                # previous ones." (The METAFONTbook, p. 118)
-                while j < len(cmds):
-                    cmd = cmds[j]
-                    cmd_name = cmd[0]
-                    if cmd[1]:
-                        self.last_known_line = int(cmd[1])
-                    self.cmd_body = cmd[2]
+        Yields:
+            str: part of the cleaned up log file
+        '''
+        if first_line is None:
+            first_line = self.mf_first_line
+        return self.remove_marked_text(self.remove_first_line_echo(lines, first_line))
 
-                    if cmd_name == 'withpen':
-                        pen = self.cmd_body
-                    elif cmd_name == 'withweight':
-                        # The weight is "rounded to the nearest integer"
-                        # (The METAFONTbook, p. 118).
-                        weight = int(round(float(self.cmd_body)))
-                    else:
-                        break
-                    j += 1
-                i = j - 1 # i will be increased at the end of the outer while loop
+    def remove_first_line_echo(self, lines, first_line):
+        '''yields the lines of the log file without the first line's echo
 
-                # processing of instructions on what to add to the picture
-                if addto_next_cmd_name == 'mi': # - (minus)
-                    # TODO can - even occur here?
-                    # TODO i instead of j?
-                    self.pictures[addto] += self.pictures[cmds[j][1:-1]].reverseDirection()
-                    j += 1
-                elif addto_next_cmd_name == 'also':
-                    self.pictures[addto] += self.pictures[addto_next_cmd_body[1:-1]]
-                else: # add a path
-                    # There are four basic cases of adding a path to a glyph:
-                    # 1. A contour without a pen: The contour is simply added to
-                    #    the glyph. (fill c;)
-                    # 2. A doublepath without a pen: This will have no effect in
-                    #    mf so it is ignored in FontForge too.
-                    # 3. A contour with a pen: The contour is added to the glyph
-                    #    with an offset. A closed path will fill an area,
-                    #    without a hole, an open path will cause an error in mf
-                    #    and in FontForge.
-                    # 4. A doublepath with a pen: A simple pen stroke added to
-                    #    the glyph. (draw p;) Since in some cases multiple paths
-                    # are added, create a list of paths. The command body of the
-                    # contour or doublepath command is a path.
-                    paths = [addto_next_cmd_body]
-                    # Add the path multiple times, according to the weight.
-                    paths = paths*abs(weight)
+        The echo ends at the end of a line. If it's wrapped, it continues in
+        the next lines, so it can't contain an empty line. The current run of
+        non-empty lines is kept until it can't contain the begin of the echo
+        anymore. The begin of the line the echo starts in is kept.
 
-                    # 1st case: contour without pen
-                    if addto_next_cmd_name == 'contour' and pen in self.SIMPLE_PENS:
-                        # If turningcheck is negative the paths are just added
-                        # according to the sign of the weight. Otherwise, the
-                        # turningnumber is used (== is equivalent to the XOR
-                        # operator). NOTE: "within FontForge all outer
-                        # boundaries must be drawn clockwise" (FonForge
-                        # Tutorial, 4.2.), while its counter clockwise in mf, so
-                        # all paths need to be added reversed for positive
-                        # weights.
-                        if turningcheck <= 0: # use the path direction directly
-                            if weight > 0:
-                                self.add_contours(addto, [self.reversed_path(p) for p in paths])
-                            elif weight < 0:
-                                self.add_contours(addto, paths)
-                            # TODO is the behavior correct for weight == 0 ?
-                        else:
-                            if (weight > 0) == (turningnumber > 0): # adjust the path direction according to the weight
-                                self.add_contours(addto, [self.reversed_path(p) for p in paths])
-                            elif (weight < 0) == (turningnumber > 0):
-                                self.add_contours(addto, paths)
-                            # TODO is the behavior correct for weight == 0 ?
-
-                    # 3rd and 4th case: contour/doublepath with pen
-                    elif pen not in self.SIMPLE_PENS:
-                        self.pictures['temp_layer'] = fontforge.layer()
-
-                        # Removing the overlap on the layer (default) produces
-                        # no hole in non cyclic overlapping strokes. Removing
-                        # overlap on the contour produces a hole with wrong
-                        # direction, so it's no real hole. The direction needs
-                        # to be corrected later. This may be a bug in FontForge.
-                        stroke_kwargs = {'removeoverlap': 'contour'}
+        Args:
+            lines (iterable[str]): lines of the log file
+            first_line (str): first line passed to METAFONT
 
-                        # If it's a doublepath just add a normal stroke, without
-                        # anything special. This is the 4th case.
-                        if addto_next_cmd_name == 'doublepath':
-                            # 4th case
-                            self.add_contours('temp_layer', paths)
-                        else: # 3rd case: contour with pen
-                            self.add_contours('temp_layer', [self.reversed_path(p) for p in paths])
-                            # Internal removal is described as "When a contour
-                            # is closed and clockwise, only the smaller “inside”
-                            # contour is retained." (FontForge's documentation:
-                            # glyph.stroke())
-                            stroke_kwargs.update({'removeinternal': True})
+        Yields:
+            str: part of the log file
+        '''
+        lines = iter(lines)
+        run = [] # current run of non-empty lines
+        text = '' # the end of run without line breaks
+        for line in lines:
+            if line in ('', '\n'):
+                yield ''.join(run) + line
+                run = []
+                text = ''
+                continue
+            run.append(line)
+            if line[-1:] != '\n':
+                # last line of the log file, so the echo can't end in it
+                continue
+            text += line[:-1]
+            if text.endswith(first_line):
+                # search for the line the echo starts in
+                i = len(run) - 1
+                rest = len(first_line)
+                while len(run[i]) - 1 < rest:
+                    rest -= len(run[i]) - 1
+                    i -= 1
+                yield ''.join(run[:i]) + run[i][:len(run[i])-1-rest]
+                break
+            # lines before the last len(first_line) characters can't contain
+            # the begin of the echo
+            while len(text) - (len(run[0]) - 1) >= len(first_line):
+                text = text[len(run[0])-1:]
+                yield run.pop(0)
+        else:
+            yield ''.join(run)
+            return
+        # The rest is passed on in larger parts.
+        while True:
+            part = ''.join(islice(lines, 4096))
+            if not part:
+                break
+            yield part
 
-                        stroke_kwargs.update({'simplify': self.options['stroke-simplify']})
-                        if self.options['stroke-accuracy'] is not None: # None -> Fontforge's default value
-                            stroke_kwargs.update({'accuracy': self.options['stroke-accuracy']})
+    def remove_marked_text(self, parts):
+        '''yields the parts of the log file without the commands
 
-                        pen_first_point = self.pair_pattern.search(pen) # TODO better with .groups ?
-                        pen_joins = self.join_pattern.findall(pen[pen_first_point.end():])
+        The text of a command starts at the line break before a marker and
+        ends with the next marker at the begin of a line. If there is no such
+        marker, the text is kept.
 
-                        # If the pen's path has 8 points it is to be assumed to be a circle / ellipse.
-                        pen_is_circle = False
-                        if len(pen_joins) == 8:
-                            # TODO more conditions
-                            pen_is_circle = True
+        Args:
+            parts (iterable[str]): parts of the log file
 
-                        if pen_is_circle:
-                            # TODO better to get both widths and compare to
-                            # determine which one is minor_width ?
-                            width = sqrt((float(pen_joins[3][4])-float(pen_first_point.group(1)))**2 + (float(pen_joins[3][5])-float(pen_first_point.group(2)))**2)
-                            minor_width = sqrt((float(pen_joins[5][4])-float(pen_joins[1][4]))**2 + (float(pen_joins[5][5])-float(pen_joins[1][5]))**2)
-                            angle = atan2(float(pen_joins[3][5])-float(pen_first_point.group(2)),float(pen_joins[3][4])-float(pen_first_point.group(1)))
-                            self.pictures['temp_layer'] = self.pictures['temp_layer'].stroke('elliptical', width, minor_width, angle, **stroke_kwargs)
+        Yields:
+            str: part of the log file
+        '''
+        M = self.MARKER
+        removed = None # parts of the command currently removed
+        text = ''
+        parts = iter(parts)
+        finished = False
+        while not finished:
+            part = next(parts, None)
+            if part is None:
+                finished = True
+            else:
+                text += part
+            pos = 0 # begin of the text which is not yielded or removed yet
+            i = 0
+            while True:
+                i = text.find('\n' + M[0], i)
+                if i == -1:
+                    # keep a line break which may be followed by a marker
+                    rest_start = max(pos, len(text) - (text[-1:] == '\n' and not finished))
+                    break
+                if text.startswith(M, i+1):
+                    end = i + 1 + len(M)
+                else:
+                    end = match_wrapped(text, i+1, M, finished)
+                if end is None:
+                    # the rest of the marker isn't read yet
+                    rest_start = i
+                    break
+                if end == -1:
+                    i += 1
+                elif removed is None:
+                    # begin of a command, the line break before it is removed too
+                    yield text[pos:i]
+                    removed = [text[i:end]]
+                    pos = i = end
+                else:
+                    # end of the command
+                    removed = None
+                    pos = i = end
+            if removed is None:
+                yield text[pos:rest_start]
+            else:
+                removed.append(text[pos:rest_start])
+            text = text[rest_start:]
+        if removed is not None:
+            # The command isn't complete, it's kept.
+            yield ''.join(removed)
 
-                        else:
-                            # FontForge only supports elliptical or polygonal
-                            # pens, so all other pens are treated as polygons.
-                            pen_contour = fontforge.contour()
-                            pen_contour.moveTo(float(pen_first_point.group(1)), float(pen_first_point.group(2)))
-                            for j in pen_joins[:-1]:
-                                pen_contour.lineTo(float(j[4]), float(j[5]))
-                            pen_contour.closed = True # TODO is pen_contour from mf always closed or is it necessary to check it?
-                            pen_contour = pen_contour.reverseDirection() # TODO is this always required? Why?
-                            try:
-                                self.pictures['temp_layer'] = self.pictures['temp_layer'].stroke('convex', pen_contour, **stroke_kwargs)
-                            except ValueError as e1:
-                                pen_contour = pen_contour.reverseDirection()
-                                try:
-                                    self.pictures['temp_layer'] = self.pictures['temp_layer'].stroke('convex', pen_contour, **stroke_kwargs)
-                                except ValueError as e2:
-                                    print('! Pen can\'t be used here. METAFONT gives:')
-                                    print('    ' + pen)
-                                    print('  fontforge raises:')
-                                    print('    ' + str(e1))
-                                    print('  Even after reversing the pen\'s outline path\'s direction, fontforge raises:')
-                                    print('    ' + str(e2))
-                                    print('  The contour is simply added without using a pen. It may not be closed. This might produce correct results if penspeck is used (which is used by drawdot)')
-                                    # TODO identify when penspeck is used and skip the errors
-
-                        # Fix possible wrong direction of a hole created by
-                        # stroke(). Note: This also seems to change the contour
-                        # order in the glyph's layer. The outer contour always
-                        # seems to be the last contour
-                        self.pictures['temp_layer'].correctDirection()
-                        # add stroked layer to glyph
-                        self.pictures[addto] += self.pictures['temp_layer']
+    def write_clean_log(self, log_path, clean_log_path):
+        '''writes the cleaned up log file, see clean_log()
 
-                    # 2nd case: doublepath without pen
-                    else:
-                        # doublepath without pen has no effect
-                        # TODO check
-                        pass
+        The file is written under a temporary name and renamed afterwards, so
+        log_path and clean_log_path can be the same.
 
-            # cull\
-            # TODO This section needs extensive testing and rework!
-            elif cmd_name == 'cull':
-                cull_pic_name = self.cmd_body[1:-1] # clip quotes
-                keep_or_drop = cmds[i+1][0]
-                a, b = [int(float(s)) for s in self.pair_pattern.search(cmds[i+1][2]).groups()]
-                weight = 1 # default # TODO source
-                num_paths = len(self.pictures[cull_pic_name])
+        Args:
+            log_path (str): path of the log file
+            clean_log_path (str): path of the cleaned up log file
+        '''
+        temp_path = clean_log_path + '.' + str(os.getpid()) + '.tmp'
+        with open(log_path, 'r') as f, open(temp_path, 'w') as outfile:
+            outfile.writelines(self.clean_log(f))
+        os.replace(temp_path, clean_log_path)
 
-                i += 1
-                j = i+1
-                while j < len(cmds):
-                    cmd = cmds[j]
-                    cmd_name = cmd[0]
-                    self.cmd_body = cmd[2]
+    def parse_commands(self, cmds):
+        '''yields the parsed commands
 
-                    if cmd_name == 'withweight':
-                        weight = int(round(float(self.cmd_body))) # TODO source for rounding to next integer
-                    else:
-                        break
-                    j += 1
-                i = j-1
+        The error commands are not yielded. The errors are added to
+        self.errors instead, with the code of the glyph they belong to. An
+        error belongs to the glyph shipped out next, unless the picture
+        commands of its character are not written to the log file. Then the
+        charcode of the character is used. Errors outside of the characters
+        don't belong to a glyph.
 
-                # num_paths is the max number of overlaps
-                # if a or b exceed this number, all paths need to be combined
-                drop_pos = (
-                    keep_or_drop == 'dropping' and a == 1 and b >= num_paths
-                    or keep_or_drop == 'keeping' and a <= -num_paths and b == 0
-                )
-                drop_neg = ( # cullit
-                    keep_or_drop == 'dropping' and -a >= num_paths and b == 0
-                    or keep_or_drop == 'keeping' and a == 1 and b >= num_paths
-                )
-                if drop_pos or drop_neg:
-                    # TODO reverse before and after remove_overlap needed for drop_pos?
-                    self.remove_overlap(cull_pic_name)
+        Args:
+            cmds (iterable[tuple[str]]): name, line and body of the commands,
+                e.g. from read_commands()
 
-                    # TODO explain this section
-                    drop_contours = []
-                    temp_layer = self.pictures[cull_pic_name]
-                    corrected_picture = fontforge.layer()
-                    for c in self.pictures[cull_pic_name]:
-                        corrected_picture += deepcopy(c)
-                    corrected_picture = corrected_picture.correctDirection()
-                    for j, (cl, l) in enumerate(zip(corrected_picture, self.pictures[cull_pic_name])):
-                        if (
-                            drop_pos and cl.isClockwise() == l.isClockwise()
-                            or drop_neg and cl.isClockwise() != l.isClockwise()
-                        ):
-                            drop_contours.append(j)
-                    self.pictures[cull_pic_name] = fontforge.layer()
-                    for k, c in enumerate(temp_layer):
-                        if k not in drop_contours:
-                            self.pictures[cull_pic_name] += temp_layer[k]
-                elif keep_or_drop == 'dropping' and a == 0 and b == 0:
-                    # everything non-zero will stay
-                    self.remove_overlap(cull_pic_name)
-                    self.pictures[cull_pic_name].correctDirection()
-                elif keep_or_drop == 'keeping' and a == 0 and b == 0:
-                    print('! cull V keeping (0, 0) isn\'t allowed (see The METAFONTbook, p. 120)')
-                    print('  ignoring this cull command')
-                elif keep_or_drop == 'keeping':
-                    # TODO check usage of a and b here, b not used
-                    contour_combinations = list(combinations(self.pictures[cull_pic_name], a))
-                    and_layers = []
-                    for j in range(len(contour_combinations)):
-                        j_layer = fontforge.layer()
-                        for k, c in enumerate(contour_combinations[j]):
-                            j_layer += c
-                            if k != 0:
-                                # intersect only works in a glyph
-                                self.proc_glyph.layers[1] = j_layer
-                                self.proc_glyph.intersect()
-                                j_layer = self.proc_glyph.layers[1]
-                        and_layers.append(j_layer)
-                    keeping_layer = fontforge.layer()
-                    # combine all layers
-                    for l in and_layers:
-                        keeping_layer += l
-
-                    self.proc_glyph.layers[1] = keeping_layer
-                    # TODO: suppress warning during overlap removal:
-                    # 'Internal Error (overlap) in proc_glyph: Neither needed nor unneeded'
-
-                    # The removeOverlap() method sometimes creates warnings
-                    # while result is OK. They can't be suppressed with
-                    # temporarily redirecting stdout or with echo OFF. Therefor
-                    # ANSI Control Sequences are used to remove them. They start
-                    # with the hexadecimal code of the escape character
-                    # (\x1b), followed by the Control Sequence Introducer,
-                    # an opening bracket ([). The letter after the bracket
-                    # specifies the control sequence. The letter may be preceded
-                    # by a number whose meaning depends on the control sequence.
-
-                    # Before the removeOverlap() method is called, the current
-                    # cursor position is saved with \x1b[s. After the call of
-                    # the command there may be a warning which should be
-                    # suppressed. To hide it, The cursor is restored to the
-                    # saved position with \x1b[u. Since the waring contains a
-                    # line break, the cursor needs to move one line up (\x1b[A).
-                    # TODO multiple lines up?
-                    # \x1b[J erases the warning.
-                    # TODO what does \x1b[J do or erase exactly
-                    print('\x1b[s', end = '')
-                    self.proc_glyph.removeOverlap()
-                    print('\x1b[u\x1b[A\x1b[J', end = '')
-
-                    keeping_layer = self.proc_glyph.layers[1]
-                    if weight < 0:
-                        # reverse cull result for negative weight
-                        keeping_layer.reverseDirection()
-                    # Add the contours multiple times by the absolute value of
-                    # the weight and reduce the multiple layers to a single one.
-                    # The result is the new picture after culling it.
-                    self.pictures[cull_pic_name] = reduce(lambda x, y: x + y, [keeping_layer]*abs(weight))
+        Yields:
+            Command: the parsed command
+        '''
+        pending_errors = [] # errors belonging to the glyph shipped out next
+        quiet_charcode = None # charcode of the current character if it's not generated
+        pen = None # last withpen command, its path is reused for the same pen
+        for cmd in cmds:
+            name, line, body = cmd
+            if name == 'error':
+                error = {
+                    'charcode': quiet_charcode,
+                    'line': int(line) if line else None,
+                    'message': body.split('\n', 1)[0][2:],
+                    'text': body,
+                }
+                self.errors.append(error)
+                if quiet_charcode is None:
+                    pending_errors.append(error)
+                continue
+            if name == 'withpen' and pen is not None and body == pen.body:
+                cmd = Command(name, int(line) if line else None, body, pen.value)
+            else:
+                cmd = self.parse_command(cmd)
+            if name == 'withpen':
+                pen = cmd
+            elif name == 'char':
+                # The errors before the character don't belong to a glyph.
+                pending_errors = []
+                if body.split('>> ')[-1] == 'true':
+                    quiet_charcode = None
                 else:
-                    print('! cull not fully supported yet.')
+                    quiet_charcode = int(round(float(body.split('>> ')[1])))
+            elif name == 'shipout':
+                for error in pending_errors:
+                    error['charcode'] = round(cmd.value[0]) + round(cmd.value[1])*256
+                pending_errors = []
+            yield cmd
+
+    def write_error_report(self):
+        '''writes self.errors to the file jobname.errors.json
+        '''
+        with open(self.jobname + '.errors.json', 'w') as f:
+            json.dump(self.errors, f, indent=1)
+        self.print_error_summary()
 
-            elif cmd_name == 'picture':
-                for pic_name in self.split_pattern.split(self.cmd_body):
-                    # create layer for each picture
-                    pic_name = pic_name[1:-1] # clip quotes
-                    self.pictures[pic_name] = fontforge.layer()
+    def print_error_summary(self):
+        '''prints the number of METAFONT errors in self.errors if there are
+        any
+        '''
+        if self.errors:
+            print(str(len(self.errors)) + ' METAFONT errors, see ' + self.jobname + '.errors.json')
 
-            elif cmd_name == 'pic_eqn':
-                j = i+1
-                j_eq = [i-1]
-                complex_expressions = []
-                while j < len(cmds):
-                    if cmds[j][0] not in ('pic', 'eq', 'as', 'pl', 'mi'):
-                        break
-                    elif cmds[j][0] in ('eq', 'as'):
-                        if j-j_eq[-1] < 2:
-                            complex_expressions.append(j)
-                            if len(complex_expressions) > 1:
-                                print('! ignoring complex picture expression')
-                        j_eq += [j]
-                    j += 1
+    def parse_command(self, cmd):
+        '''parses the body of a command written to the log file
 
-                j_eq += [j]
+        The value of the command depends on its name:
+        - addto, cull, also, pic and pic_eqn: the picture's name
+        - picture: list of the pictures' names
+        - contour, doublepath and withpen: the path as Path
+        - turningcheck, turningnumber and withweight: the number
+        - keeping and dropping: tuple of the two numbers
+        - shipout: tuple of the ten numbers shown at the shipout
+        - all other commands: None, their body is used directly
 
-                for k in j_eq[:-2]:
-                    if len(complex_expressions) == 0:
-                        if cmds[k-1][0] != 'mi':
-                            self.pictures[cmds[k+1][2][1:-1]] = fontforge.layer()
-                            for c in self.pictures[cmds[j_eq[-2]+1][2][1:-1]]:
-                                self.pictures[cmds[k+1][2][1:-1]] += c
-                        else:
-                            self.pictures[cmds[k+1][2][1:-1]] = fontforge.layer()
-                            for c in self.pictures[cmds[j_eq[-2]+1][2][1:-1]]:
-                                self.pictures[cmds[k+1][2][1:-1]] += c
-                            self.pictures[cmds[k+1][2][1:-1]] = self.pictures[cmds[k+1][2][1:-1]].reverseDirection()
-                    else:
-                        for k in range(i,j):
-                            if k in complex_expressions[1:]:
-                                for l in range(j_eq[k-1], j_eq[k], 2):
-                                    if cmds[l][2] == 'pic':
-                                        if cmds[l-1][2] in ('eq', 'as', 'pl'):
-                                            self.pictures[cmds[j_eq[-1]][2][1:-1]] += self.pictures[cmds[l][2][1:-1]]
-                                        elif cmds[l-1][2] == 'mi':
-                                            self.pictures[cmds[j_eq[-1]][2][1:-1]] += self.pictures[cmds[l][2][1:-1]].reverseDirection()
-                i = j_eq[-1]-1
+        Args:
+            cmd (tuple[str]): name, line and body of a command
 
-            elif cmd_name == 'shipout':
-                shipout = self.shipout_pattern.search(self.cmd_body)
+        Returns:
+            Command: the parsed command
+        '''
+        name, line, body = cmd
+        if name in ('addto', 'cull', 'also', 'pic', 'pic_eqn'):
+            value = body[1:-1] # clip quotes
+        elif name == 'picture':
+            value = [pic_name[1:-1] for pic_name in self.split_pattern.split(body)]
+        elif name in ('contour', 'doublepath', 'withpen'):
+            value = self.parse_path(body)
+        elif name in ('turningcheck', 'turningnumber', 'withweight'):
+            value = float(body)
+        elif name in ('keeping', 'dropping'):
+            value = tuple(float(n) for n in self.pair_pattern.search(body).groups())
+        elif name == 'shipout':
+            value = tuple(float(n) for n in self.shipout_pattern.search(body).groups())
+        else:
+            value = None
+        return Command(name, int(line) if line else None, body, value)
 
-                # "The values of xoffset, yoffset, charcode , and charext are
-                # first rounded to integers, if necessary." (The METAFONTbook,
-                # p. 220)
-                charcode = round(float(shipout.group(1)))
-                charext = round(float(shipout.group(2)))
-                charwd = int(float(shipout.group(3)))
-                charht = int(float(shipout.group(4)))
-                chardp = int(float(shipout.group(5)))
-                charic = int(float(shipout.group(6)))
-                # 7 and 8 are chardx, chardy
-                xoffset = round(float(shipout.group(9)))
-                yoffset = round(float(shipout.group(10)))
+    def parse_path(self, path):
+        '''parses the description of a path written to the log file
 
-                glyph_code = charcode + charext*256
-                pic_name = cmds[i+1][2][1:-1] # clip quotes
-                pic = self.pictures[pic_name]
+        Args:
+            path (str): description of the path
 
-                if self.options['remove-artifacts']:
-                    self.remove_artefacts(pic)
+        Returns:
+            Path: the parsed path
+        '''
+        p = self.pair_pattern.search(path)
+        coords = array('d', (float(p.group(1)), float(p.group(2))))
+        cyclic = False
+        for j in self.join_pattern.finditer(path, p.end()):
+            if j.group(7) is None: # j.group(7) is cycle
+                coords.extend(float(n) for n in j.group(1, 2, 3, 4, 5, 6))
+            else: # path is closed by connecting to first point `p`
+                coords.extend(float(n) for n in j.group(1, 2, 3, 4))
+                coords.extend(coords[:2])
+                cyclic = True
+                break
+        return Path(coords, cyclic)
 
-                glyph = self.font.createChar(glyph_code,)
-                glyph.layers[1] = pic
+    def set_up_processing(self):
+        '''sets up the objects needed by process_commands()
+        '''
+        # picture variables are processed inside fontforge using layers.
+        # A dict is used to keep track of the pictures
+        self.pictures = {}
+        self.pictures['nullpicture'] = Picture() # predefined empty picture
 
-                glyph.width = charwd
-                glyph.texheight = charht
-                glyph.texdepth = chardp
-                glyph.italicCorrection = charic
+        # a separate font object with a dedicated glyph is used for
+        # processing
+        internal_font = fontforge.font()
+        self.proc_glyph = internal_font.createChar(-1, 'proc_glyph')
 
-                if xoffset != 0 or yoffset != 0:
-                    # "The pixels of v are shifted by (xoffset, yoffset) as they
-                    # are shipped out." (The METAFONTbook, p. 220)
-                    glyph.transform((1.0, 0.0, 0.0, 1.0, xoffset, yoffset))
-                    pass
+        # keep a record of ligtable's skipto labels
+        self.skiptos = {}
 
-                if self.ascent == 0 and charht > self.font.ascent:
-                    self.font.ascent = charht
-                if self.descent == 0 and chardp > self.font.descent:
-                    self.font.descent = chardp
+        # code points and glyphs created by shipout commands
+        self.shipped_glyphs = []
 
-                i += 1
+        # A font uses only a few different pens, so they are classified only
+        # once, see get_pen()
+        self.pens = {}
 
-            elif cmd_name == 'ligtable':
-                cmd_body_parts = self.cmd_body.split('>> ')
-                hppp = float(cmd_body_parts[0])
-                self.cmd_body = cmd_body_parts[1]
+        # results of stroke_paths() by the paths moved to the origin, the pen
+        # and the stroke arguments, least recently used first
+        self.stroke_cache = OrderedDict()
+        self.stroke_cache_hits = 0
+        self.stroke_cache_misses = 0
 
-                self.sub_list = []
-                pos_list = []
-                self.tmp_list = []
+        # number of glyph segments found and not found in the glyph cache
+        self.glyph_cache_hits = 0
+        self.glyph_cache_misses = 0
 
-                j = i+1
-                while j < len(cmds):
-                    cmd = cmds[j]
-                    cmd_name = cmd[0]
-                    self.cmd_body = cmd[2].split('>> ')[0]
-                    self.last_cmd_body = cmds[j-1][2].split('>> ')[-1]
+    def process_commands_in_segments(self, start_time_ff, cmds):
+        '''processes the commands cmds segment by segment
 
-                    if cmd_name == ':':
-                        self.tmp_list.append([[self.last_cmd_body.split('"')[1] if self.last_cmd_body[0] == '"' else int(float(self.last_cmd_body))]])
-                    elif cmd_name == '::':
-                        if self.last_cmd_body in self.skiptos:
-                            self.tmp_list += self.skiptos[self.last_cmd_body]
-                    elif cmd_name == ':||':
-                        print('! ligtable :|| not supported yet, ignored')
-                    elif cmd_name == 'kern':
-                        char = self.last_cmd_body
-                        kern = self.cmd_body
-                        char = char[1:-1] if char[0] == '"' else int(float(char))
-                        kern = int(float(kern)*hppp)
-                        pos_list += deepcopy(self.tmp_list)
-                        for k in range(len(pos_list)-len(self.tmp_list),len(pos_list)):
-                            pos_list[k] = [pos_list[k][0] + [char]] + [kern]
-                    elif '=:' in cmd_name:
-                        cmd_name_parts = cmd_name.split('=:',1)
-                        lig_type = '=:' # start with the characters in the center
-                        if 'p' in cmd_name_parts[0]:
-                            lig_type = '|' + lig_type
-                        else:
-                            lig_type = ' ' + lig_type
-                        if 'p' in cmd_name_parts[1]:
-                            lig_type = lig_type + '|'
-                        else:
-                            lig_type = lig_type + ' '
-                        if 'g' in cmd_name_parts[1]:
-                            lig_type = lig_type + '>'
-                            print('! ligtable > and >> not supported yet, they will be ignored')
-                        else:
-                            lig_type = lig_type + ' '
-                        if 'gg' in cmd_name_parts[1]:
-                            # add a second > (or second space)
-                            lig_type = lig_type + '>'
-                        else:
-                            lig_type = lig_type + ' '
+        The commands are split into segments by split_segments(). The segments
+        of the glyphs are processed by process_glyph_segment(), in
+        self.options['jobs'] worker processes if there is more than one job.
+        Each segment gets the pictures it uses before assigning them. The
+        results are merged in the order of the segments, so the font is the
+        same as with process_commands(). All other segments are processed in
+        this process after all previous segments are merged. If option
+        glyph-cache is set, the results are stored in the glyph cache and
+        segments found in it are not processed again.
 
-                        char = self.last_cmd_body
-                        lig = self.cmd_body
-                        char = char[1:-1] if char[0] == '"' else int(float(char))
-                        lig = lig [1:-1] if lig [0] == '"' else int(float(lig ))
-                        self.sub_list += deepcopy(self.tmp_list)
-                        for i in range(len(self.sub_list)-len(self.tmp_list), len(self.sub_list)):
-                            self.sub_list[i] = [lig, lig_type] + [self.sub_list[i][0] + [char]]
-                    elif cmd_name == 'skipto':
-                        self.skiptos[self.last_cmd_body] = self.tmp_list
+        Args:
+            start_time_ff (float): start time of fontforge from time.time()
+            cmds (iterable[tuple[str]]): commands, e.g. from read_commands()
+        '''
+        num_cmds = 0
+        # assigned pictures, futures and glyph cache keys (if the result should
+        # be stored) of the glyph segments not merged yet
+        pending = deque()
+        def merge_next():
+            _, future, cache_key = pending.popleft()
+            result = future.result()
+            glyphs, pictures = result[0], result[1]
+            if cache_key is not None:
+                self.store_in_glyph_cache(cache_key, result[:2])
+            if len(result) > 2 and result[2] is not None:
+                self.profiler.merge(result[2])
+            for name, data in pictures.items():
+                self.pictures[name] = picture_from_data(data)
+            for glyph_data in glyphs:
+                self.add_glyph(*glyph_data)
+
+        if self.options['jobs'] > 1:
+            executor = ProcessPoolExecutor(self.options['jobs'])
+        else:
+            executor = None
+        try:
+            for is_glyph, segment in self.split_segments(cmds):
+                num_cmds += len(segment)
+                for cmd in segment:
+                    if cmd.line is not None:
+                        self.last_known_line = cmd.line
+                if is_glyph:
+                    reads, writes = self.picture_accesses(segment)
+                    # The pictures read by the segment need to be up to date,
+                    # i.e. all previous segments assigning them are merged.
+                    while any(reads & pending_writes for pending_writes, _, _ in pending):
+                        merge_next()
+                    pictures = {name: picture_to_data(self.pictures[name]) for name in reads if name in self.pictures}
+                    cache_key = None
+                    result = None
+                    if self.options['glyph-cache']:
+                        cache_key = self.get_glyph_cache_key(segment, pictures)
+                        result = self.load_from_glyph_cache(cache_key)
+                    if result is not None:
+                        self.glyph_cache_hits += 1
+                        future = Future()
+                        future.set_result(result)
+                        cache_key = None
                     else:
-                        break
-                    j += 1
-                i = j-1
+                        if self.options['glyph-cache']:
+                            self.glyph_cache_misses += 1
+                        if executor is None:
+                            future = Future()
+                            future.set_result(process_glyph_segment(self.options, self.params, segment, pictures))
+                        else:
+                            future = executor.submit(process_glyph_segment, self.options, self.params, segment, pictures)
+                    pending.append((writes, future, cache_key))
+                    # limit the number of results waiting to be merged
+                    if len(pending) > 2*self.options['jobs']:
+                        merge_next()
+                else:
+                    while pending:
+                        merge_next()
+                    self.process_commands(None, segment)
+                self.show_progress(start_time_ff, num_cmds-1)
+            while pending:
+                merge_next()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def get_glyph_cache_key(self, segment, pictures):
+        '''return the key of a glyph's segment in the glyph cache
+
+        The key depends on the names and bodies of the segment's commands (not
+        their line numbers), the pictures the segment reads, the options and
+        parameters affecting the processing and the versions of mf2ff and
+        fontforge.
 
-                if len(self.sub_list) > 0:
-                    for sub in self.sub_list:
-                        lig = self.to_glyph_name(sub[0])
-                        lig_type = sub[1]
-                        char1 = self.to_glyph_name(sub[2][0])
-                        char2 = self.to_glyph_name(sub[2][1])
-                        if lig_type[0] == ' ' and lig_type[3] == ' ':
-                            if not 'gsub_ligature' in self.font.gsub_lookups:
-                                self.font.addLookup( 'gsub_ligature', 'gsub_ligature', (), (('liga', self.scripts),))
-                                self.font.addLookupSubtable('gsub_ligature', 'gsub_ligature_subtable')
-                            # Try to create the ligature. FontForge will
-                            # raise a TypeError, if one of the
-                            # characters is unknown. In that case, print
-                            # a warning and continue
-                            try:
-                                self.font[lig].addPosSub('gsub_ligature_subtable', (char1, char2))
-                            except TypeError as e:
-                                print('! Error while adding ligature: ', e, 'either '+repr(char1)+' or '+repr(char2)+' is unknown. Ignored.')
-                        elif lig_type[0] == '|' and lig_type[3] == ' ':
-                            if not 'gsub_single_after_' + char1 in self.font.gsub_lookups:
-                                self.font.addLookup('gsub_single_after_' + char1, 'gsub_single', (), ())
-                                self.font.addLookupSubtable('gsub_single_after_' + char1, 'gsub_single_after_' + char1 + '_subtable')
-                            self.font[char2].addPosSub('gsub_single_after_' + char1 + '_subtable', lig)
-                            if not 'gsub_contextchain' in self.font.gsub_lookups:
-                                self.font.addLookup('gsub_contextchain', 'gsub_contextchain', (), (('calt', self.scripts),))
-                            self.font.addContextualSubtable(
-                                'gsub_contextchain', 'gsub_contextchain_subtable_' + char1 + '_' + char2, 'glyph',
-                                char1 + ' | ' + char2 + ' @<gsub_single_after_' + char1 + '> |'
-                            )
-                        elif lig_type[0] == ' ' and lig_type[3] == '|':
-                            if not 'gsub_single_before_' + char2 in self.font.gsub_lookups:
-                                self.font.addLookup('gsub_single_before_' + char2, 'gsub_single', (), ())
-                                self.font.addLookupSubtable('gsub_single_before_' + char2, 'gsub_single_before_' + char2 + '_subtable')
-                            self.font[char1].addPosSub('gsub_single_before_' + char2 + '_subtable', lig)
-                            if not 'gsub_contextchain' in self.font.gsub_lookups:
-                                self.font.addLookup('gsub_contextchain', 'gsub_contextchain', (), (('calt', self.scripts),))
-                            self.font.addContextualSubtable(
-                                'gsub_contextchain', 'gsub_contextchain_subtable_' + char1 + '_' + char2, 'glyph',
-                                '| ' + char1 + ' @<gsub_single_before_' + char2 + '> | ' + char2
-                            )
-                        elif lig_type[0] == '|' and lig_type[3] == '|':
-                            if not 'gsub_multiple_between_' + char1 + '_' + char2 in self.font.gsub_lookups:
-                                self.font.addLookup('gsub_multiple_between_' + char1 + '_' + char2, 'gsub_multiple', (), ())
-                                self.font.addLookupSubtable('gsub_multiple_between_' + char1 + '_' + char2, 'gsub_multiple_between_' + char1 + '_' + char2 + '_subtable')
-                            self.font[char2].addPosSub('gsub_multiple_between_' + char1 + '_' + char2 + '_subtable', (lig, char2))
-                            if not 'gsub_contextchain' in self.font.gsub_lookups:
-                                self.font.addLookup('gsub_contextchain', 'gsub_contextchain', (), (('calt', self.scripts),))
-                            self.font.addContextualSubtable(
-                                'gsub_contextchain', 'gsub_contextchain_subtable_' + char1 + '_' + char2, 'glyph',
-                                char1 + ' | ' + char2 + ' @<gsub_multiple_between_' + char1 + '_' + char2 + '> |'
-                            )
+        Args:
+            segment (list[Command]): the glyph's commands
+            pictures (dict[str, list]): data of the pictures read by the
+                segment, see picture_to_data()
 
-                if len(pos_list) > 0:
-                    if not 'gpos_pair' in self.font.gpos_lookups:
-                        self.font.addLookup('gpos_pair', 'gpos_pair', (), (('kern', self.scripts),))
-                        self.font.addLookupSubtable('gpos_pair', 'gpos_pair_subtable')
-                    for pos in pos_list:
-                        char1 = self.to_glyph_name(pos[0][0])
-                        char2 = self.to_glyph_name(pos[0][1])
-                        kern = pos[1]
-                        try:
-                            self.font[char1].addPosSub('gpos_pair_subtable', char2, 0, 0, kern, 0, 0, 0, 0, 0)
-                        except TypeError as e:
-                            print('! Error while adding ligature: ', e, 'either '+repr(char1)+' or '+repr(char2)+' is unknown. Ignored.')
+        Returns:
+            str: hexadecimal SHA-256 hash
+        '''
+        data = json.dumps([
+            __version__,
+            self.GLYPH_CACHE_FORMAT,
+            fontforge.version(),
+            {name: value for name, value in self.options.items() if name not in self.OUTPUT_OPTIONS},
+            self.params,
+            [(cmd.name, cmd.body) for cmd in segment],
+            pictures,
+        ], sort_keys=True)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def load_from_glyph_cache(self, key):
+        '''loads the result of process_glyph_segment() from the glyph cache
 
-            elif cmd_name == 'fontdimen':
-                cmd_body_parts = self.cmd_body.split('>> ')
-                hppp = float(cmd_body_parts[0])
-                first_fontdimen = int(cmd_body_parts[1])
-                params = [float(p) for p in cmds[i+1][2].split('>> ')]
-                i += 1
-                for j, k in enumerate(range(first_fontdimen, first_fontdimen + len(params))):
-                    if k == 2:
-                        self.font.createChar(32).width = int(hppp*params[j])
+        Args:
+            key (str): key from get_glyph_cache_key()
 
-            # TODO: charlist, extensible
+        Returns:
+            list: the result or None if it isn't in the glyph cache
+        '''
+        path = os.path.join(self.options['glyph-cache'], key[:2], key + '.json')
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
 
-            elif cmd_name == 'end':
-                design_size = int(self.cmd_body)
-                if design_size != 0:
-                    self.font.design_size = design_size
+    def store_in_glyph_cache(self, key, result):
+        '''stores the result of process_glyph_segment() in the glyph cache
 
-            else:
-                print('! "' + cmd_name + '": ' + self.cmd_body + '?')
-                print('  This may be a syntax error. Run file with METAFONT to find it.')
-                print('  If the input is correct, consider reporting a bug.')
-            i += 1
+        The file is written under a temporary name and renamed afterwards, so
+        other runs sharing the glyph cache never read an incomplete file.
 
-    def apply_font_options_and_save(self):
-        '''apply self.options to self.font and generate font file from self.font
-        based on self.options
+        Args:
+            key (str): key from get_glyph_cache_key()
+            result (tuple): result of process_glyph_segment()
         '''
-        if self.options['extrema']:
-            self.font.selection.all()
-            self.font.addExtrema()
-        if self.options['hint']:
-            self.font.autoHint()
-            self.font.autoInstr()
-        if self.options['sfd']:
-            self.font.save(self.jobname + '.sfd')
-        if  self.options['otf']:
-            self.font.generate(self.jobname + '.otf')
-        if  self.options['ttf']:
-            self.font.generate(self.jobname + '.ttf', flags='opentype')
+        directory = os.path.join(self.options['glyph-cache'], key[:2])
+        os.makedirs(directory, exist_ok=True)
+        temp_path = os.path.join(directory, key + '.' + str(os.getpid()) + '.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(result, f)
+        os.replace(temp_path, os.path.join(directory, key + '.json'))
 
+    def get_mf_version(self):
+        '''return the version of METAFONT
 
-    def check_scripts(self, scripts):
-        '''checks if scripts has the correct structure
+        mf --version is only run once for every executable, the version is
+        kept in MF_VERSIONS by the path, modification time and size of the
+        executable.
+
+        Returns:
+            str: first line of mf --version, empty if mf can't be run
+        '''
+        mf_path = shutil.which('mf')
+        if mf_path is None:
+            return ''
+        try:
+            stat = os.stat(mf_path)
+        except OSError:
+            return ''
+        key = (mf_path, stat.st_mtime_ns, stat.st_size)
+        if key not in MF_VERSIONS:
+            try:
+                MF_VERSIONS[key] = subprocess.run(
+                    [mf_path, '--version'],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    universal_newlines=True
+                ).stdout.split('\n', 1)[0]
+            except OSError:
+                return ''
+        return MF_VERSIONS[key]
+
+    def get_store_key(self, user_first_line):
+        '''return the key of the manifest in the build store
+
+        The key depends on everything the generated files depend on except the
+        input files METAFONT reads: the first line passed to METAFONT, the
+        options, parameters and font properties and the versions of mf2ff,
+        METAFONT and fontforge. Paths inside of the working directory are
+        relative and the output directory is left out, so copies of the
+        sources in other directories share the key.
 
         Args:
-            scripts (any): variable to check for correct structure
+            user_first_line (str): first line given by the user
 
         Returns:
-            bool: whether scripts has the correct structure
+            str: hexadecimal SHA-256 hash
         '''
-        if not isinstance(scripts, tuple):
+        mf_options = []
+        for option in self.mf_options:
+            if option.startswith('-jobname='):
+                option = '-jobname=' + relative_path(option[9:], self.cwd)
+            elif option.startswith('-output-directory='):
+                continue
+            mf_options.append(option)
+        data = json.dumps([
+            __version__,
+            self.get_mf_version(),
+            fontforge.version(),
+            mf_options,
+            # the parts of get_mf_first_line()
+            self.get_preloaded_code(),
+            relative_path(self.base, self.cwd) if self.base else '',
+            user_first_line,
+            relative_path(self.input_file, self.cwd),
+            relative_path(self.jobname, self.cwd),
+            {name: value for name, value in self.options.items() if name not in self.RUN_OPTIONS},
+            self.params,
+            [self.ascent, self.comment, self.copyright, self.descent,
+                self.designsize, self.encoding, self.family_name, self.fontlog,
+                self.fontname, self.font_version, self.fullname,
+                self.italicangle, self.scripts, self.upos, self.uwidth],
+        ], sort_keys=True)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def restore_from_store(self, store_key):
+        '''copies the generated files of a previous run from the build store
+
+        The manifest of store_key lists the hashes of the input files of
+        previous runs. If all input files of one of them are unchanged, its
+        files are copied and its errors are loaded into self.errors. The paths
+        of the input files inside of the working directory are relative to it,
+        see add_to_store().
+
+        Args:
+            store_key (str): key from get_store_key()
+
+        Returns:
+            bool: whether the files were found in the store
+        '''
+        manifest_path = os.path.join(self.options['store'], 'manifests', store_key + '.json')
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (IOError, ValueError):
             return False
+        file_hashes = {}
+        for entry in manifest:
+            for path, file_hash in entry['inputs'].items():
+                if path not in file_hashes:
+                    try:
+                        file_hashes[path] = hash_file(os.path.join(self.cwd, path))
+                    except IOError:
+                        file_hashes[path] = None
+                if file_hashes[path] != file_hash:
+                    break
+            else:
+                object_dir = os.path.join(self.options['store'], 'objects', entry['object'])
+                if not os.path.isdir(object_dir):
+                    continue
+                for extension in self.STORED_EXTENSIONS:
+                    object_path = os.path.join(object_dir, 'output' + extension)
+                    if os.path.isfile(object_path):
+                        shutil.copyfile(object_path, self.jobname + extension)
+                print('Restored generated files from the store')
+                try:
+                    with open(os.path.join(object_dir, 'output.errors.json'), 'r') as f:
+                        self.errors = json.load(f)
+                except (IOError, ValueError):
+                    self.errors = []
+                self.print_error_summary()
+                return True
+        return False
+
+    def add_to_store(self, store_key, recorder_path, log_path):
+        '''copies the generated files to the build store and adds the hashes
+        of the input files to the manifest of store_key
+
+        Files and manifests are written under temporary names and renamed
+        afterwards, so other runs sharing the store never read incomplete
+        files.
 
-        for item in scripts:
-            if (not isinstance(item, tuple)
-                or len(item) != 2
-                or not isinstance(item[0], str)
-                or not isinstance(item[0], tuple)
-            ):
-                return False
-            for element in item[1]:
-                if not isinstance(element, str):
-                    return False
+        Args:
+            store_key (str): key from get_store_key()
+            recorder_path (str): path of METAFONT's .fls file
+            log_path (str): path of the cleaned up log file
+        '''
+        try:
+            input_files = read_recorder_file(recorder_path)
+        except IOError:
+            print('! I can\'t find file: `' + recorder_path + '\'.')
+            print('  The generated files are not added to the store.')
+            return
+        # The input files inside of the working directory are stored by their
+        # relative paths, the others like plain.mf by their absolute paths.
+        inputs = {
+            relative_path(path, self.cwd): hash_file(path)
+            for path in input_files if os.path.isfile(path)
+        }
+        object_key = hashlib.sha256(
+            json.dumps([store_key, inputs], sort_keys=True).encode('utf-8')
+        ).hexdigest()
+
+        object_dir = os.path.join(self.options['store'], 'objects', object_key)
+        if not os.path.isdir(object_dir):
+            temp_dir = object_dir + '.' + str(os.getpid()) + '.tmp'
+            os.makedirs(temp_dir, exist_ok=True)
+            for extension in self.STORED_EXTENSIONS:
+                path = log_path if extension == '.log' else self.jobname + extension
+                if (extension in ('.log', '.errors.json') or self.options[extension[1:]]) and os.path.isfile(path):
+                    shutil.copyfile(path, os.path.join(temp_dir, 'output' + extension))
+            try:
+                os.replace(temp_dir, object_dir)
+            except OSError:
+                # another run added the same files in the meantime
+                shutil.rmtree(temp_dir)
+
+        manifest_dir = os.path.join(self.options['store'], 'manifests')
+        manifest_path = os.path.join(manifest_dir, store_key + '.json')
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (IOError, ValueError):
+            manifest = []
+        entry = {'inputs': inputs, 'object': object_key}
+        if entry not in manifest:
+            manifest = [entry] + manifest[:self.params['store']['manifest-entries']-1]
+            os.makedirs(manifest_dir, exist_ok=True)
+            temp_path = manifest_path + '.' + str(os.getpid()) + '.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(manifest, f)
+            os.replace(temp_path, manifest_path)
+
+    def drop_font_tables(self, cmds):
+        '''yields the commands except the ligtable and fontdimen commands
+
+        Used if only some characters are generated again. The ligtables and
+        font dimensions are already in the existing font.
 
-    def get_redefinitions(self):
-        '''return mf code containing redefinitions needed for mf2ff
+        Args:
+            cmds (iterable[Command]): commands, e.g. from parse_commands()
+
+        Yields:
+            Command: the command
+        '''
+        for is_glyph, segment in self.split_segments(cmds):
+            if is_glyph or segment[0].name not in ('ligtable', 'fontdimen'):
+                yield from segment
+
+    def get_dependency_settings(self, user_first_line):
+        '''return a hash of everything except the input files which the
+        generated font depends on
+
+        Args:
+            user_first_line (str): first line given by the user
 
         Returns:
-            str: mf code
+            str: hexadecimal SHA-256 hash
         '''
-        # abbreviations for inserting log file markers for redefined tokens
-        M = self.MARKER
-        m_ = 'message "'+M # begin redefined token, followed by token name or identifier
-        m__ = m_+'";'      # end of redefined token, possibly preceded by an expression
-        mm_ = m__+m_       # end of redefined token and begin of new redefined token
-        return (
-            # First, some mf primitives are saved, so they are accessible even
-            # after redefining them.
-            'let __mfIIvec__orig_colon__ = : ;'
-            'let __mfIIvec__orig_else__ = else;'
-            'let __mfIIvec__orig_elseif__ = elseif;'
-            'let __mfIIvec__orig_end__ = end;'
-            'let __mfIIvec__orig_eq__ = = ;'
-            'let __mfIIvec__orig_for__ = for;'
-            'let __mfIIvec__orig_forever__ = forever;'
-            'let __mfIIvec__orig_forsuffixes__ = forsuffixes;'
-            'let __mfIIvec__orig_if__ = if;'
-            'let __mfIIvec__orig_pen__ = pen;'
-            'let __mfIIvec__orig_picture__ = picture;'
-            'let __mfIIvec__orig_hide__ = hide;'
+        data = json.dumps([
+            __version__,
+            self.mf_options,
+            user_first_line,
+            self.input_file,
+            self.base,
+            self.ppi,
+            {name: value for name, value in self.options.items() if name not in self.OUTPUT_OPTIONS},
+            self.params,
+        ], sort_keys=True)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def get_changed_charcodes(self, dependency_settings):
+        '''finds the characters affected by changes of the input files since
+        the dependency index was written
+
+        The lines of every input file are compared with the lines recorded in
+        the dependency index. Every changed line needs to be part of a
+        character, i.e. between its beginchar and endchar. The charcodes of
+        the indexed characters are stored in self.indexed_charcodes.
 
-            # Numerical equations should still be processed in mf to get the
-            # correct results. This is different for picture equations. They
-            # need to be evaluated in fontforge using boolean operations. To
-            # keep track of the type of equation, a boolean is used.
-            'boolean __mfIIvec__pic_eqn__; __mfIIvec__pic_eqn__ := false;'
+        Args:
+            dependency_settings (str): hash from get_dependency_settings()
 
-            ## redefinitions
-            # All redefinitions use the undelimited parameter text t, therefor
-            # all tokens of this command until the next semicolon (;) are
-            # processed according to the redefinition. This makes sure that the
-            # whole variable names are written to the log file and e.g. numeric
-            # expressions in the subscript are evaluated before writing it to
-            # the log file.
+        Returns:
+            set[int]: charcodes of the characters affected by the changes or
+                None if the whole font needs to be generated
+        '''
+        try:
+            with open(self.jobname + '.deps.json', 'r') as f:
+                index = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if index['settings'] != dependency_settings or not os.path.isfile(self.jobname + '.sfd'):
+            return None
+        # The characters need to be the same after generating them, see run().
+        self.indexed_charcodes = [char[0] for char in index['chars']]
+
+        charcodes = set()
+        for path, old_hashes in index['files'].items():
+            try:
+                new_hashes = hash_lines(path)
+            except IOError:
+                return None
+            if new_hashes == old_hashes:
+                continue
+            # charcode, first and last line of the file's characters
+            chars = [
+                (charcode, first, last) for charcode, char_path, first, last in index['chars']
+                if char_path == path and first is not None and last is not None
+            ]
+            matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+            for tag, i1, i2, _, _ in matcher.get_opcodes():
+                if tag == 'equal':
+                    continue
+                if i1 == i2:
+                    # lines inserted after line i1
+                    affected = [char for char in chars if char[1] <= i1 < char[2]]
+                    if not affected:
+                        return None
+                else:
+                    # lines i1+1 to i2 replaced or deleted
+                    affected = [char for char in chars if char[1] <= i2 and char[2] > i1]
+                    covered = set()
+                    for _, first, last in affected:
+                        covered.update(range(max(first, i1+1), min(last, i2)+1))
+                    if len(covered) < i2-i1:
+                        return None
+                charcodes.update(charcode for charcode, _, _ in affected)
+        return charcodes
+
+    def write_dependency_index(self, dependency_settings, recorder_path):
+        '''writes the dependency index used by get_changed_charcodes()
+
+        The index contains the hashes of the lines of all input files listed
+        in METAFONT's recorder file and the lines of the characters tracked by
+        self.sources.
 
-            ## colon (:)
-            # Since the if and for statements can be everywhere and they are
-            # using the colon too, it has to be redefined inside every if,
-            # elseif, else, for, forever and forsuffixes. The following
-            # subroutine should be called in a group when redefining statements
-            # that can contain colons which should be redefined, e.g. the colons
-            # in a ligtable or fontdimen statement. The subroutine should be
-            # called before evaluating the content of the statement so the colon
-            # definition changes to it original meaning if there is a if, for,
-            # etc. in the statement and back after the colon
-            'def __mfIIvec__redef_colon__ ='
-                # The following colon definition is made for being used when
-                # waiting for a colon a) separating boolean expression and
-                # conditional text (in if or elseif), b) after else or c)
-                # separating a loop header and loop text (in for, forsuffixes,
-                # forever) where the condition or the loop is inside a statement
-                # that needs to be redefined to write the statement to the log
-                # file but the colon is also used by that statement so it needs
-                # to be redefined as well, e.g. ligtable and fontdimen
-                # statements. Inside of __mfIIvec__special_colon__, the
-                # definition of the colon is switched back to
-                # __mfIIvec__other_colon__ which should be defined to add a
-                # message to the the log file that there was a colon.
-                'def __mfIIvec__special_colon__ ='
-                    '__mfIIvec__orig_hide__(let : = __mfIIvec__other_colon__;)'
-                    '__mfIIvec__orig_colon__ '
-                'enddef;'
-                # The following sparks are redefined by this subroutine to
-                # activate the __mfIIvec__special_colon__ (which deactivates
-                # itself).
-                'save if, elseif, else, for, forsuffixes, forever;'
-                'def if ='
-                    '__mfIIvec__orig_hide__(let : = __mfIIvec__special_colon__;)'
-                    '__mfIIvec__orig_if__ '
-                'enddef;'
-                'def elseif ='
-                    '__mfIIvec__orig_hide__(let : = __mfIIvec__special_colon__;)'
-                    '__mfIIvec__orig_elseif__ '
-                'enddef;'
-                'def else ='
-                    '__mfIIvec__orig_hide__(let : = __mfIIvec__special_colon__;)'
-                    '__mfIIvec__orig_else__ '
-                'enddef;'
-                'def for ='
-                    '__mfIIvec__orig_hide__(let : = __mfIIvec__special_colon__;)'
-                    '__mfIIvec__orig_for__ '
-                'enddef;'
-                'def forsuffixes ='
-                    '__mfIIvec__orig_hide__(let : = __mfIIvec__special_colon__;)'
-                    '__mfIIvec__orig_forsuffixes__ '
-                'enddef;'
-                'def forever ='
-                    '__mfIIvec__orig_hide__(let : = __mfIIvec__special_colon__;)'
-                    '__mfIIvec__orig_forever__ '
-                'enddef;'
-                # In ligtable and fontdimen every colon should match the message
-                # generating __mfIIvec__other_colon__ if they are not part of
-                # the condition or loop structure itself.
-                'let : = __mfIIvec__other_colon__;'
-            'enddef;'
+        Args:
+            dependency_settings (str): hash from get_dependency_settings()
+            recorder_path (str): path of METAFONT's .fls file
+        '''
+        try:
+            input_files = read_recorder_file(recorder_path)
+        except IOError:
+            print('! I can\'t find file: `' + recorder_path + '\'.')
+            print('  The next run will generate all characters.')
+            return
+        index = {
+            'settings': dependency_settings,
+            'files': {path: hash_lines(path) for path in input_files if os.path.isfile(path)},
+            'chars': self.sources.chars,
+        }
+        with open(self.jobname + '.deps.json', 'w') as f:
+            json.dump(index, f)
 
-            ## addto
-            # doublepath: "If p is not a cyclic path, this case reduces to the
-            # second case, with p replaced by the doubled-up path `p & reverse p
-            # & cycle' (unless p consists of only a single point, when the new
-            # path is simply `p .. cycle'). On the other hand if p is a cyclic
-            # path, this case reduces to two addto commands of the second type,
-            # in one of which p is reversed." (The METAFONTbook, p. 119)
-            'def addto text t = '+m_+'addto"; begingroup '
-                'save also, contour, doublepath, withpen, withweight;'
-                'def also              = ; '+mm_+'also";          show str enddef;'
-                'def contour    expr p = ; '+mm_+'turningcheck";  show turningcheck;'
-                                            +mm_+'turningnumber"; show turningnumber p;'
-                                            +mm_+'contour";       show p   enddef;'
-                'def doublepath expr p = ; '+mm_+'turningcheck";  show turningcheck;'
-                                            +mm_+'turningnumber"; show turningnumber p;'
-                                            +mm_+'doublepath";    show p   enddef;'
-                'def withpen           = ; '+mm_+'withpen";       show     enddef;'
-                'def withweight        = ; '+mm_+'withweight";    show     enddef;'
-                'show str t; endgroup; '+m__+
-            'enddef;'
+    def split_segments(self, cmds):
+        '''splits the commands into segments
 
-            ## cull
-            'def cull text t = '+m_+'cull"; begingroup '
-                'save keeping, dropping, withweight;'
-                'def keeping    = ; '+mm_+'keeping";    show enddef;'
-                'def dropping   = ; '+mm_+'dropping";   show enddef;'
-                'def withweight = ; '+mm_+'withweight"; show enddef;'
-                'show str t; endgroup; '+m__+
-            'enddef;'
+        Each glyph segment ends with a shipout command and contains all
+        commands since the previous segment. ligtable, fontdimen and end
+        commands form a segment together with the commands they consist of.
+        Commands before them that are not followed by a shipout command form a
+        separate segment.
 
-            ## picture
-            # Variables of type \dl{picture} are the only ones which operations
-            # are not processed by mf but outsourced to FontForge. Every time
-            # new variables of type picture are declared, the declarations are
-            # sent to FontForge by `show`ing the names of the variables to the
-            # log file. Furthermore, the names of the variables are converted
-            # into definitions: Every time the name of the variable name is
-            # processed, its name should show up in the log file. Due to the
-            # fact that mf processes \dl{picture} expressions with the same
-            # operators as in other expression types and these \dl{picture}
-            # operations needs to be sent to the log file, all operators only
-            # need to be redefined inside picture equations. The operations
-            # which can occur in a picture equation are := = - + (see
-            # METAFONTbook, pp. 115 and 214)
-            'def picture text t = '+m_+'picture";'
-                'forsuffixes p = t:'
-                    'show str p;'
-                    'vardef p text tt = '
-                        'if __mfIIvec__pic_eqn__:'
-                            +mm_+'pic"; show str p;'
-                        'else:'
-                            +m_+'pic_eqn";__mfIIvec__pic_eqn__:=true;begingroup '
-                                'save=,:=,+,-;'
-                                'def:=__mfIIvec__orig_eq__;'+mm_+'as";enddef;'
-                                'def=__mfIIvec__orig_eq__;'+mm_+'eq";enddef;'
-                                'def-__mfIIvec__orig_eq__;'+mm_+'mi";enddef;'
-                                'def+__mfIIvec__orig_eq__;'+mm_+'pl";enddef;'
-                            'show str p tt;endgroup;'
-                            'boolean __mfIIvec__pic_eqn__;__mfIIvec__pic_eqn__:=false;'+m__+
-                        'fi '
+        Args:
+            cmds (iterable[Command]): commands, e.g. from parse_commands()
+
+        Yields:
+            tuple[bool, list[Command]]: whether the segment is a glyph's
+                segment and the segment's commands
+        '''
+        ligtable_cmd_names = ('::', ':', 'pp:', 'kern', '=:', 'p=:', 'p=:g',
+            '=:p', '=:pg', 'p=:p', 'p=:pg', 'p=:pgg', 'skipto')
+        cmds = LogCommands(cmds)
+        segment = []
+        i = 0
+        while cmds.has(i):
+            cmds.release(i)
+            cmd_name = cmds[i].name
+            if cmd_name == 'shipout':
+                # The shipout command is followed by the picture shipped out.
+                segment += [cmds[k] for k in (i, i+1) if cmds.has(k)]
+                yield True, segment
+                segment = []
+                i += 2
+            elif cmd_name in ('ligtable', 'fontdimen', 'end'):
+                if segment:
+                    yield False, segment
+                segment = [cmds[i]]
+                i += 1
+                if cmd_name == 'ligtable':
+                    while cmds.has(i) and cmds[i].name in ligtable_cmd_names:
+                        segment.append(cmds[i])
+                        i += 1
+                elif cmd_name == 'fontdimen' and cmds.has(i):
+                    segment.append(cmds[i])
+                    i += 1
+                yield False, segment
+                segment = []
+            else:
+                segment.append(cmds[i])
+                i += 1
+        if segment:
+            yield False, segment
+
+    def picture_accesses(self, segment):
+        '''finds the pictures read and assigned by the commands in segment
+
+        Args:
+            segment (list[Command]): commands
+
+        Returns:
+            tuple[set[str], set[str]]: names of the pictures which are read
+                before they are assigned and the names of all assigned pictures
+        '''
+        reads = set()
+        writes = set()
+        def read(names):
+            reads.update(name for name in names if name not in writes)
+        i = 0
+        while i < len(segment):
+            cmd_name = segment[i].name
+            value = segment[i].value
+            if cmd_name in ('addto', 'cull'):
+                read([value])
+                writes.add(value)
+            elif cmd_name in ('also', 'pic'):
+                read([value])
+            elif cmd_name == 'shipout' and i+1 < len(segment):
+                read([segment[i+1].value])
+                i += 1
+            elif cmd_name == 'picture':
+                writes.update(value)
+            elif cmd_name == 'pic_eqn':
+                # The pictures after the last = or := are the right-hand side.
+                j = i+1
+                rhs_start = j
+                while j < len(segment) and segment[j].name in ('pic', 'eq', 'as', 'pl', 'mi'):
+                    if segment[j].name in ('eq', 'as'):
+                        rhs_start = j
+                    j += 1
+                lhs_names = [cmd.value for cmd in segment[i+1:rhs_start] if cmd.name == 'pic']
+                rhs_names = [cmd.value for cmd in segment[rhs_start:j] if cmd.name == 'pic']
+                if len(rhs_names) > 1 or any(cmd.name in ('pl', 'mi') for cmd in segment[i+1:j]):
+                    # complex expressions may read and assign every picture
+                    read([value] + lhs_names + rhs_names)
+                    writes.update(rhs_names)
+                else:
+                    read(rhs_names)
+                writes.add(value)
+                writes.update(lhs_names)
+                i = j-1
+            i += 1
+        return reads, writes
+
+    def add_glyph(self, glyph_code, layer_data, width, texheight, texdepth, italic_correction):
+        '''adds a glyph processed by process_glyph_segment() to self.font
+
+        Args:
+            glyph_code (int): code point of the glyph
+            layer_data (list): foreground layer, see layer_to_data()
+            width (int): advance width
+            texheight (int): TeX height
+            texdepth (int): TeX depth
+            italic_correction (int): italic correction
+        '''
+        glyph = self.font.createChar(glyph_code,)
+        glyph.layers[1] = layer_from_data(layer_data)
+        glyph.width = width
+        glyph.texheight = texheight
+        glyph.texdepth = texdepth
+        glyph.italicCorrection = italic_correction
+        self.update_ascent_and_descent(texheight, texdepth)
+        self.shipped_glyphs.append((glyph_code, glyph))
+
+    def set_font_properties(self):
+        '''sets the properties of self.font to the font properties of self
+
+        If only the changed characters are generated, the existing font keeps
+        its ascent and descent unless they are given, since
+        update_ascent_and_descent() only raises them for the glyphs shipped
+        out in this run.
+        '''
+        if self.rebuilt_charcodes is None or self.ascent:
+            self.font.ascent = self.ascent
+        self.font.comment = self.comment
+        self.font.copyright = self.copyright
+        if self.rebuilt_charcodes is None or self.descent:
+            self.font.descent = self.descent
+        self.font.design_size = self.designsize
+        self.font.encoding = self.encoding
+        self.font.familyname = self.family_name
+        self.font.fontlog = self.fontlog
+        self.font.fontname = self.fontname
+        self.font.version = self.font_version
+        self.font.fullname = self.fullname
+        self.font.italicangle = self.italicangle
+        self.font.upos = self.upos
+        self.font.uwidth = self.uwidth
+
+    def update_ascent_and_descent(self, charht, chardp):
+        '''increases the font's ascent and descent if they are not given and
+        the glyph's height and depth exceed them
+
+        Args:
+            charht (int): height of a glyph
+            chardp (int): depth of a glyph
+        '''
+        if self.ascent == 0 and charht > self.font.ascent:
+            self.font.ascent = charht
+        if self.descent == 0 and chardp > self.font.descent:
+            self.font.descent = chardp
+
+    def process_commands(self, start_time_ff, cmds):
+        '''processes the commands cmds
+
+        shows progress and eta based on start_time_ff
+
+        Args:
+            start_time_ff (float or None): start time of fontforge from
+                time.time(). If None, no progress is shown.
+            cmds (iterable[Command]): commands, e.g. from parse_commands()
+        '''
+
+        cmds = LogCommands(cmds)
+        i = 0
+        while cmds.has(i):
+            cmds.release(i)
+            cmd = cmds[i]
+            cmd_name = cmd.name
+            if cmd.line is not None:
+                self.last_known_line = cmd.line
+            self.cmd_body = cmd.body
+            # cmd_name is changed by some of the commands
+            profile_name = cmd_name
+            profile_start = self.profiler.start()
+
+            if start_time_ff is not None:
+                self.show_progress(start_time_ff, i)
+
+            # addto\
+            # TODO This section needs to be tested and maybe reworked! mf only
+            # makes one line with each pen stroke so doublepath is needed for a
+            # full stroke. Using contour with a pen results in an offset line,
+            # left or right depending on the direction of the path. One of the
+            # flags removeinternal or removeexternal might be useful to do this.
+
+            if cmd_name == 'addto':
+                addto = cmd.value
+                if cmds[i+1].name == 'turningcheck':
+                    # turningcheck is followed by turningnumber, with log
+                    # protocol version 2 only if turningcheck is positive
+                    turningcheck = int(cmds[i+1].value)
+                    if cmds[i+2].name == 'turningnumber':
+                        turningnumber = int(cmds[i+2].value)
+                        j = i + 3
+                    else:
+                        j = i + 2
+                else:
+                    j = i + 1
+
+                # next command is also, contour or doublepath
+                addto_next_cmd_name = cmds[j].name
+                if cmds[j].line is not None:
+                    self.last_known_line = cmds[j].line
+                addto_next_cmd_value = cmds[j].value
+                j += 1
+
+                # pen and weight
+                # set default values
+                # "If no pen is given, the pen is assumed to be 'nullpen'; if no
+                # weight is given, the weight is assumed to be +1."
+                # (The METAFONTbook, p. 118)
+                pen = self.get_pen('(0,0) .. cycle') # this is nullpen; in mf, type: show nullpen;
+                weight = 1
+                # Loop over all commands and overwrite pen and weight if there
+                # are multiple withpen and withweight commands: "If more than one
+                # pen or weight is given, the last specification overrides all
+                # previous ones." (The METAFONTbook, p. 118)
+                while cmds.has(j):
+                    cmd = cmds[j]
+                    cmd_name = cmd.name
+                    if cmd.line is not None:
+                        self.last_known_line = cmd.line
+                    self.cmd_body = cmd.body
+
+                    if cmd_name == 'withpen':
+                        pen = self.get_pen(self.cmd_body, cmd.value)
+                    elif cmd_name == 'withweight':
+                        # The weight is "rounded to the nearest integer"
+                        # (The METAFONTbook, p. 118).
+                        weight = int(round(cmd.value))
+                    else:
+                        break
+                    j += 1
+                i = j - 1 # i will be increased at the end of the outer while loop
+
+                # processing of instructions on what to add to the picture
+                if addto_next_cmd_name == 'mi': # - (minus)
+                    # TODO can - even occur here?
+                    # TODO i instead of j?
+                    self.pictures[addto] += self.pictures[cmds[j].value].reversed()
+                    j += 1
+                elif addto_next_cmd_name == 'also':
+                    self.pictures[addto] += self.pictures[addto_next_cmd_value]
+                else: # add a path
+                    # There are four basic cases of adding a path to a glyph:
+                    # 1. A contour without a pen: The contour is simply added to
+                    #    the glyph. (fill c;)
+                    # 2. A doublepath without a pen: This will have no effect in
+                    #    mf so it is ignored in FontForge too.
+                    # 3. A contour with a pen: The contour is added to the glyph
+                    #    with an offset. A closed path will fill an area,
+                    #    without a hole, an open path will cause an error in mf
+                    #    and in FontForge.
+                    # 4. A doublepath with a pen: A simple pen stroke added to
+                    #    the glyph. (draw p;)
+                    # The command body of the contour or doublepath command is a
+                    # path. It is added as often as the absolute value of the
+                    # weight says, by counting it in the picture instead of
+                    # copying it.
+                    paths = [addto_next_cmd_value]
+                    count = abs(weight)
+
+                    # 1st case: contour without pen
+                    if addto_next_cmd_name == 'contour' and pen.kind == 'null':
+                        # If turningcheck is negative the paths are just added
+                        # according to the sign of the weight. Otherwise, the
+                        # turningnumber is used (== is equivalent to the XOR
+                        # operator). NOTE: "within FontForge all outer
+                        # boundaries must be drawn clockwise" (FonForge
+                        # Tutorial, 4.2.), while its counter clockwise in mf, so
+                        # all paths need to be added reversed for positive
+                        # weights.
+                        if turningcheck <= 0: # use the path direction directly
+                            if weight > 0:
+                                self.add_contours(addto, [p.reversed() for p in paths], count)
+                            elif weight < 0:
+                                self.add_contours(addto, paths, count)
+                            # TODO is the behavior correct for weight == 0 ?
+                        else:
+                            if (weight > 0) == (turningnumber > 0): # adjust the path direction according to the weight
+                                self.add_contours(addto, [p.reversed() for p in paths], count)
+                            elif (weight < 0) == (turningnumber > 0):
+                                self.add_contours(addto, paths, count)
+                            # TODO is the behavior correct for weight == 0 ?
+
+                    # 3rd and 4th case: contour/doublepath with pen
+                    elif pen.kind != 'null':
+                        # Removing the overlap on the layer (default) produces
+                        # no hole in non cyclic overlapping strokes. Removing
+                        # overlap on the contour produces a hole with wrong
+                        # direction, so it's no real hole. The direction needs
+                        # to be corrected later. This may be a bug in FontForge.
+                        stroke_kwargs = {'removeoverlap': 'contour'}
+
+                        # If it's a doublepath just add a normal stroke, without
+                        # anything special. This is the 4th case.
+                        if addto_next_cmd_name == 'doublepath':
+                            # 4th case
+                            stroked_paths = paths
+                        else: # 3rd case: contour with pen
+                            stroked_paths = [p.reversed() for p in paths]
+                            # Internal removal is described as "When a contour
+                            # is closed and clockwise, only the smaller “inside”
+                            # contour is retained." (FontForge's documentation:
+                            # glyph.stroke())
+                            stroke_kwargs.update({'removeinternal': True})
+
+                        stroke_kwargs.update({'simplify': self.options['stroke-simplify']})
+                        if self.options['stroke-accuracy'] is not None: # None -> Fontforge's default value
+                            stroke_kwargs.update({'accuracy': self.options['stroke-accuracy']})
+
+                        # add stroked layer to glyph
+                        self.pictures[addto] += Picture.from_layer(self.stroke_paths(stroked_paths, pen, stroke_kwargs), count)
+
+                    # 2nd case: doublepath without pen
+                    else:
+                        # doublepath without pen has no effect
+                        # TODO check
+                        pass
+
+            # cull\
+            # TODO This section needs extensive testing and rework!
+            elif cmd_name == 'cull':
+                cull_pic_name = cmd.value
+                keep_or_drop = cmds[i+1].name
+                a, b = [int(n) for n in cmds[i+1].value]
+                weight = 1 # default # TODO source
+                num_paths = len(self.pictures[cull_pic_name])
+
+                i += 1
+                j = i+1
+                while cmds.has(j):
+                    cmd = cmds[j]
+                    cmd_name = cmd.name
+                    self.cmd_body = cmd.body
+
+                    if cmd_name == 'withweight':
+                        weight = int(round(cmd.value)) # TODO source for rounding to next integer
+                    else:
+                        break
+                    j += 1
+                i = j-1
+
+                # num_paths is the max number of overlaps
+                # if a or b exceed this number, all paths need to be combined
+                drop_pos = (
+                    keep_or_drop == 'dropping' and a == 1 and b >= num_paths
+                    or keep_or_drop == 'keeping' and a <= -num_paths and b == 0
+                )
+                drop_neg = ( # cullit
+                    keep_or_drop == 'dropping' and -a >= num_paths and b == 0
+                    or keep_or_drop == 'keeping' and a == 1 and b >= num_paths
+                )
+                if drop_pos or drop_neg:
+                    # TODO reverse before and after remove_overlap needed for drop_pos?
+                    self.remove_overlap(cull_pic_name)
+
+                    # TODO explain this section
+                    drop_contours = []
+                    temp_layer = self.pictures[cull_pic_name].to_layer()
+                    corrected_picture = fontforge.layer()
+                    for c in temp_layer:
+                        corrected_picture += deepcopy(c)
+                    corrected_picture = corrected_picture.correctDirection()
+                    for j, (cl, l) in enumerate(zip(corrected_picture, temp_layer)):
+                        if (
+                            drop_pos and cl.isClockwise() == l.isClockwise()
+                            or drop_neg and cl.isClockwise() != l.isClockwise()
+                        ):
+                            drop_contours.append(j)
+                    self.pictures[cull_pic_name] = Picture()
+                    for k, c in enumerate(temp_layer):
+                        if k not in drop_contours:
+                            self.pictures[cull_pic_name].add(temp_layer[k])
+                elif keep_or_drop == 'dropping' and a == 0 and b == 0:
+                    # everything non-zero will stay
+                    self.remove_overlap(cull_pic_name)
+                    layer = self.pictures[cull_pic_name].to_layer()
+                    layer.correctDirection()
+                    self.pictures[cull_pic_name] = Picture.from_layer(layer)
+                elif a > b or keep_or_drop == 'keeping' and a <= 0 <= b:
+                    print('! cull V ' + keep_or_drop + ' (' + str(a) + ', ' + str(b) + ') isn\'t allowed (see The METAFONTbook, p. 120)')
+                    print('  ignoring this cull command')
+                else:
+                    # The picture is split into regions with the same value.
+                    # The regions with values in the range (keeping) or outside
+                    # of it (dropping) get the weight, all other regions get
+                    # the value 0.
+                    if keep_or_drop == 'keeping':
+                        contours = self.get_kept_contours(self.pictures[cull_pic_name], lambda value: a <= value <= b)
+                    else:
+                        contours = self.get_kept_contours(self.pictures[cull_pic_name], lambda value: not a <= value <= b)
+                    culled_layer = fontforge.layer()
+                    for c in contours:
+                        culled_layer += c
+                    if weight < 0:
+                        # reverse cull result for negative weight
+                        culled_layer.reverseDirection()
+                    # The contours count as often as the absolute value of the
+                    # weight says.
+                    self.pictures[cull_pic_name] = Picture.from_layer(culled_layer, abs(weight))
+
+            elif cmd_name == 'picture':
+                for pic_name in cmd.value:
+                    # create empty picture for each picture
+                    self.pictures[pic_name] = Picture()
+
+            elif cmd_name == 'pic_eqn':
+                j = i+1
+                j_eq = [i-1]
+                complex_expressions = []
+                while cmds.has(j):
+                    if cmds[j].name not in ('pic', 'eq', 'as', 'pl', 'mi'):
+                        break
+                    elif cmds[j].name in ('eq', 'as'):
+                        if j-j_eq[-1] < 2:
+                            complex_expressions.append(j)
+                            if len(complex_expressions) > 1:
+                                print('! ignoring complex picture expression')
+                        j_eq += [j]
+                    j += 1
+
+                j_eq += [j]
+
+                for k in j_eq[:-2]:
+                    if len(complex_expressions) == 0:
+                        if k < 1 or cmds[k-1].name != 'mi':
+                            self.pictures[cmds[k+1].value] = Picture()
+                            self.pictures[cmds[k+1].value] += self.pictures[cmds[j_eq[-2]+1].value]
+                        else:
+                            self.pictures[cmds[k+1].value] = self.pictures[cmds[j_eq[-2]+1].value].reversed()
+                    else:
+                        for k in range(i,j):
+                            if k in complex_expressions[1:]:
+                                for l in range(j_eq[k-1], j_eq[k], 2):
+                                    if cmds[l].body == 'pic':
+                                        if cmds[l-1].body in ('eq', 'as', 'pl'):
+                                            self.pictures[cmds[j_eq[-1]].value] += self.pictures[cmds[l].value]
+                                        elif cmds[l-1].body == 'mi':
+                                            self.pictures[cmds[j_eq[-1]].value] += self.pictures[cmds[l].value].reversed()
+                i = j_eq[-1]-1
+
+            elif cmd_name == 'shipout':
+                shipout = cmd.value
+
+                # "The values of xoffset, yoffset, charcode , and charext are
+                # first rounded to integers, if necessary." (The METAFONTbook,
+                # p. 220)
+                charcode = round(shipout[0])
+                charext = round(shipout[1])
+                charwd = int(shipout[2])
+                charht = int(shipout[3])
+                chardp = int(shipout[4])
+                charic = int(shipout[5])
+                # 6 and 7 are chardx, chardy
+                xoffset = round(shipout[8])
+                yoffset = round(shipout[9])
+
+                glyph_code = charcode + charext*256
+                pic_name = cmds[i+1].value
+                pic = self.pictures[pic_name].to_layer()
+
+                if self.options['remove-artifacts']:
+                    self.remove_artefacts(pic)
+
+                glyph = self.font.createChar(glyph_code,)
+                glyph.layers[1] = pic
+
+                glyph.width = charwd
+                glyph.texheight = charht
+                glyph.texdepth = chardp
+                glyph.italicCorrection = charic
+
+                if xoffset != 0 or yoffset != 0:
+                    # "The pixels of v are shifted by (xoffset, yoffset) as they
+                    # are shipped out." (The METAFONTbook, p. 220)
+                    glyph.transform((1.0, 0.0, 0.0, 1.0, xoffset, yoffset))
+                    pass
+
+                self.update_ascent_and_descent(charht, chardp)
+                self.shipped_glyphs.append((glyph_code, glyph))
+
+                i += 1
+
+            elif cmd_name == 'ligtable':
+                cmd_body_parts = self.cmd_body.split('>> ')
+                hppp = float(cmd_body_parts[0])
+                self.cmd_body = cmd_body_parts[1]
+
+                self.sub_list = []
+                pos_list = []
+                self.tmp_list = []
+
+                j = i+1
+                while cmds.has(j):
+                    cmd = cmds[j]
+                    cmd_name = cmd.name
+                    self.cmd_body = cmd.body.split('>> ')[0]
+                    self.last_cmd_body = cmds[j-1].body.split('>> ')[-1]
+
+                    if cmd_name == ':':
+                        self.tmp_list.append([[self.last_cmd_body.split('"')[1] if self.last_cmd_body[0] == '"' else int(float(self.last_cmd_body))]])
+                    elif cmd_name == '::':
+                        if self.last_cmd_body in self.skiptos:
+                            self.tmp_list += self.skiptos[self.last_cmd_body]
+                    elif cmd_name == ':||':
+                        print('! ligtable :|| not supported yet, ignored')
+                    elif cmd_name == 'kern':
+                        char = self.last_cmd_body
+                        kern = self.cmd_body
+                        char = char[1:-1] if char[0] == '"' else int(float(char))
+                        kern = int(float(kern)*hppp)
+                        pos_list += deepcopy(self.tmp_list)
+                        for k in range(len(pos_list)-len(self.tmp_list),len(pos_list)):
+                            pos_list[k] = [pos_list[k][0] + [char]] + [kern]
+                    elif '=:' in cmd_name:
+                        cmd_name_parts = cmd_name.split('=:',1)
+                        lig_type = '=:' # start with the characters in the center
+                        if 'p' in cmd_name_parts[0]:
+                            lig_type = '|' + lig_type
+                        else:
+                            lig_type = ' ' + lig_type
+                        if 'p' in cmd_name_parts[1]:
+                            lig_type = lig_type + '|'
+                        else:
+                            lig_type = lig_type + ' '
+                        if 'g' in cmd_name_parts[1]:
+                            lig_type = lig_type + '>'
+                            print('! ligtable > and >> not supported yet, they will be ignored')
+                        else:
+                            lig_type = lig_type + ' '
+                        if 'gg' in cmd_name_parts[1]:
+                            # add a second > (or second space)
+                            lig_type = lig_type + '>'
+                        else:
+                            lig_type = lig_type + ' '
+
+                        char = self.last_cmd_body
+                        lig = self.cmd_body
+                        char = char[1:-1] if char[0] == '"' else int(float(char))
+                        lig = lig [1:-1] if lig [0] == '"' else int(float(lig ))
+                        self.sub_list += deepcopy(self.tmp_list)
+                        for i in range(len(self.sub_list)-len(self.tmp_list), len(self.sub_list)):
+                            self.sub_list[i] = [lig, lig_type] + [self.sub_list[i][0] + [char]]
+                    elif cmd_name == 'skipto':
+                        self.skiptos[self.last_cmd_body] = self.tmp_list
+                    else:
+                        break
+                    j += 1
+                i = j-1
+
+                if len(self.sub_list) > 0:
+                    for sub in self.sub_list:
+                        lig = self.to_glyph_name(sub[0])
+                        lig_type = sub[1]
+                        char1 = self.to_glyph_name(sub[2][0])
+                        char2 = self.to_glyph_name(sub[2][1])
+                        if lig_type[0] == ' ' and lig_type[3] == ' ':
+                            if not 'gsub_ligature' in self.font.gsub_lookups:
+                                self.font.addLookup( 'gsub_ligature', 'gsub_ligature', (), (('liga', self.scripts),))
+                                self.font.addLookupSubtable('gsub_ligature', 'gsub_ligature_subtable')
+                            # Try to create the ligature. FontForge will
+                            # raise a TypeError, if one of the
+                            # characters is unknown. In that case, print
+                            # a warning and continue
+                            try:
+                                self.font[lig].addPosSub('gsub_ligature_subtable', (char1, char2))
+                            except TypeError as e:
+                                print('! Error while adding ligature: ', e, 'either '+repr(char1)+' or '+repr(char2)+' is unknown. Ignored.')
+                        elif lig_type[0] == '|' and lig_type[3] == ' ':
+                            if not 'gsub_single_after_' + char1 in self.font.gsub_lookups:
+                                self.font.addLookup('gsub_single_after_' + char1, 'gsub_single', (), ())
+                                self.font.addLookupSubtable('gsub_single_after_' + char1, 'gsub_single_after_' + char1 + '_subtable')
+                            self.font[char2].addPosSub('gsub_single_after_' + char1 + '_subtable', lig)
+                            if not 'gsub_contextchain' in self.font.gsub_lookups:
+                                self.font.addLookup('gsub_contextchain', 'gsub_contextchain', (), (('calt', self.scripts),))
+                            self.font.addContextualSubtable(
+                                'gsub_contextchain', 'gsub_contextchain_subtable_' + char1 + '_' + char2, 'glyph',
+                                char1 + ' | ' + char2 + ' @<gsub_single_after_' + char1 + '> |'
+                            )
+                        elif lig_type[0] == ' ' and lig_type[3] == '|':
+                            if not 'gsub_single_before_' + char2 in self.font.gsub_lookups:
+                                self.font.addLookup('gsub_single_before_' + char2, 'gsub_single', (), ())
+                                self.font.addLookupSubtable('gsub_single_before_' + char2, 'gsub_single_before_' + char2 + '_subtable')
+                            self.font[char1].addPosSub('gsub_single_before_' + char2 + '_subtable', lig)
+                            if not 'gsub_contextchain' in self.font.gsub_lookups:
+                                self.font.addLookup('gsub_contextchain', 'gsub_contextchain', (), (('calt', self.scripts),))
+                            self.font.addContextualSubtable(
+                                'gsub_contextchain', 'gsub_contextchain_subtable_' + char1 + '_' + char2, 'glyph',
+                                '| ' + char1 + ' @<gsub_single_before_' + char2 + '> | ' + char2
+                            )
+                        elif lig_type[0] == '|' and lig_type[3] == '|':
+                            if not 'gsub_multiple_between_' + char1 + '_' + char2 in self.font.gsub_lookups:
+                                self.font.addLookup('gsub_multiple_between_' + char1 + '_' + char2, 'gsub_multiple', (), ())
+                                self.font.addLookupSubtable('gsub_multiple_between_' + char1 + '_' + char2, 'gsub_multiple_between_' + char1 + '_' + char2 + '_subtable')
+                            self.font[char2].addPosSub('gsub_multiple_between_' + char1 + '_' + char2 + '_subtable', (lig, char2))
+                            if not 'gsub_contextchain' in self.font.gsub_lookups:
+                                self.font.addLookup('gsub_contextchain', 'gsub_contextchain', (), (('calt', self.scripts),))
+                            self.font.addContextualSubtable(
+                                'gsub_contextchain', 'gsub_contextchain_subtable_' + char1 + '_' + char2, 'glyph',
+                                char1 + ' | ' + char2 + ' @<gsub_multiple_between_' + char1 + '_' + char2 + '> |'
+                            )
+
+                if len(pos_list) > 0:
+                    if not 'gpos_pair' in self.font.gpos_lookups:
+                        self.font.addLookup('gpos_pair', 'gpos_pair', (), (('kern', self.scripts),))
+                        self.font.addLookupSubtable('gpos_pair', 'gpos_pair_subtable')
+                    for pos in pos_list:
+                        char1 = self.to_glyph_name(pos[0][0])
+                        char2 = self.to_glyph_name(pos[0][1])
+                        kern = pos[1]
+                        try:
+                            self.font[char1].addPosSub('gpos_pair_subtable', char2, 0, 0, kern, 0, 0, 0, 0, 0)
+                        except TypeError as e:
+                            print('! Error while adding ligature: ', e, 'either '+repr(char1)+' or '+repr(char2)+' is unknown. Ignored.')
+
+            elif cmd_name == 'fontdimen':
+                cmd_body_parts = self.cmd_body.split('>> ')
+                hppp = float(cmd_body_parts[0])
+                first_fontdimen = int(cmd_body_parts[1])
+                params = [float(p) for p in cmds[i+1].body.split('>> ')]
+                i += 1
+                for j, k in enumerate(range(first_fontdimen, first_fontdimen + len(params))):
+                    if k == 2:
+                        self.font.createChar(32).width = int(hppp*params[j])
+
+            # TODO: charlist, extensible
+
+            # char, endchar and skip mark the characters in the log file, see
+            # merge_shards() and SourceTracker
+            elif cmd_name in ('char', 'endchar', 'skip'):
+                pass
+
+            elif cmd_name == 'end':
+                design_size = int(self.cmd_body)
+                if design_size != 0:
+                    self.font.design_size = design_size
+
+            else:
+                print('! "' + cmd_name + '": ' + self.cmd_body + '?')
+                print('  This may be a syntax error. Run file with METAFONT to find it.')
+                print('  If the input is correct, consider reporting a bug.')
+            self.profiler.add_command(profile_name, profile_start, glyph_code if profile_name == 'shipout' else None)
+            i += 1
+
+    def apply_font_options_and_save(self):
+        '''apply self.options to self.font and generate font file from self.font
+        based on self.options
+        '''
+        if self.options['extrema']:
+            self.font.selection.all()
+            self.font.addExtrema()
+        if self.options['hint']:
+            self.font.autoHint()
+            self.font.autoInstr()
+        if self.options['sfd']:
+            profile_start = self.profiler.start()
+            self.font.save(self.jobname + '.sfd')
+            self.profiler.add('save', profile_start)
+        if  self.options['otf']:
+            profile_start = self.profiler.start()
+            self.font.generate(self.jobname + '.otf')
+            self.profiler.add('generate', profile_start)
+        if  self.options['ttf']:
+            profile_start = self.profiler.start()
+            self.font.generate(self.jobname + '.ttf', flags='opentype')
+            self.profiler.add('generate', profile_start)
+
+
+    def check_scripts(self, scripts):
+        '''checks if scripts has the correct structure
+
+        Args:
+            scripts (any): variable to check for correct structure
+
+        Returns:
+            bool: whether scripts has the correct structure
+        '''
+        if not isinstance(scripts, tuple):
+            return False
+
+        for item in scripts:
+            if (not isinstance(item, tuple)
+                or len(item) != 2
+                or not isinstance(item[0], str)
+                or not isinstance(item[0], tuple)
+            ):
+                return False
+            for element in item[1]:
+                if not isinstance(element, str):
+                    return False
+
+    def get_redefinitions(self, selection=None):
+        '''return mf code containing redefinitions needed for mf2ff
+
+        Args:
+            selection (str, optional): mf code of a boolean expression
+                selecting the characters which are written to the log file by
+                their charcode __mfIIvec__code__. If given, the begin and end
+                of every character are written to the log file too. The
+                expression itself isn't part of the code, it is defined as
+                __mfIIvec__selected__ by get_mf_first_line(), so the code
+                doesn't change with it.
+
+        Returns:
+            str: mf code
+        '''
+        # abbreviations for inserting log file markers for redefined tokens
+        M = self.MARKER
+        m_ = 'message "'+M # begin redefined token, followed by token name or identifier
+        m__ = m_+'";'      # end of redefined token, possibly preceded by an expression
+        mm_ = m__+m_       # end of redefined token and begin of new redefined token
+        # With the GF transport, all commands but ligtable and fontdimen are
+        # written to the GF file instead, see read_gf_commands(). Their values
+        # are written by __mfIIvec__show__ which takes a single expression.
+        if self.transport == 'gf':
+            g_ = 'special "@@'
+            g__ = g_+'";'
+            gg_ = g__+g_
+            s_ = '__mfIIvec__show__'
+        else:
+            g_, g__, gg_, s_ = m_, m__, mm_, 'show'
+        # If only some of the characters are generated, nothing is written to
+        # the log file in other characters (see beginchar below).
+        if selection is not None:
+            q_ = 'if not __mfIIvec__quiet__: ' # begin of code skipped in characters not selected
+            _q = ' fi '                        # end of code skipped in characters not selected
+        else:
+            q_ = _q = ''
+        if self.log_protocol >= 2:
+            # turningnumber is only used if turningcheck is positive, see
+            # process_commands().
+            turningnumber = ('if turningcheck > 0:'+gg_+'turningnumber"; '+s_+' turningnumber p; fi ')
+        else:
+            turningnumber = gg_+'turningnumber"; '+s_+' turningnumber p;'
+        if self.log_protocol >= 2 and self.transport == 'log':
+            # The pen is only written to the log file if it differs from the
+            # last one written. Otherwise the body of withpen is empty.
+            L = '__mfIIvec__last_pen__'
+            withpen = (
+                'def withpen expr q = ; '
+                    '__mfIIvec__same_pen__ := false;'
+                    'if known '+L+': if (length q = length '+L+') and (cycle q = cycle '+L+'):'
+                        '__mfIIvec__same_pen__ := true;'
+                        'for __mfIIvec__k__ = 0 upto length q:'
+                            'if (point __mfIIvec__k__ of q <> point __mfIIvec__k__ of '+L+')'
+                            ' or (precontrol __mfIIvec__k__ of q <> precontrol __mfIIvec__k__ of '+L+')'
+                            ' or (postcontrol __mfIIvec__k__ of q <> postcontrol __mfIIvec__k__ of '+L+'):'
+                                '__mfIIvec__same_pen__ := false;'
+                            'fi '
+                        'endfor '
+                    'fi fi '
+                    +mm_+'withpen";'
+                    'if not __mfIIvec__same_pen__: '+L+' := q; show q; fi '
+                'enddef;'
+            )
+        else:
+            withpen = 'def withpen           = ; '+gg_+'withpen";       '+s_+'     enddef;'
+        return (
+            # First, some mf primitives are saved, so they are accessible even
+            # after redefining them.
+            'let __mfIIvec__orig_colon__ = : ;'
+            'let __mfIIvec__orig_else__ = else;'
+            'let __mfIIvec__orig_elseif__ = elseif;'
+            'let __mfIIvec__orig_end__ = end;'
+            'let __mfIIvec__orig_eq__ = = ;'
+            'let __mfIIvec__orig_for__ = for;'
+            'let __mfIIvec__orig_forever__ = forever;'
+            'let __mfIIvec__orig_forsuffixes__ = forsuffixes;'
+            'let __mfIIvec__orig_if__ = if;'
+            'let __mfIIvec__orig_pen__ = pen;'
+            'let __mfIIvec__orig_picture__ = picture;'
+            'let __mfIIvec__orig_hide__ = hide;'
+
+            # Numerical equations should still be processed in mf to get the
+            # correct results. This is different for picture equations. They
+            # need to be evaluated in fontforge using boolean operations. To
+            # keep track of the type of equation, a boolean is used.
+            'boolean __mfIIvec__pic_eqn__; __mfIIvec__pic_eqn__ := false;'
+            # Inside of characters not selected, the picture commands are not
+            # written to the log file.
+            +('boolean __mfIIvec__quiet__; __mfIIvec__quiet__ := false;' if selection is not None else '')
+            # the last pen written to the log file, see withpen below
+            +('path __mfIIvec__last_pen__; boolean __mfIIvec__same_pen__;' if self.log_protocol >= 2 and self.transport == 'log' else '')
+            # With the GF transport, the values are written to the GF file as
+            # specials. The type of a value is written before its numbers,
+            # together with the length of a path.
+            # Inside of picture equations, =, + and - are redefined, so they
+            # aren't used here.
+            +((
+                'def __mfIIvec__show__ expr x ='
+                    'if unknown x: special "@?";'
+                    'elseif string x: special "@s" & x;'
+                    'elseif numeric x: numspecial x;'
+                    'elseif boolean x: special if x: "@t" else: "@f" fi;'
+                    'elseif pair x: special "@p"; __mfIIvec__show_pair__ x;'
+                    'elseif path x: special (if cycle x: "@c" else: "@o" fi & decimal length x);'
+                        'for __mfIIvec__k__ __mfIIvec__orig_eq__ 0 upto length x:'
+                            'if __mfIIvec__k__ > 0: __mfIIvec__show_pair__ precontrol __mfIIvec__k__ of x; fi '
+                            'if (__mfIIvec__k__ < length x) or not cycle x: __mfIIvec__show_pair__ point __mfIIvec__k__ of x; fi '
+                            'if __mfIIvec__k__ < length x: __mfIIvec__show_pair__ postcontrol __mfIIvec__k__ of x; fi '
+                        'endfor '
+                    'else: special "@?";'
+                    'fi '
+                'enddef;'
+                'def __mfIIvec__show_pair__ expr z = numspecial xpart z; numspecial ypart z enddef;'
+            ) if self.transport == 'gf' else '')+
+
+            ## redefinitions
+            # All redefinitions use the undelimited parameter text t, therefor
+            # all tokens of this command until the next semicolon (;) are
+            # processed according to the redefinition. This makes sure that the
+            # whole variable names are written to the log file and e.g. numeric
+            # expressions in the subscript are evaluated before writing it to
+            # the log file.
+
+            ## colon (:)
+            # Since the if and for statements can be everywhere and they are
+            # using the colon too, it has to be redefined inside every if,
+            # elseif, else, for, forever and forsuffixes. The following
+            # subroutine should be called in a group when redefining statements
+            # that can contain colons which should be redefined, e.g. the colons
+            # in a ligtable or fontdimen statement. The subroutine should be
+            # called before evaluating the content of the statement so the colon
+            # definition changes to it original meaning if there is a if, for,
+            # etc. in the statement and back after the colon
+            'def __mfIIvec__redef_colon__ ='
+                # The following colon definition is made for being used when
+                # waiting for a colon a) separating boolean expression and
+                # conditional text (in if or elseif), b) after else or c)
+                # separating a loop header and loop text (in for, forsuffixes,
+                # forever) where the condition or the loop is inside a statement
+                # that needs to be redefined to write the statement to the log
+                # file but the colon is also used by that statement so it needs
+                # to be redefined as well, e.g. ligtable and fontdimen
+                # statements. Inside of __mfIIvec__special_colon__, the
+                # definition of the colon is switched back to
+                # __mfIIvec__other_colon__ which should be defined to add a
+                # message to the the log file that there was a colon.
+                'def __mfIIvec__special_colon__ ='
+                    '__mfIIvec__orig_hide__(let : = __mfIIvec__other_colon__;)'
+                    '__mfIIvec__orig_colon__ '
+                'enddef;'
+                # The following sparks are redefined by this subroutine to
+                # activate the __mfIIvec__special_colon__ (which deactivates
+                # itself).
+                'save if, elseif, else, for, forsuffixes, forever;'
+                'def if ='
+                    '__mfIIvec__orig_hide__(let : = __mfIIvec__special_colon__;)'
+                    '__mfIIvec__orig_if__ '
+                'enddef;'
+                'def elseif ='
+                    '__mfIIvec__orig_hide__(let : = __mfIIvec__special_colon__;)'
+                    '__mfIIvec__orig_elseif__ '
+                'enddef;'
+                'def else ='
+                    '__mfIIvec__orig_hide__(let : = __mfIIvec__special_colon__;)'
+                    '__mfIIvec__orig_else__ '
+                'enddef;'
+                'def for ='
+                    '__mfIIvec__orig_hide__(let : = __mfIIvec__special_colon__;)'
+                    '__mfIIvec__orig_for__ '
+                'enddef;'
+                'def forsuffixes ='
+                    '__mfIIvec__orig_hide__(let : = __mfIIvec__special_colon__;)'
+                    '__mfIIvec__orig_forsuffixes__ '
+                'enddef;'
+                'def forever ='
+                    '__mfIIvec__orig_hide__(let : = __mfIIvec__special_colon__;)'
+                    '__mfIIvec__orig_forever__ '
+                'enddef;'
+                # In ligtable and fontdimen every colon should match the message
+                # generating __mfIIvec__other_colon__ if they are not part of
+                # the condition or loop structure itself.
+                'let : = __mfIIvec__other_colon__;'
+            'enddef;'
+
+            ## addto
+            # doublepath: "If p is not a cyclic path, this case reduces to the
+            # second case, with p replaced by the doubled-up path `p & reverse p
+            # & cycle' (unless p consists of only a single point, when the new
+            # path is simply `p .. cycle'). On the other hand if p is a cyclic
+            # path, this case reduces to two addto commands of the second type,
+            # in one of which p is reversed." (The METAFONTbook, p. 119)
+            'def addto text t = '+q_+g_+'addto"; begingroup '
+                'save also, contour, doublepath, withpen, withweight;'
+                'def also              = ; '+gg_+'also";          '+s_+' str enddef;'
+                'def contour    expr p = ; '+gg_+'turningcheck";  '+s_+' turningcheck;'
+                                            +turningnumber
+                                            +gg_+'contour";       '+s_+' p   enddef;'
+                'def doublepath expr p = ; '+gg_+'turningcheck";  '+s_+' turningcheck;'
+                                            +turningnumber
+                                            +gg_+'doublepath";    '+s_+' p   enddef;'
+                +withpen+
+                'def withweight        = ; '+gg_+'withweight";    '+s_+'     enddef;'
+                +s_+' str t; endgroup; '+g__+_q+
+            'enddef;'
+
+            ## cull
+            'def cull text t = '+q_+g_+'cull"; begingroup '
+                'save keeping, dropping, withweight;'
+                'def keeping    = ; '+gg_+'keeping";    '+s_+' enddef;'
+                'def dropping   = ; '+gg_+'dropping";   '+s_+' enddef;'
+                'def withweight = ; '+gg_+'withweight"; '+s_+' enddef;'
+                +s_+' str t; endgroup; '+g__+_q+
+            'enddef;'
+
+            ## picture
+            # Variables of type \dl{picture} are the only ones which operations
+            # are not processed by mf but outsourced to FontForge. Every time
+            # new variables of type picture are declared, the declarations are
+            # sent to FontForge by `show`ing the names of the variables to the
+            # log file. Furthermore, the names of the variables are converted
+            # into definitions: Every time the name of the variable name is
+            # processed, its name should show up in the log file. Due to the
+            # fact that mf processes \dl{picture} expressions with the same
+            # operators as in other expression types and these \dl{picture}
+            # operations needs to be sent to the log file, all operators only
+            # need to be redefined inside picture equations. The operations
+            # which can occur in a picture equation are := = - + (see
+            # METAFONTbook, pp. 115 and 214)
+            'def picture text t = '+q_+g_+'picture";'+_q+
+                'forsuffixes p = t:'
+                    +q_+s_+' str p;'+_q+
+                    'vardef p text tt = '
+                        +q_+'if __mfIIvec__pic_eqn__:'
+                            +gg_+'pic"; '+s_+' str p;'
+                        'else:'
+                            +g_+'pic_eqn";__mfIIvec__pic_eqn__:=true;begingroup '
+                                'save=,:=,+,-;'
+                                'def:=__mfIIvec__orig_eq__;'+gg_+'as";enddef;'
+                                'def=__mfIIvec__orig_eq__;'+gg_+'eq";enddef;'
+                                'def-__mfIIvec__orig_eq__;'+gg_+'mi";enddef;'
+                                'def+__mfIIvec__orig_eq__;'+gg_+'pl";enddef;'
+                            +s_+' str p tt;endgroup;'
+                            'boolean __mfIIvec__pic_eqn__;__mfIIvec__pic_eqn__:=false;'+g__+
+                        'fi '+_q+
                     'enddef;'
-                'endfor;'+m__+
+                'endfor;'+q_+g__+_q+
+            'enddef;'
+            # TODO is boolean __mfIIvec__pic_eqn__; required here?
+            # TODO What about totalweight?
+            # TODO What about parenthesis and begingroup...endgroup (with statement list)
+
+            # shipout\
+            # - "There are four internal quantities called charwd, charht,
+            #   chardp, and charic, whose values at the time of every shipout
+            #   command are assumed to be the box dimensions for the character
+            #   being shipped out, in units of printer's points. [...] Besides
+            #   charwd and its cousins, METAFONT also has four other internal
+            #   variables whose values are recorded at the time of every
+            #   shipout: charcode [...] charext [...] chardx and chardy [...]."
+            #   (The METAFONTbook, p. 106)
+            # - "‘shipout v’ puts the pixels of positive weight, as defined by
+            #   the picture expression v, into a generic font output file" (The
+            #   METAFONTbook, p. 220) This is equivalent to cull currentpicture
+            #   keeping (1, infinity).\
+            # TODO Why __mfIIvec__pic_eqn__ ?
+            # In characters not selected, only the end of the character is
+            # written to the log file.
+            'def shipout text t='
+                +('if __mfIIvec__quiet__: '+m_+'skip";'+m__+'__mfIIvec__quiet__ := false; else: ' if selection is not None else '')
+                +('cull currentpicture dropping (-infinity,0);' if self.options['cull-at-shipout'] else '')
+                +g_+'shipout"; __mfIIvec__pic_eqn__ := true;'
+                +('show charcode, charext, '
+                     'charwd*hppp, charht*hppp, chardp*hppp, charic*hppp, '
+                     'chardx*hppp, chardy*hppp, xoffset, yoffset;'
+                if self.transport == 'log' else ''.join(s_+' '+x+';' for x in (
+                     'charcode', 'charext',
+                     'charwd*hppp', 'charht*hppp', 'chardp*hppp', 'charic*hppp',
+                     'chardx*hppp', 'chardy*hppp', 'xoffset', 'yoffset')))+
+                't; __mfIIvec__pic_eqn__ := false;'
+                +g__+_q+
+            'enddef;'
+
+            ## ligtable
+            # Since the ligtable uses the colon as a separator, while the colon
+            # is also used in the structure of conditions and loops, it has to
+            # be redefined during such a structure. __mfIIvec__other_colon__ is
+            # used to be able to switch between both.
+            'def ligtable text t = '+m_+'ligtable"; show hppp; begingroup '
+                'save :, ::, ||:, kern, =:, |=:, |=:>, =:|, =:|>, |=:|, |=:|>, |=:|>>, skipto;'
+                'def __mfIIvec__other_colon__ = ; '+mm_+':"; show enddef;'
+                'def   ::   = ; '+mm_+'::";     show enddef;'
+                'def ||:    =   '+mm_+'pp:";    show enddef;' # no ; required since there is no preceding expression whose show command needs to end before the message
+                'def kern   = ; '+mm_+'kern";   show enddef;'
+                'def  =:    = ; '+mm_+'=:";     show enddef;'
+                'def |=:    = ; '+mm_+'p=:";    show enddef;'
+                'def |=:>   = ; '+mm_+'p=:g";   show enddef;'
+                'def  =:|   = ; '+mm_+'=:p";    show enddef;'
+                'def  =:|>  = ; '+mm_+'=:pg";   show enddef;'
+                'def |=:|   = ; '+mm_+'p=:p";   show enddef;'
+                'def |=:|>  = ; '+mm_+'p=:pg";  show enddef;'
+                'def |=:|>> = ; '+mm_+'p=:pgg"; show enddef;'
+                # skipto is always preceded by a show command and a comma (,),
+                # so a normal message can't follow. Therefor the message command
+                # is hidden. After the comma, the code after the skipto command
+                # will be shown by the previous show command.
+                'def skipto = __mfIIvec__orig_hide__('+mm_+'skipto") enddef;'
+                '__mfIIvec__redef_colon__ ' # restore colon before showing t
+                'show t; endgroup; '+m__+
             'enddef;'
-            # TODO is boolean __mfIIvec__pic_eqn__; required here?
-            # TODO What about totalweight?
-            # TODO What about parenthesis and begingroup...endgroup (with statement list)
 
-            # shipout\
-            # - "There are four internal quantities called charwd, charht,
-            #   chardp, and charic, whose values at the time of every shipout
-            #   command are assumed to be the box dimensions for the character
-            #   being shipped out, in units of printer's points. [...] Besides
-            #   charwd and its cousins, METAFONT also has four other internal
-            #   variables whose values are recorded at the time of every
-            #   shipout: charcode [...] charext [...] chardx and chardy [...]."
-            #   (The METAFONTbook, p. 106)
-            # - "‘shipout v’ puts the pixels of positive weight, as defined by
-            #   the picture expression v, into a generic font output file" (The
-            #   METAFONTbook, p. 220) This is equivalent to cull currentpicture
-            #   keeping (1, infinity).\
-            # TODO Why __mfIIvec__pic_eqn__ ?
-            'def shipout text t='
-                +('cull currentpicture dropping (-infinity,0);' if self.options['cull-at-shipout'] else '')
-                +m_+'shipout"; __mfIIvec__pic_eqn__ := true;'
-                'show charcode, charext, '
-                     'charwd*hppp, charht*hppp, chardp*hppp, charic*hppp, '
-                     'chardx*hppp, chardy*hppp, xoffset, yoffset;'
-                't; __mfIIvec__pic_eqn__ := false;'
-                +m__+
-            'enddef;'
+            # fontdimen command's syntax uses of colon (:). Therefor some
+            # redefinitions are needed to be used in combinations with e.g. the
+            # if statement
+            'def fontdimen text t='+m_+'fontdimen"; show hppp; begingroup '
+                'save:;'
+                'def:text tt=;'+mm_+':";show tt enddef;' # TODO Use __mfIIvec__special_colon__ here instead of : ?
+                '__mfIIvec__redef_colon__ '
+                'show t endgroup; '+m__+
+            'enddef;'
+
+            # end should show the designsize: "METAFONT looks at the value of
+            # designsize only when the job ends" (The METAFONTbook, p. 320)
+            'def end='+g_+'end";'+s_+' designsize;'+g__+'__mfIIvec__orig_end__ enddef;'
+
+            # tricks and redefinitions\
+            # The pen tracing of paths is done by FontForge which needs the
+            # Bezier curve of the pen tip's shape. Hence, every pen should be a
+            # path describing it's tip. The nullpen should be a very minimal
+            # path. The pencircle should be the path of a fullcircle. Since
+            # every pen is a path, penoffset needs to be redefined to
+            # directionpoint and the definitions makepen and makepath are no
+            # longer needed.\
+            # Note that \dl{fullcirlce} and \dl{directionpoint} are defined in
+            # plain mf.
+            'let pen = path; def nullpen = ((0,0)..cycle) enddef; def pencircle = fullcircle enddef;'
+            'def penoffset = directionpoint enddef;' # TODO explain
+            'let makepen = relax;'
+            'let makepath = relax;'
+            # mf is run in background, so don't display anything.
+            'def display text t = enddef;'
+            # nullpicture should be a variables of type \dl{picture}.
+            'save nullpicture; picture nullpicture;'
+            # The loading of plain.mf is preceded by some saves so there will be no errors.
+            'save hide, blankpicture, unitpixel, pensquare, penrazor, mm, pt, dd, bp, cm, pc, cc, in, modesetup, mode_name, mode;'
+            'input plain.mf;'
+
+            # A special mode is defined, to prepare for vector font generation.
+            'mode_def mfIIff='
+                'proofing:=0;' # don't make proofs
+                'fontmaking:=0;' # mf itself should not make a font
+                'tracingtitles:=0;' # no titles (e.g. "The letter O") in stdout
+                'pixels_per_inch:=' + str(self.ppi) + ';'
+                'blacker:=0;' # no "special correction"
+                'fillin:=0;' # no pixels that could influence their neighbors
+                'o_correction:=1;' # no reduction in overshoot
+            'enddef;'
+            'mode:=mfIIff;'
+
+            # beginchar, defined in plain.mf, decides whether the character is
+            # selected, i.e. whether its picture commands are written to the
+            # log file, and marks the begin of the character in the log file.
+            # The path is only shown to get the line number, followed by the
+            # charcode and whether the character is selected. endchar marks
+            # the end of the character, again with the line number.
+            +((
+                'let __mfIIvec__orig_beginchar__ = beginchar;'
+                'def beginchar(expr c, w_sharp, h_sharp, d_sharp) ='
+                    '__mfIIvec__code__ := if known c: byte c else: 0 fi;'
+                    '__mfIIvec__quiet__ := not __mfIIvec__selected__;'
+                    +m_+'char"; show (0,0)..cycle, __mfIIvec__code__, not __mfIIvec__quiet__;'+m__+
+                    '__mfIIvec__orig_beginchar__(c, w_sharp, h_sharp, d_sharp) '
+                'enddef;'
+                'let __mfIIvec__orig_endchar__ = endchar;'
+                'def endchar ='
+                    +m_+'endchar"; show (0,0)..cycle;'+m__+
+                    '__mfIIvec__orig_endchar__ '
+                'enddef;'
+            ) if selection is not None else '')
+        )
+
+    def show_progress(self, start_time_ff, i):
+        '''shows progress bar and ETA
+
+        The progress is the part of the log file which has been read.
+
+        Args:
+            start_time_ff (float): start time of fontforge from time.time()
+            i (int): index of current command (0 based)
+        '''
+        progress = min(self.log_chars_read/max(self.log_size, 1), 1)
+        # simple eta formula
+        eta = (time()-start_time_ff)*(1-progress)/max(progress, 1e-9)
+        # find appropriate unit
+        # dot and extra space to separate from FontForge warnings
+        if eta < 60:
+            eta_unit = 's.   '
+        elif eta < 60*60:
+            eta_unit = 'min. '
+            eta /= 60
+        elif eta < 60*60*24:
+            eta_unit = 'h.   '
+            eta /= 60*60
+        else:
+            eta_unit = 'd.   '
+            eta /= 60*60*24
+
+        n = 10 # width of progress bar (max number of '=')
+        sys.stdout.write(
+            '\r[{:{n}}'.format('='*int(n*progress), n=n)
+            + '] {:>3d}'.format(int(progress*100)) + '%, '
+            + 'command {:d}'.format(i+1) + ', '
+            + 'line ' + str(self.last_known_line) + ', '
+            + 'ETA: {:6.3f}'.format(eta) + ' ' + eta_unit
+        )
+        sys.stdout.flush()
+
+    def to_glyph_name(self, g):
+        '''converts name or code point g to FontForge glyph name
+
+        If name is unknown, use first character of name and print a warning.
+
+        Args:
+            g (str or int): glyph code point or name
+
+        Returns:
+            string: FontForge glyph name
+        '''
+        if isinstance(g, str):
+            if fontforge.unicodeFromName(g) != -1:
+                return g
+            else:
+                try:
+                    # convert name to Unicode character and back to Fontforge glyph name
+                    return fontforge.nameFromUnicode(unicodedata.decimal(unicodedata.lookup(g)))
+                except KeyError:
+                    print('! \'' + g + '´ is not a valid glyph name. \'' + g[0] + '´ is assumed.')
+                    return g[0]
+        else:
+            return fontforge.nameFromUnicode(g)
+
+    def get_pen(self, body, path=None):
+        '''returns the classified pen for the description of a pen
+
+        The pens are cached in self.pens by their description.
+
+        Args:
+            body (str): description of the pen written to the log file
+            path (Path): the parsed description, see parse_path()
+
+        Returns:
+            Pen: the pen
+        '''
+        pen = self.pens.get(body)
+        if pen is not None:
+            return pen
+
+        if body in self.SIMPLE_PENS:
+            pen = Pen('null', body)
+        else:
+            if path is None:
+                path = self.parse_path(body)
+            knots = path.knots()
+
+            # If the pen's path has 8 points it is to be assumed to be a circle / ellipse.
+            # TODO more conditions
+            if len(path) == 8:
+                # TODO better to get both widths and compare to determine which
+                # one is minor_width ?
+                width = sqrt((knots[4][0]-knots[0][0])**2 + (knots[4][1]-knots[0][1])**2)
+                minor_width = sqrt((knots[6][0]-knots[2][0])**2 + (knots[6][1]-knots[2][1])**2)
+                angle = atan2(knots[4][1]-knots[0][1], knots[4][0]-knots[0][0])
+                pen = Pen('elliptical', body, width, minor_width, angle)
+            else:
+                # FontForge only supports elliptical or polygonal pens, so all
+                # other pens are treated as polygons.
+                pen_contour = fontforge.contour()
+                pen_contour.moveTo(*knots[0])
+                for x, y in knots[1:-1]:
+                    pen_contour.lineTo(x, y)
+                pen_contour.closed = True # TODO is pen_contour from mf always closed or is it necessary to check it?
+                pen_contour = pen_contour.reverseDirection() # TODO is this always required? Why?
+                pen = Pen('convex', body, pen_contour)
+        self.pens[body] = pen
+        return pen
+
+    def stroke_paths(self, paths, pen, stroke_kwargs):
+        '''returns the layer with the paths stroked with the pen
+
+        The same path is often stroked with the same pen at different
+        positions, e.g. for serifs or dots. The results are cached in
+        self.stroke_cache with the paths moved to the origin, so only a
+        translated copy is needed for these strokes. The cache keeps
+        self.params['stroke-cache']['size'] results.
+
+        Args:
+            paths (list[Path]): the paths
+            pen (Pen): the pen, see get_pen()
+            stroke_kwargs (dict): keyword arguments for layer.stroke()
+
+        Returns:
+            fontforge.layer: the stroked paths
+        '''
+        cache_size = self.params['stroke-cache']['size']
+        if cache_size > 0:
+            x0, y0 = paths[0].coords[0], paths[0].coords[1]
+            # Rounding to the precision of METAFONT's numbers makes the key
+            # independent of the floating point errors of the subtraction.
+            key = (
+                tuple((tuple(round(c, 5) for c in p.shifted(-x0, -y0).coords), p.cyclic) for p in paths),
+                pen.body,
+                tuple(sorted(stroke_kwargs.items())),
+            )
+            cached_layer = self.stroke_cache.get(key)
+            if cached_layer is not None:
+                self.stroke_cache.move_to_end(key)
+                self.stroke_cache_hits += 1
+                layer = cached_layer.dup()
+                layer.transform((1, 0, 0, 1, x0, y0))
+                return layer
+            self.stroke_cache_misses += 1
+
+        profile_start = self.profiler.start()
+        layer = fontforge.layer()
+        for path in paths:
+            layer += path.to_contour()
+        stroked = True
+
+        if pen.kind == 'elliptical':
+            layer = layer.stroke('elliptical', *pen.args, **stroke_kwargs)
+
+        else:
+            try:
+                layer = layer.stroke('convex', pen.args[0], **stroke_kwargs)
+            except ValueError as e1:
+                pen_contour = pen.args[0].reverseDirection()
+                try:
+                    layer = layer.stroke('convex', pen_contour, **stroke_kwargs)
+                    # keep the orientation that works
+                    pen.args = (pen_contour,)
+                except ValueError as e2:
+                    stroked = False
+                    print('! Pen can\'t be used here. METAFONT gives:')
+                    print('    ' + pen.body)
+                    print('  fontforge raises:')
+                    print('    ' + str(e1))
+                    print('  Even after reversing the pen\'s outline path\'s direction, fontforge raises:')
+                    print('    ' + str(e2))
+                    print('  The contour is simply added without using a pen. It may not be closed. This might produce correct results if penspeck is used (which is used by drawdot)')
+                    # TODO identify when penspeck is used and skip the errors
+
+        # Fix possible wrong direction of a hole created by stroke(). Note:
+        # This also seems to change the contour order in the glyph's layer.
+        # The outer contour always seems to be the last contour
+        layer.correctDirection()
+        self.profiler.add('stroke', profile_start)
+
+        if cache_size > 0 and stroked:
+            cached_layer = layer.dup()
+            cached_layer.transform((1, 0, 0, 1, -x0, -y0))
+            self.stroke_cache[key] = cached_layer
+            if len(self.stroke_cache) > cache_size:
+                self.stroke_cache.popitem(last=False)
+        return layer
+
+    def add_contours(self, picture, paths, count=1):
+        '''adds `paths` as contours to picture `picture`
+
+        Args:
+            picture (str): The name of the picture.
+            paths (list[Path]): List of paths.
+            count (int, optional): How often the paths are added. Defaults to
+                1.
+        '''
+        for path in paths:
+            self.pictures[picture].add(path.to_contour(), count)
+
+    def get_regions(self, picture):
+        '''return the regions of a picture
+
+        Args:
+            picture (Picture): the picture
+
+        Returns:
+            Regions: the picture's regions
+        '''
+        return Regions(
+            [(count, contour_to_segments(c)) for c, count in picture.entries],
+            self.params['regions']['grid-size'],
+            self.params['regions']['flatness']
+        )
+
+    def get_kept_contours(self, picture, keep):
+        '''return the contours of the regions of a picture whose values are
+        kept
+
+        A contour which neither overlaps other contours nor itself is a region
+        with the value 1 or -1 by itself. Hence, only the groups of contours
+        whose bounding boxes overlap are split into regions, see
+        overlapping_groups() and Regions.
+
+        Args:
+            picture (Picture): the picture
+            keep (function): returns whether a value is kept, the value 0 is
+                never kept
+
+        Returns:
+            list[fontforge.contour]: clockwise contours around the kept regions
+        '''
+        contours = []
+        for group in overlapping_groups([c.boundingBox() for c, _ in picture.entries]):
+            entries = [picture.entries[k] for k in group]
+            if len(entries) == 1 and entries[0][1] == 1 and not entries[0][0].selfIntersects():
+                c = entries[0][0]
+                if c.isClockwise():
+                    if keep(1):
+                        contours.append(c)
+                elif keep(-1):
+                    contours.append(c.dup().reverseDirection())
+                continue
+            regions = self.get_regions(Picture(entries))
+            contours += [contour_from_segments(segments) for segments in regions.boundary(keep)]
+        return contours
+
+    def remove_overlap(self, pic_name, s=None):
+        '''applies layer.removeOverlap() to picture pic_name
+
+        scales the image up before and down after applying removeOverlap to
+        overcome problems or inaccuracies of FontForge. Without this, some
+        points might be missing and some contours might be broken.
+
+        If self.params['remove-overlap']['backend'] is 'python', the overlap
+        is removed with the picture's regions instead (see Regions): the
+        regions with positive values get clockwise contours, the ones with
+        negative values counterclockwise contours.
+
+        Only contours whose bounding boxes overlap can overlap, so the
+        overlap is removed separately for each group of them, see
+        overlapping_groups(). A single contour which doesn't intersect itself
+        is kept as it is.
+
+        Args:
+            pic_name (str): name of a picture in self.pictures s (int or float,
+            optional): scale factor to upscale before and downscale after
+            removeOverlap(). Value should be much greater than 1. Defaults to
+            None. None will use self.params['remove-overlap']['scale-factor'].
+        '''
+        profile_start = self.profiler.start()
+        if s is None:
+            s = self.params['remove-overlap']['scale-factor']
+        picture = self.pictures[pic_name]
+        result = Picture()
+        for group in overlapping_groups([c.boundingBox() for c, _ in picture.entries]):
+            entries = [picture.entries[k] for k in group]
+            if len(entries) == 1 and entries[0][1] == 1 and not entries[0][0].selfIntersects():
+                result.add(entries[0][0])
+                continue
+            if self.params['remove-overlap']['backend'] == 'python':
+                regions = self.get_regions(Picture(entries))
+                layer = fontforge.layer()
+                for segments in regions.boundary(lambda value: value > 0):
+                    layer += contour_from_segments(segments)
+                for segments in regions.boundary(lambda value: value < 0):
+                    layer += contour_from_segments(segments).reverseDirection()
+            else:
+                layer = Picture(entries).to_layer()
+                layer.transform((s, 0, 0, s, 0, 0))
+                layer.removeOverlap()
+                layer.transform((1/s, 0, 0, 1/s, 0, 0))
+            result += Picture.from_layer(layer)
+        self.pictures[pic_name] = result
+        self.profiler.add('removeOverlap', profile_start)
+
+    def remove_artefacts(self, layer):
+        '''remove artefacts in pic to remove unnecessary (parts of) contours
+
+        Simplify messes up with the dish_serif of computer modern
+        even when reducing the error_bound. Therefore an own
+        cleanup is done.
+
+        Args:
+            pic (fontforge.layer): layers whose contours should be cleaned up
+        '''
+        profile_start = self.profiler.start()
+        point_threshold = self.params['remove-artefacts']['collinear']['point-threshold']
+        i_c = 0
+        while i_c < len(layer):
+            c = layer[i_c]
+            if c.closed:
+                # check for collinearity c
+                if self.is_collinear(c):
+                    del layer[i_c]
+                    continue # don't increase by 1 below
+                # check for collinearity of loops inside c
+                # search for points with same coords
+                while True:
+                    loop = self.find_collinear_loop(c, point_threshold)
+                    if loop is None:
+                        # no collinearity loop is in c
+                        break
+                    i_p1, i_p2 = loop
+                    if i_p1 < i_p2:
+                        # do del c[i_p1+1:i_p2] without "Segmentation fault (core dumped)"
+                        for i_p_i in range(i_p2-1, i_p1, -1):
+                            del c[i_p_i]
+                    else: # end/start is between i_p1 i_p2
+                        # TODO too many points removed?
+                        # do del c[i_p1:] without "Segmentation fault (core dumped)"
+                        for i_p1_i in range(len(c)-1, i_p1-1, -1):
+                            del c[i_p1_i]
+                        # do del c[:i_p2-1]
+                        for i_p2_i in range(i_p2-1, -1, -1):
+                            del c[i_p2_i]
+
+            i_c += 1
+        self.profiler.add('remove_artefacts', profile_start)
+
+    def find_collinear_loop(self, c, point_threshold):
+        '''finds a collinear loop in contour c
+
+        A loop is a part of c between two on-curve points at the same
+        position, i.e. closer than point_threshold in x and y direction. The
+        on-curve points are put into a grid of cells of that size, so only the
+        points in the neighboring cells need to be compared. The pairs of
+        points are checked in the order of their indices.
+
+        Args:
+            c (fontforge.contour): the contour
+            point_threshold (float): max. distance of the points in x and y
+                direction
+
+        Returns:
+            tuple[int]: indices of the loop's first and last point or None if
+                there is no collinear loop
+        '''
+        if point_threshold <= 0:
+            # no points are closer than that
+            return None
+        xy = [(p.x, p.y) for p in c]
+        on_curve = [i_p for i_p, p in enumerate(c) if p.on_curve]
+        cells = {}
+        for i_p in on_curve:
+            x, y = xy[i_p]
+            cells.setdefault((floor(x/point_threshold), floor(y/point_threshold)), []).append(i_p)
+        for i_p1 in on_curve:
+            x1, y1 = xy[i_p1]
+            cell_x, cell_y = floor(x1/point_threshold), floor(y1/point_threshold)
+            neighbors = sorted(
+                i_p
+                for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                for i_p in cells.get((cell_x+dx, cell_y+dy), ())
+            )
+            for i_p2 in neighbors:
+                x2, y2 = xy[i_p2]
+                if 1 < abs(i_p2 - i_p1) < len(xy)-1 and abs(x2 - x1) < point_threshold and abs(y2 - y1) < point_threshold:
+                    if i_p1 < i_p2:
+                        loop = xy[i_p1:i_p2]
+                    else: # end/start is between i_p1 i_p2
+                        loop = xy[i_p1:] + xy[:i_p2]
+                    if self.are_collinear(loop):
+                        return i_p1, i_p2
+        return None
+
+    def is_collinear(self, c):
+        '''checks whether all points in closed contour c are collinear
+
+        If all points in the contour c are at the same position, c is considered
+        to be collinear.
+
+        Args:
+            c (fontforge.contour): the contour to be checked for collinearity
+
+        Returns:
+            bool: whether c is collinear or not
+        '''
+        return self.are_collinear([(p.x, p.y) for p in c])
+
+    def are_collinear(self, xy):
+        '''checks whether all points are collinear, see is_collinear()
+
+        Args:
+            xy (list[tuple[float]]): x and y of the points
+
+        Returns:
+            bool: whether the points are collinear or not
+        '''
+        n = len(xy)
+        x_mean = sum(x for x, _ in xy)/n
+        y_mean = sum(y for _, y in xy)/n
+        x_var = sum(abs(x - x_mean)**2 for x, _ in xy)/n
+        y_var = sum(abs(y - y_mean)**2 for _, y in xy)/n
+        if x_var < 0.01 and y_var < 0.01:
+            return True
+        if x_var < y_var:
+            # swap x and y to get precise results for very steep or vertical
+            # linear regressions
+            x_mean, y_mean = y_mean, x_mean
+            x_var, y_var = y_var, x_var
+            xy = [(y, x) for x, y in xy]
+        # do a linear regression and check if the largest distance is below threshold
+        beta = sum((x - x_mean)*(y - y_mean) for x, y in xy)/sum((x - x_mean)**2 for x, _ in xy)
+        alpha = y_mean - (beta*x_mean)
+        denominator = sqrt(beta**2 + 1)
+        distance_threshold = self.params['remove-artefacts']['collinear']['distance-threshold']
+        # stops at the first point which is too far away
+        return all(abs(-beta*x + 1*y - alpha)/denominator < distance_threshold for x, y in xy)
+
+
+class LogCommands():
+    '''sequence-like access to the commands of an iterable of commands
+
+    The commands are fetched from the iterable when they are accessed. Commands
+    before the index given to release() are dropped, except the last few ones
+    (history), so only a bounded window of commands is kept in memory while
+    allowing the command handlers to look back and ahead.
+
+    Args:
+        commands (iterable[tuple[str]]): commands, e.g. a generator
+        history (int, optional): number of released commands which are kept
+            for looking back. Defaults to 4.
+    '''
+    def __init__(self, commands, history=4):
+        self.commands = iter(commands)
+        self.history = history
+        self.window = []
+        self.offset = 0 # index of the first command in self.window
+
+    def __getitem__(self, i):
+        if i < self.offset:
+            raise IndexError('command ' + str(i) + ' was already released')
+        while i - self.offset >= len(self.window):
+            try:
+                self.window.append(next(self.commands))
+            except StopIteration:
+                raise IndexError('command index out of range')
+        return self.window[i - self.offset]
+
+    def has(self, i):
+        '''checks whether there is a command with index i
+
+        Args:
+            i (int): index of the command
+
+        Returns:
+            bool: whether command i exists
+        '''
+        if i < self.offset:
+            return True
+        try:
+            self[i]
+        except IndexError:
+            return False
+        return True
+
+    def release(self, i):
+        '''drops the commands before index i (except the history)
+
+        Args:
+            i (int): index of the first command still needed
+        '''
+        n = i - self.history - self.offset
+        if n > 0:
+            del self.window[:n]
+            self.offset += n
+
+
+class Command():
+    '''command written to the log file by the redefinitions, see
+    Mf2ff.parse_command()
+
+    Args:
+        name (str): name of the command
+        line (int): line number shown with the command's path or None
+        body (str): the text written to the log file
+        value: the parsed body
+    '''
+    __slots__ = ('name', 'line', 'body', 'value')
+
+    def __init__(self, name, line, body, value):
+        self.name = name
+        self.line = line
+        self.body = body
+        self.value = value
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Command)
+            and (self.name, self.line, self.body, self.value)
+                == (other.name, other.line, other.body, other.value)
+        )
+
+    def __repr__(self):
+        return 'Command(' + ', '.join(repr(a) for a in (self.name, self.line, self.body, self.value)) + ')'
+
 
-            ## ligtable
-            # Since the ligtable uses the colon as a separator, while the colon
-            # is also used in the structure of conditions and loops, it has to
-            # be redefined during such a structure. __mfIIvec__other_colon__ is
-            # used to be able to switch between both.
-            'def ligtable text t = '+m_+'ligtable"; show hppp; begingroup '
-                'save :, ::, ||:, kern, =:, |=:, |=:>, =:|, =:|>, |=:|, |=:|>, |=:|>>, skipto;'
-                'def __mfIIvec__other_colon__ = ; '+mm_+':"; show enddef;'
-                'def   ::   = ; '+mm_+'::";     show enddef;'
-                'def ||:    =   '+mm_+'pp:";    show enddef;' # no ; required since there is no preceding expression whose show command needs to end before the message
-                'def kern   = ; '+mm_+'kern";   show enddef;'
-                'def  =:    = ; '+mm_+'=:";     show enddef;'
-                'def |=:    = ; '+mm_+'p=:";    show enddef;'
-                'def |=:>   = ; '+mm_+'p=:g";   show enddef;'
-                'def  =:|   = ; '+mm_+'=:p";    show enddef;'
-                'def  =:|>  = ; '+mm_+'=:pg";   show enddef;'
-                'def |=:|   = ; '+mm_+'p=:p";   show enddef;'
-                'def |=:|>  = ; '+mm_+'p=:pg";  show enddef;'
-                'def |=:|>> = ; '+mm_+'p=:pgg"; show enddef;'
-                # skipto is always preceded by a show command and a comma (,),
-                # so a normal message can't follow. Therefor the message command
-                # is hidden. After the comma, the code after the skipto command
-                # will be shown by the previous show command.
-                'def skipto = __mfIIvec__orig_hide__('+mm_+'skipto") enddef;'
-                '__mfIIvec__redef_colon__ ' # restore colon before showing t
-                'show t; endgroup; '+m__+
-            'enddef;'
+class Path():
+    '''path parsed from its description written to the log file
+
+    The coordinates are stored in a flat array: x and y of the first knot,
+    followed by the two control points and the next knot of every segment.
+    The last knot of a cyclic path is its first knot.
+
+    Args:
+        coords (array.array): the coordinates
+        cyclic (bool): whether the path is cyclic
+    '''
+    __slots__ = ('coords', 'cyclic')
+
+    def __init__(self, coords, cyclic):
+        self.coords = coords
+        self.cyclic = cyclic
+
+    def __len__(self):
+        # number of segments
+        return (len(self.coords)-2)//6
+
+    def __eq__(self, other):
+        return isinstance(other, Path) and (self.coords, self.cyclic) == (other.coords, other.cyclic)
+
+    def __repr__(self):
+        return 'Path(' + repr(self.coords) + ', ' + repr(self.cyclic) + ')'
+
+    def knots(self):
+        '''return the knots of the path
+
+        Returns:
+            list[tuple[float]]: x and y of every knot including the last one
+        '''
+        return [(self.coords[k], self.coords[k+1]) for k in range(0, len(self.coords), 6)]
+
+    def reversed(self):
+        '''return the path with reversed direction
+
+        Returns:
+            Path: the reversed path
+        '''
+        coords = array('d', self.coords)
+        coords[0::2] = self.coords[-2::-2]
+        coords[1::2] = self.coords[::-2]
+        return Path(coords, self.cyclic)
+
+    def shifted(self, dx, dy):
+        '''return the path shifted by (dx,dy)
+
+        Args:
+            dx (float): shift in x direction
+            dy (float): shift in y direction
+
+        Returns:
+            Path: the shifted path
+        '''
+        coords = array('d', self.coords)
+        coords[0::2] = array('d', [x + dx for x in self.coords[0::2]])
+        coords[1::2] = array('d', [y + dy for y in self.coords[1::2]])
+        return Path(coords, self.cyclic)
+
+    def transformed(self, tx, ty, txx, txy, tyx, tyy):
+        '''return the transformed path
+
+        The parameters are the parts of a transform in METAFONT, see The
+        METAFONTbook, p. 141: (x,y) is transformed to
+        (tx + txx*x + txy*y, ty + tyx*x + tyy*y).
+
+        Returns:
+            Path: the transformed path
+        '''
+        xs = self.coords[0::2]
+        ys = self.coords[1::2]
+        coords = array('d', self.coords)
+        coords[0::2] = array('d', [tx + txx*x + txy*y for x, y in zip(xs, ys)])
+        coords[1::2] = array('d', [ty + tyx*x + tyy*y for x, y in zip(xs, ys)])
+        return Path(coords, self.cyclic)
+
+    def to_contour(self):
+        '''return the path as FontForge contour
+
+        Returns:
+            fontforge.contour: the contour
+        '''
+        coords = self.coords
+        c = fontforge.contour()
+        c.moveTo(coords[0], coords[1])
+        for k in range(2, len(coords), 6):
+            c.cubicTo(*coords[k:k+6])
+        if self.cyclic:
+            c.closed = True
+        return c
+
+
+class Pen():
+    '''pen classified for stroking with FontForge, see Mf2ff.get_pen()
+
+    Args:
+        kind (str): 'null' for pens that don't stroke, 'elliptical' or
+            'convex'
+        body (str): description of the pen written to the log file
+        *args: the arguments of layer.stroke() after the kind: width,
+            minor width and angle of elliptical pens, the contour of convex
+            pens in the orientation that is known to work
+    '''
+    __slots__ = ('kind', 'body', 'args')
+
+    def __init__(self, kind, body, *args):
+        self.kind = kind
+        self.body = body
+        self.args = args
+
+
+class Picture():
+    '''picture of METAFONT as contours with the number of times they are
+    added to it
+
+    A contour added with weight w counts abs(w) times. Its direction gives the
+    sign as in FontForge, see Mf2ff.process_commands(). The contours are only
+    added to a FontForge layer that often when the layer is needed, see
+    to_layer(). The contours are never changed in place, so they can be
+    shared by several pictures.
+
+    Args:
+        entries (list[list], optional): the contours and their counts.
+            Defaults to None for an empty picture.
+    '''
+    __slots__ = ('entries',)
+
+    def __init__(self, entries=None):
+        self.entries = [] if entries is None else entries
+
+    def __len__(self):
+        # number of contours of the layer
+        return sum(count for _, count in self.entries)
+
+    def __iadd__(self, other):
+        self.entries += [list(entry) for entry in other.entries]
+        return self
+
+    @classmethod
+    def from_layer(cls, layer, count=1):
+        '''return the picture of the contours of a layer
+
+        Args:
+            layer (fontforge.layer): the layer
+            count (int, optional): how often each contour counts. Defaults to
+                1.
+
+        Returns:
+            Picture: the picture
+        '''
+        picture = cls()
+        for c in layer:
+            picture.add(c, count)
+        return picture
+
+    def add(self, contour, count=1):
+        '''adds a contour
+
+        Args:
+            contour (fontforge.contour): the contour
+            count (int, optional): how often the contour counts. Defaults to
+                1.
+        '''
+        if count > 0:
+            self.entries.append([contour, count])
+
+    def reversed(self):
+        '''return the picture with contours of reversed direction
+
+        Returns:
+            Picture: the reversed picture
+        '''
+        return Picture([[c.dup().reverseDirection(), count] for c, count in self.entries])
+
+    def to_layer(self):
+        '''return the picture as FontForge layer
+
+        Returns:
+            fontforge.layer: layer with each contour as often as it counts
+        '''
+        layer = fontforge.layer()
+        for c, count in self.entries:
+            for _ in range(count):
+                layer += c
+        return layer
+
+
+class Regions():
+    '''regions of a picture with the same value
+
+    The contours are flattened to polygons whose vertices are rounded to a
+    grid. The polygons' edges are split where they intersect, until the edges
+    split at the rounded intersections don't intersect anymore, and edges
+    between the same vertices are merged, so the edges divide the plane into
+    regions.
+    Each edge knows by how much the value changes when crossing it, the value
+    of each region follows from these differences. The contours of the regions
+    whose values are kept are made from the edges between kept and other
+    regions. Consecutive edges from the same segment of a contour are joined
+    to a part of the original segment again, so curves stay curves.
+
+    Args:
+        curves (list[tuple]): for each contour how often it counts and its
+            segments, see contour_to_segments(). As in FontForge, clockwise
+            contours add and counterclockwise contours subtract.
+        grid_size (float): distance of the grid's points
+        flatness (float): max. distance of a curved segment from the edges it
+            is flattened to, see flatten_segment()
+    '''
+
+    def __init__(self, curves, grid_size, flatness):
+        self.grid_size = grid_size
+        # segments of the contours
+        self.segments = []
+
+        # flatten the segments to pieces: start, end, index of the segment,
+        # parameter of start and end on the segment and the difference of the
+        # values left and right of the piece
+        pieces = []
+        for count, segments in curves:
+            for segment in segments:
+                index = len(self.segments)
+                self.segments.append(segment)
+                a = self.to_grid(segment[0])
+                t_a = 0.0
+                for t, point in flatten_segment(segment, flatness):
+                    b = self.to_grid(point)
+                    if b != a:
+                        pieces.append((a, b, index, t_a, t, -count))
+                        a = b
+                        t_a = t
+
+        # Split the pieces where they intersect. The intersections are
+        # rounded to the grid, so the parts of a piece may cross other pieces
+        # which the piece itself didn't cross. Hence, the parts are checked
+        # again until no piece is split anymore. Only pairs of pieces of
+        # which at least one is new need to be checked.
+        new = [True]*len(pieces)
+        while True:
+            splits = self.find_intersections(pieces, new)
+            if not any(splits):
+                break
+            split_pieces = []
+            new = []
+            for piece, points in zip(pieces, splits):
+                parts = self.split_piece(piece, points) if points else [piece]
+                split_pieces += parts
+                new += [bool(points)]*len(parts)
+            pieces = split_pieces
+
+        # The key of an edge are its vertices in ascending order, its value
+        # the difference of the values left and right of it in that direction
+        # and the segment and parameters of the first piece it comes from.
+        self.edges = {}
+        for p, q, index, t_p, t_q, jump in pieces:
+            if p < q:
+                edge = self.edges.setdefault((p, q), [0, (index, t_p, t_q)])
+                edge[0] += jump
+            else:
+                edge = self.edges.setdefault((q, p), [0, (index, t_q, t_p)])
+                edge[0] -= jump
+        # edges without a change of the value don't separate regions
+        self.edges = {key: edge for key, edge in self.edges.items() if edge[0] != 0}
+
+        # the other vertices of the edges of each vertex sorted
+        # counterclockwise by the direction of the edges
+        self.neighbors = {}
+        for u, v in self.edges:
+            self.neighbors.setdefault(u, []).append(v)
+            self.neighbors.setdefault(v, []).append(u)
+        for u, vertices in self.neighbors.items():
+            vertices.sort(key=lambda v: atan2(v[1]-u[1], v[0]-u[0]))
+        self.index = {
+            (u, v): i
+            for u, vertices in self.neighbors.items()
+            for i, v in enumerate(vertices)
+        }
+
+        # The half edges (u, v) with the same region on their left form a
+        # cycle.
+        self.cycles = {}
+        num_cycles = 0
+        for h in self.index:
+            if h in self.cycles:
+                continue
+            while h not in self.cycles:
+                self.cycles[h] = num_cycles
+                h = self.next_half_edge(h)
+            num_cycles += 1
+
+        # The values of the regions follow from the differences of the values
+        # at the edges. The region left of the vertex with the smallest
+        # coordinates of each connected set of edges is outside of these
+        # edges, so its value is found by counting the other edges left of
+        # this vertex.
+        self.values = [None]*num_cycles
+        for v in sorted(self.neighbors):
+            h = (v, self.neighbors[v][-1])
+            if self.values[self.cycles[h]] is not None:
+                continue
+            self.values[self.cycles[h]] = self.value_at(v)
+            pending = [h]
+            while pending:
+                h = pending.pop()
+                value = self.values[self.cycles[h]]
+                for g in self.cycle(h):
+                    twin = (g[1], g[0])
+                    if self.values[self.cycles[twin]] is None:
+                        self.values[self.cycles[twin]] = value - self.jump(g)
+                        pending.append(twin)
+
+    def to_grid(self, p):
+        # coordinates of the nearest point of the grid
+        return (int(round(p[0]/self.grid_size)), int(round(p[1]/self.grid_size)))
+
+    def find_intersections(self, pieces, new):
+        '''return the points where each piece is intersected by other pieces
+
+        The pieces are swept from left to right. Pairs of pieces which are
+        both not new are skipped.
+
+        Args:
+            pieces (list[tuple]): pieces, see __init__()
+            new (list[bool]): whether each piece is new
+
+        Returns:
+            list[list[tuple[int]]]: the intersections inside of each piece
+        '''
+        splits = [[] for _ in pieces]
+        x_mins = [min(piece[0][0], piece[1][0]) for piece in pieces]
+        x_maxs = [max(piece[0][0], piece[1][0]) for piece in pieces]
+        # pieces reaching to the current piece's left side, all of them and
+        # the new ones, the first list is only updated for new pieces
+        active = []
+        active_new = []
+        for i in sorted(range(len(pieces)), key=x_mins.__getitem__):
+            a, b = pieces[i][:2]
+            x_min = x_mins[i]
+            y_min, y_max = min(a[1], b[1]), max(a[1], b[1])
+            active_new = [j for j in active_new if x_maxs[j] >= x_min]
+            if new[i]:
+                active = [j for j in active if x_maxs[j] >= x_min]
+            for j in active if new[i] else active_new:
+                c, d = pieces[j][:2]
+                if max(c[1], d[1]) < y_min or min(c[1], d[1]) > y_max:
+                    continue
+                for p in segment_intersections(a, b, c, d):
+                    if p != a and p != b:
+                        splits[i].append(p)
+                    if p != c and p != d:
+                        splits[j].append(p)
+            active.append(i)
+            if new[i]:
+                active_new.append(i)
+        return splits
+
+    def split_piece(self, piece, points):
+        '''return the parts of a piece split at points
+
+        The parameters of the points on the segment are interpolated by their
+        projections onto the piece.
+        '''
+        a, b, index, t_a, t_b, jump = piece
+        r = (b[0]-a[0], b[1]-a[1])
+        rr = r[0]*r[0] + r[1]*r[1]
+        def projection(p):
+            return min(max(((p[0]-a[0])*r[0] + (p[1]-a[1])*r[1])/rr, 0.0), 1.0)
+        parts = []
+        p = a
+        t_p = t_a
+        for q in sorted(set(points), key=projection) + [b]:
+            t_q = t_b if q == b else t_a + (t_b-t_a)*projection(q)
+            if q != p:
+                parts.append((p, q, index, t_p, t_q, jump))
+            p = q
+            t_p = t_q
+        return parts
+
+    def jump(self, h):
+        # difference of the values left and right of half edge h
+        u, v = h
+        return self.edges[h][0] if u < v else -self.edges[v, u][0]
+
+    def next_half_edge(self, h):
+        # The next half edge of the region left of h is the next edge
+        # clockwise of h's twin at h's end.
+        u, v = h
+        vertices = self.neighbors[v]
+        return (v, vertices[self.index[v, u]-1])
+
+    def cycle(self, h):
+        # the half edges of the cycle of h starting with h
+        cycle = [h]
+        g = self.next_half_edge(h)
+        while g != h:
+            cycle.append(g)
+            g = self.next_half_edge(g)
+        return cycle
+
+    def value_at(self, v):
+        '''return the value just left of vertex v
+
+        The value changes at each edge between v and the far left, i.e. which
+        crosses the ray from v to the left. The ray is shifted up by an
+        infinitely small distance, so edges ending at the ray's height only
+        count if they go up.
+        '''
+        value = 0
+        for (p, q), (jump, _) in self.edges.items():
+            if (p[1] <= v[1] < q[1]) or (q[1] <= v[1] < p[1]):
+                dy = q[1] - p[1]
+                left = (p[0]-v[0])*dy + (q[0]-p[0])*(v[1]-p[1])
+                if left != 0 and (left < 0) == (dy > 0):
+                    # An edge going up is crossed from its left to its right.
+                    value += -jump if dy > 0 else jump
+        return value
+
+    def value_left_of(self, h):
+        # value of the region left of half edge h
+        return self.values[self.cycles[h]]
+
+    def boundary(self, keep):
+        '''return the contours of the regions whose values are kept
+
+        The regions with the value 0 are never kept. The contours are
+        clockwise around the kept regions.
+
+        Args:
+            keep (function): returns whether a value is kept
+
+        Returns:
+            list[list[tuple]]: segments of each contour, see
+                contour_to_segments()
+        '''
+        def kept(value):
+            return value != 0 and keep(value)
+        # half edges with a kept region right and another region left
+        half_edges = set(
+            h for h in self.index
+            if kept(self.value_left_of((h[1], h[0]))) and not kept(self.value_left_of(h))
+        )
+        contours = []
+        while half_edges:
+            h = min(half_edges)
+            cycle = []
+            while h in half_edges:
+                half_edges.remove(h)
+                cycle.append(h)
+                # The next half edge is the first one of the boundary
+                # counterclockwise of h's twin at h's end.
+                u, v = h
+                vertices = self.neighbors[v]
+                i = self.index[v, u]
+                for k in range(1, len(vertices)+1):
+                    g = (v, vertices[(i+k) % len(vertices)])
+                    if g in half_edges or g == cycle[0]:
+                        break
+                h = g
+            contours.append(self.join_half_edges(cycle))
+        return contours
+
+    def source(self, h):
+        # segment and parameters of the start and end of half edge h
+        u, v = h
+        if u < v:
+            return self.edges[h][1]
+        index, t_u, t_v = self.edges[v, u][1]
+        return (index, t_v, t_u)
+
+    def join_half_edges(self, cycle):
+        '''return the segments of a contour made from a cycle of half edges
+
+        Consecutive half edges which are consecutive parts of the same segment
+        are joined to the part of the segment.
+        '''
+        sources = [self.source(h) for h in cycle]
+        def continues(k):
+            # whether half edge k continues half edge k-1
+            index, t_start, _ = sources[k]
+            previous_index, _, previous_t_end = sources[k-1]
+            return index == previous_index and t_start == previous_t_end
+        # start with a half edge that doesn't continue the previous one
+        start = next((k for k in range(len(cycle)) if not continues(k)), 0)
+        cycle = cycle[start:] + cycle[:start]
+        sources = sources[start:] + sources[:start]
+
+        g = self.grid_size
+        segments = []
+        k = 0
+        while k < len(cycle):
+            index, t_start, t_end = sources[k]
+            first = cycle[k][0]
+            k += 1
+            while k < len(cycle) and continues(k):
+                t_end = sources[k][2]
+                k += 1
+            last = cycle[k-1][1]
+            start_point = (first[0]*g, first[1]*g)
+            end_point = (last[0]*g, last[1]*g)
+            segment = self.segments[index]
+            if len(segment) == 2:
+                segments.append((start_point, end_point))
+            else:
+                part = segment_part(segment, t_start, t_end)
+                segments.append((start_point, part[1], part[2], end_point))
+        return segments
+
+
+class SourceTracker():
+    '''keeps track of the input file METAFONT is reading and of the lines of
+    the characters in the input files
+
+    METAFONT writes `(' followed by the file name to the log file when it
+    starts reading a file and `)' when it finishes reading it. Other
+    parentheses outside of the commands, e.g. in messages, are expected to be
+    balanced.
+
+    Args:
+        cwd (str): working directory of METAFONT
+    '''
+    def __init__(self, cwd):
+        self.cwd = cwd
+        self.paren_pattern = re.compile(r'\(([^\s()]*)|\)')
+        # paths of the files being read, None for other opening parentheses
+        self.stack = []
+        # charcode, path, first and last line of every character
+        self.chars = []
+
+    def scan(self, text):
+        '''updates the files being read from text outside of the commands
+
+        Args:
+            text (str): part of the log file without line breaks
+        '''
+        for match in self.paren_pattern.finditer(text):
+            if match.group(0) == ')':
+                if self.stack:
+                    self.stack.pop()
+            else:
+                self.stack.append(self.find_file(match.group(1)))
+
+    def find_file(self, name):
+        '''finds the file whose name is at the beginning of name
+
+        Since the line breaks are removed, the text following a file name in
+        the log file may be appended to it.
+
+        Args:
+            name (str): text following an opening parenthesis
+
+        Returns:
+            str: normalized path of the file or None if it isn't a file
+        '''
+        for end in range(len(name), 0, -1):
+            path = os.path.normpath(os.path.join(self.cwd, name[:end]))
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def current_file(self):
+        '''return the path of the file being read
+
+        Returns:
+            str: normalized path of the file or None if it is unknown
+        '''
+        for path in reversed(self.stack):
+            if path is not None:
+                return path
+        return None
+
+    def add_command(self, cmd):
+        '''records the lines of a character from its char and endchar commands
+
+        Args:
+            cmd (tuple[str]): name, line and body of a command
+        '''
+        cmd_name, line, body = cmd
+        if cmd_name == 'char':
+            charcode = int(round(float(body.split('>> ')[1])))
+            self.chars.append([charcode, self.current_file(), int(line) if line else None, None])
+        elif cmd_name == 'endchar' and self.chars and line:
+            char = self.chars[-1]
+            if char[3] is None and char[1] == self.current_file():
+                char[3] = int(line)
+
+
+class Profiler():
+    '''records the wall and CPU time of the phases of a run and of the glyphs
+
+    A phase is measured from start() to add(). The time spent reading and
+    parsing the commands is only added to the phase tokenize, not to the
+    phases it happens in. The time of a glyph is the time of its commands,
+    from the previous shipout up to its shipout. If the profiler isn't
+    enabled, nothing is recorded.
+
+    Args:
+        enabled (bool, optional): whether the times are recorded
+    '''
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = {} # name: [count, wall time, CPU time]
+        self.glyphs = {} # glyph code: [wall time, CPU time]
+        self.glyph_times = [0.0, 0.0] # times of the commands since the last shipout
+        self.tokenize_times = [0.0, 0.0] # total times of phase tokenize
+        # resource usage of the child processes, i.e. METAFONT
+        self.mf_usage = None
+        if enabled and resource is not None:
+            self.children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        else:
+            self.children_usage = None
+        self.start_times = self.start()
+
+    def start(self):
+        '''return the start of a phase
+
+        Returns:
+            tuple[float]: times at the start or None if disabled
+        '''
+        if not self.enabled:
+            return None
+        return (time(), process_time(), self.tokenize_times[0], self.tokenize_times[1])
+
+    def record(self, name, wall, cpu):
+        '''adds wall and CPU time to phase name
+
+        Args:
+            name (str): name of the phase
+            wall (float): wall time in seconds
+            cpu (float): CPU time in seconds
+        '''
+        phase = self.phases.setdefault(name, [0, 0.0, 0.0])
+        phase[0] += 1
+        phase[1] += wall
+        phase[2] += cpu
+
+    def add(self, name, start):
+        '''adds the time since start to phase name
+
+        Args:
+            name (str): name of the phase
+            start (tuple[float]): start of the phase from start()
+
+        Returns:
+            tuple[float]: wall and CPU time of the phase or None if disabled
+        '''
+        if start is None:
+            return None
+        wall = time() - start[0] - (self.tokenize_times[0] - start[2])
+        cpu = process_time() - start[1] - (self.tokenize_times[1] - start[3])
+        self.record(name, wall, cpu)
+        return wall, cpu
+
+    def add_command(self, name, start, glyph_code=None):
+        '''adds the time since start to the phase of command name and to the
+        time of the current glyph
+
+        Args:
+            name (str): name of the command
+            start (tuple[float]): start of the command from start()
+            glyph_code (int, optional): code of the glyph if the command
+                ships it out
+        '''
+        times = self.add('command ' + name, start)
+        if times is None:
+            return
+        self.glyph_times[0] += times[0]
+        self.glyph_times[1] += times[1]
+        if glyph_code is not None:
+            glyph = self.glyphs.setdefault(glyph_code, [0.0, 0.0])
+            glyph[0] += self.glyph_times[0]
+            glyph[1] += self.glyph_times[1]
+            self.glyph_times = [0.0, 0.0]
+
+    def add_mf(self, start):
+        '''adds the time since start to phase mf and records the resource
+        usage of the finished child processes
+
+        The time spent reading the log file while METAFONT runs is included.
+
+        Args:
+            start (tuple[float]): start of METAFONT from start()
+        '''
+        if start is None:
+            return
+        self.record('mf', time() - start[0], process_time() - start[1])
+        if self.children_usage is not None:
+            usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+            self.mf_usage = {
+                'user_time': usage.ru_utime - self.children_usage.ru_utime,
+                'system_time': usage.ru_stime - self.children_usage.ru_stime,
+                'max_rss': usage.ru_maxrss,
+                'minor_page_faults': usage.ru_minflt - self.children_usage.ru_minflt,
+                'major_page_faults': usage.ru_majflt - self.children_usage.ru_majflt,
+                'block_inputs': usage.ru_inblock - self.children_usage.ru_inblock,
+                'block_outputs': usage.ru_oublock - self.children_usage.ru_oublock,
+            }
+
+    def tokenize(self, cmds):
+        '''yields the commands, the time for getting them is added to phase
+        tokenize
+
+        Args:
+            cmds (iterable[Command]): commands, e.g. from parse_commands()
+
+        Yields:
+            Command: the command
+        '''
+        cmds = iter(cmds)
+        while True:
+            start_wall, start_cpu = time(), process_time()
+            cmd = next(cmds, None)
+            wall, cpu = time() - start_wall, process_time() - start_cpu
+            self.record('tokenize', wall, cpu)
+            self.tokenize_times[0] += wall
+            self.tokenize_times[1] += cpu
+            if cmd is None:
+                return
+            yield cmd
+
+    def to_data(self):
+        '''return the recorded times which can be passed to other processes
+
+        Returns:
+            dict: the phases and glyphs, see merge()
+        '''
+        return {'phases': self.phases, 'glyphs': self.glyphs}
+
+    def merge(self, data):
+        '''adds the times recorded by another profiler
+
+        Args:
+            data (dict): times from Profiler.to_data()
+        '''
+        for name, (count, wall, cpu) in data['phases'].items():
+            phase = self.phases.setdefault(name, [0, 0.0, 0.0])
+            phase[0] += count
+            phase[1] += wall
+            phase[2] += cpu
+        for glyph_code, (wall, cpu) in data['glyphs'].items():
+            glyph = self.glyphs.setdefault(glyph_code, [0.0, 0.0])
+            glyph[0] += wall
+            glyph[1] += cpu
+
+    def report(self):
+        '''return the report of the recorded times
+
+        The phases are sorted by their wall time, the glyphs by their code.
+        Times of other processes, e.g. of the jobs, are included in the
+        phases and glyphs but not in the total.
+
+        Returns:
+            dict: the report
+        '''
+        return {
+            'total': {
+                'wall': time() - self.start_times[0],
+                'cpu': process_time() - self.start_times[1],
+            },
+            'phases': {
+                name: {'count': count, 'wall': wall, 'cpu': cpu}
+                for name, (count, wall, cpu) in sorted(self.phases.items(), key=lambda item: -item[1][1])
+            },
+            'glyphs': {
+                str(glyph_code): {'wall': wall, 'cpu': cpu}
+                for glyph_code, (wall, cpu) in sorted(self.glyphs.items())
+            },
+            'mf': self.mf_usage,
+        }
+
+
+def open_log(path):
+    '''opens a raw or gzip-compressed log file for reading
+
+    Args:
+        path (str): path of the log file
+
+    Returns:
+        tuple[TextIO, int]: the opened file and the size of its (uncompressed)
+            content, used to show the progress
+    '''
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+        if magic == b'\x1f\x8b':
+            # The gzip trailer ends with the size of the uncompressed data
+            # modulo 2**32.
+            f.seek(-4, os.SEEK_END)
+            size = int.from_bytes(f.read(4), 'little')
+            return gzip.open(path, 'rt'), size
+    return open(path, 'r'), os.path.getsize(path)
+
+# number of bytes of the parameters of GF's commands which are skipped by
+# read_gf_specials(), by their opcode
+GF_PARAMETER_SIZES = {
+    64: 1, 65: 2, 66: 3, # paint1 to paint3
+    67: 24, 68: 5, # boc and boc1
+    71: 1, 72: 2, 73: 3, # skip1 to skip3
+    243: 4, # yyy
+    245: 17, 246: 10, # char_loc and char_loc0
+}
+
+def read_gf_specials(f, chunk_size=65536):
+    '''yields the specials of a GF file
+
+    The file is read in chunks, everything but the specials is skipped. The
+    GF format is described in METAFONT: The Program, part 45.
+
+    Args:
+        f (BinaryIO): the GF file opened in binary mode
+        chunk_size (int, optional): number of bytes read at once
+
+    Yields:
+        str | int: the string of a special (xxx) or the scaled number of a
+            numspecial (yyy)
+    '''
+    buf = b''
+    pos = 0
+    while True:
+        if pos >= len(buf):
+            buf = f.read(chunk_size)
+            pos = 0
+            if not buf:
+                return
+        op = buf[pos]
+        if op < 64 or 74 <= op <= 238 or op in (69, 70, 244):
+            # paint_0 to paint_63, new_row, eoc, skip0 and no_op
+            pos += 1
+            continue
+        if op >= 248:
+            # post, nothing but the character locators follows
+            return
+        if 239 <= op <= 242:
+            head = op - 237 # xxx1 to xxx4 and the length of the string
+        elif op == 247:
+            head = 3 # pre, its identification byte and the comment's length
+        else:
+            head = 1 + GF_PARAMETER_SIZES[op]
+        if len(buf) - pos < head:
+            buf = buf[pos:] + f.read(max(chunk_size, head))
+            pos = 0
+            if len(buf) < head:
+                return
+        if 239 <= op <= 242:
+            size = head + int.from_bytes(buf[pos+1:pos+head], 'big')
+        elif op == 247:
+            size = head + buf[pos+2]
+        else:
+            size = head
+        if len(buf) - pos < size:
+            buf = buf[pos:] + f.read(max(chunk_size, size))
+            pos = 0
+            if len(buf) < size:
+                return
+        if 239 <= op <= 242:
+            yield buf[pos+head:pos+size].decode('latin-1')
+        elif op == 243:
+            yield int.from_bytes(buf[pos+1:pos+5], 'big', signed=True)
+        pos += size
+
+def format_scaled(s):
+    '''formats a scaled number like METAFONT shows it
+
+    This is print_scaled of METAFONT: The Program, §103, so the shortest
+    decimal which is rounded to the same scaled number is used.
+
+    Args:
+        s (int): number in units of 2**-16
+
+    Returns:
+        str: the number with at most five decimal places
+    '''
+    text = ''
+    if s < 0:
+        text = '-'
+        s = -s
+    text += str(s // 65536)
+    s = 10*(s % 65536) + 5
+    if s != 5:
+        delta = 10
+        text += '.'
+        while True:
+            if delta > 65536:
+                s += 32768 - delta//2 # round the last digit
+            text += str(s // 65536)
+            s = 10*(s % 65536)
+            delta *= 10
+            if s <= delta:
+                break
+    return text
+
+def format_gf_path(numbers, cyclic):
+    '''formats the numbers of a pair or path like METAFONT shows it
+
+    Args:
+        numbers (list[int]): scaled coordinates of the first point, followed
+            by the postcontrol, precontrol and point of every segment. The
+            last point of a cyclic path is left out.
+        cyclic (bool): whether the path is cyclic
+
+    Returns:
+        str: the pair or path
+    '''
+    pairs = [
+        '(' + format_scaled(numbers[k]) + ',' + format_scaled(numbers[k+1]) + ')'
+        for k in range(0, len(numbers) - 1, 2)
+    ]
+    text = pairs[0]
+    for k in range(1, len(pairs), 3):
+        text += '..controls ' + pairs[k] + ' and ' + pairs[k+1] + ' ..'
+        text += pairs[k+2] if k+2 < len(pairs) else 'cycle'
+    return text
+
+def hash_lines(path):
+    '''return hashes of the lines of a file
+
+    Args:
+        path (str): path of the file
+
+    Returns:
+        list[str]: hash of every line
+    '''
+    with open(path, 'rb') as f:
+        return [hashlib.md5(line).hexdigest()[:16] for line in f.read().split(b'\n')]
+
+def hash_file(path):
+    '''return the hash of a file's content
+
+    Args:
+        path (str): path of the file
+
+    Returns:
+        str: hexadecimal SHA-256 hash
+    '''
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def relative_path(path, start):
+    '''return path relative to start if it's inside of start
+
+    Args:
+        path (str): absolute path or path relative to start
+        start (str): absolute path of a directory
+
+    Returns:
+        str: the relative path or the normalized absolute path
+    '''
+    path = os.path.normpath(os.path.join(start, path))
+    start = os.path.normpath(start)
+    try:
+        if os.path.commonpath([path, start]) == start:
+            return os.path.relpath(path, start)
+    except ValueError:
+        # on different drives
+        pass
+    return path
+
+def read_recorder_file(path):
+    '''reads the input files from a .fls file written by METAFONT's
+    -recorder option
+
+    Args:
+        path (str): path of the .fls file
+
+    Returns:
+        list[str]: normalized paths of the input files
+    '''
+    input_files = []
+    working_dir = ''
+    with open(path, 'r') as f:
+        for line in f:
+            key, _, value = line.rstrip('\n').partition(' ')
+            if key == 'PWD':
+                working_dir = value
+            elif key == 'INPUT':
+                input_file = os.path.normpath(os.path.join(working_dir, value))
+                if input_file not in input_files:
+                    input_files.append(input_file)
+    return input_files
+
+def match_wrapped(text, pos, s, complete=True):
+    '''matches s at pos of text, s may be split up by single line breaks
+
+    Args:
+        text (str): the text
+        pos (int): position in text
+        s (str): string without line breaks
+        complete (bool, optional): whether text is complete or may be continued
+
+    Returns:
+        int: position after the match, -1 if s doesn't match or None if it's
+            unknown since text is incomplete
+    '''
+    k = 0
+    wrapped = False
+    while k < len(s):
+        if pos >= len(text):
+            return -1 if complete else None
+        if text[pos] == s[k]:
+            k += 1
+            wrapped = False
+        elif text[pos] == '\n' and k > 0 and not wrapped:
+            wrapped = True
+        else:
+            return -1
+        pos += 1
+    return pos
+
+def flatten_segment(segment, flatness, max_depth=16):
+    '''flattens a segment to lines
+
+    A cubic Bézier curve is split in halves until the control points of each
+    part are not farther than flatness from the line between its ends. Thus,
+    straight or flat parts of curves need only few lines.
+
+    Args:
+        segment (tuple): start and end point of a line or start point, control
+            points and end point of a cubic Bézier curve
+        flatness (float): max. distance of the control points from the lines
+        max_depth (int, optional): max. number of times a part is split.
+            Defaults to 16.
+
+    Returns:
+        list[tuple]: the parameter and the point of the end of each line,
+            the last one is the end of the segment
+    '''
+    if len(segment) == 2:
+        return [(1.0, segment[1])]
+    def is_flat(part):
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = part
+        dx, dy = x3-x0, y3-y0
+        d = sqrt(dx*dx + dy*dy)
+        if d == 0:
+            return max(abs(x1-x0), abs(y1-y0), abs(x2-x0), abs(y2-y0)) <= flatness
+        return (
+            abs((x1-x0)*dy - (y1-y0)*dx) <= flatness*d
+            and abs((x2-x0)*dy - (y2-y0)*dx) <= flatness*d
+        )
+    points = []
+    # parts still to be flattened with their parameters and depth, the first
+    # part of the curve last
+    pending = [(segment, 0.0, 1.0, 0)]
+    while pending:
+        part, t0, t1, depth = pending.pop()
+        if depth >= max_depth or is_flat(part):
+            points.append((t1, part[3]))
+        else:
+            first, second = split_segment(part, 0.5)
+            t = (t0+t1)/2
+            pending.append((second, t, t1, depth+1))
+            pending.append((first, t0, t, depth+1))
+    points[-1] = (1.0, segment[3])
+    return points
 
-            # fontdimen command's syntax uses of colon (:). Therefor some
-            # redefinitions are needed to be used in combinations with e.g. the
-            # if statement
-            'def fontdimen text t='+m_+'fontdimen"; show hppp; begingroup '
-                'save:;'
-                'def:text tt=;'+mm_+':";show tt enddef;' # TODO Use __mfIIvec__special_colon__ here instead of : ?
-                '__mfIIvec__redef_colon__ '
-                'show t endgroup; '+m__+
-            'enddef;'
+def split_segment(segment, t):
+    '''splits a cubic Bézier curve with de Casteljau's algorithm
 
-            # end should show the designsize: "METAFONT looks at the value of
-            # designsize only when the job ends" (The METAFONTbook, p. 320)
-            'def end='+m_+'end";show designsize;'+m__+'__mfIIvec__orig_end__ enddef;'
+    Args:
+        segment (tuple): start point, control points and end point
+        t (float): parameter where the curve is split
 
-            # tricks and redefinitions\
-            # The pen tracing of paths is done by FontForge which needs the
-            # Bezier curve of the pen tip's shape. Hence, every pen should be a
-            # path describing it's tip. The nullpen should be a very minimal
-            # path. The pencircle should be the path of a fullcircle. Since
-            # every pen is a path, penoffset needs to be redefined to
-            # directionpoint and the definitions makepen and makepath are no
-            # longer needed.\
-            # Note that \dl{fullcirlce} and \dl{directionpoint} are defined in
-            # plain mf.
-            'let pen = path; def nullpen = ((0,0)..cycle) enddef; def pencircle = fullcircle enddef;'
-            'def penoffset = directionpoint enddef;' # TODO explain
-            'let makepen = relax;'
-            'let makepath = relax;'
-            # mf is run in background, so don't display anything.
-            'def display text t = enddef;'
-            # nullpicture should be a variables of type \dl{picture}.
-            'save nullpicture; picture nullpicture;'
-            # The loading of plain.mf is preceded by some saves so there will be no errors.
-            'save hide, blankpicture, unitpixel, pensquare, penrazor, mm, pt, dd, bp, cm, pc, cc, in, modesetup, mode_name, mode;'
-            'input plain.mf;'
+    Returns:
+        tuple[tuple]: the parts before and after t
+    '''
+    p0, p1, p2, p3 = segment
+    p01, p12, p23 = [
+        (p[0] + (q[0]-p[0])*t, p[1] + (q[1]-p[1])*t)
+        for p, q in ((p0, p1), (p1, p2), (p2, p3))
+    ]
+    p012 = (p01[0] + (p12[0]-p01[0])*t, p01[1] + (p12[1]-p01[1])*t)
+    p123 = (p12[0] + (p23[0]-p12[0])*t, p12[1] + (p23[1]-p12[1])*t)
+    p0123 = (p012[0] + (p123[0]-p012[0])*t, p012[1] + (p123[1]-p012[1])*t)
+    return (p0, p01, p012, p0123), (p0123, p123, p23, p3)
+
+def segment_part(segment, t_start, t_end):
+    '''return the part of a cubic Bézier curve between two parameters
 
-            # A special mode is defined, to prepare for vector font generation.
-            'mode_def mfIIff='
-                'proofing:=0;' # don't make proofs
-                'fontmaking:=0;' # mf itself should not make a font
-                'tracingtitles:=0;' # no titles (e.g. "The letter O") in stdout
-                'pixels_per_inch:=' + str(self.ppi) + ';'
-                'blacker:=0;' # no "special correction"
-                'fillin:=0;' # no pixels that could influence their neighbors
-                'o_correction:=1;' # no reduction in overshoot
-            'enddef;'
-            'mode:=mfIIff;'
+    Args:
+        segment (tuple): start point, control points and end point
+        t_start (float): parameter of the part's start
+        t_end (float): parameter of the part's end, may be smaller than
+            t_start for the reversed part
+
+    Returns:
+        tuple: start point, control points and end point of the part
+    '''
+    t0, t1 = min(t_start, t_end), max(t_start, t_end)
+    part = segment
+    if t1 < 1:
+        part = split_segment(part, t1)[0]
+    if t0 > 0:
+        part = split_segment(part, t0/t1)[1]
+    return part if t_start <= t_end else part[::-1]
+
+def overlapping_groups(boxes):
+    '''groups bounding boxes which overlap directly or via other boxes
+
+    The boxes are sorted by their left sides, so only the boxes reaching to
+    the current box's left side need to be compared to it.
+
+    Args:
+        boxes (list[tuple[float]]): xmin, ymin, xmax and ymax of each box
+
+    Returns:
+        list[list[int]]: the indices of the boxes of each group in ascending
+            order, the groups in the order of their first box
+    '''
+    parents = list(range(len(boxes)))
+    def root(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+    active = []
+    for i in sorted(range(len(boxes)), key=lambda i: boxes[i][0]):
+        x_min, y_min, _, y_max = boxes[i]
+        active = [j for j in active if boxes[j][2] >= x_min]
+        for j in active:
+            if boxes[j][1] <= y_max and boxes[j][3] >= y_min:
+                parents[root(j)] = root(i)
+        active.append(i)
+    groups = {}
+    for i in range(len(boxes)):
+        groups.setdefault(root(i), []).append(i)
+    return list(groups.values())
+
+def segment_intersections(a, b, c, d):
+    '''return the intersections of two line segments on a grid
+
+    The coordinates are integers. The intersection of crossing segments is
+    rounded to the grid. Of collinear overlapping segments, the ends of each
+    segment inside the other one are returned.
+
+    Args:
+        a, b (tuple[int]): start and end of the first segment
+        c, d (tuple[int]): start and end of the second segment
+
+    Returns:
+        list[tuple[int]]: the intersections
+    '''
+    r = (b[0]-a[0], b[1]-a[1])
+    s = (d[0]-c[0], d[1]-c[1])
+    ac = (c[0]-a[0], c[1]-a[1])
+    den = r[0]*s[1] - r[1]*s[0]
+    if den == 0:
+        if ac[0]*r[1] - ac[1]*r[0] != 0:
+            return [] # parallel
+        rr = r[0]*r[0] + r[1]*r[1]
+        ss = s[0]*s[0] + s[1]*s[1]
+        return (
+            [p for p in (c, d) if 0 < (p[0]-a[0])*r[0] + (p[1]-a[1])*r[1] < rr]
+            + [p for p in (a, b) if 0 < (p[0]-c[0])*s[0] + (p[1]-c[1])*s[1] < ss]
         )
+    # a + t*r = c + u*s
+    t = ac[0]*s[1] - ac[1]*s[0]
+    u = ac[0]*r[1] - ac[1]*r[0]
+    if den < 0:
+        den, t, u = -den, -t, -u
+    if not (0 <= t <= den and 0 <= u <= den):
+        return []
+    # a + t*r/den rounded to integers
+    return [(
+        a[0] + (2*r[0]*t + den)//(2*den),
+        a[1] + (2*r[1]*t + den)//(2*den),
+    )]
+
+def contour_to_segments(c):
+    '''converts a closed fontforge contour to its segments
 
-    def show_progress(self, start_time_ff, i, num_cmds):
-        '''shows progress bar and ETA
+    Args:
+        c (fontforge.contour): the contour
 
-        Args:
-            start_time_ff (float): start time of fontforge from time.time()
-            i (int): index of current command (0 based)
-            num_cmds (int): number of commands
-        '''
-        # simple eta formula
-        eta = (time()-start_time_ff)*(num_cmds-(i+1))/(i+1)
-        # find appropriate unit
-        # dot and extra space to separate from FontForge warnings
-        if eta < 60:
-            eta_unit = 's.   '
-        elif eta < 60*60:
-            eta_unit = 'min. '
-            eta /= 60
-        elif eta < 60*60*24:
-            eta_unit = 'h.   '
-            eta /= 60*60
+    Returns:
+        list[tuple]: for each segment of the contour its start and end point
+            if it's a line or its start point, control points and end point if
+            it's a cubic Bézier curve. Quadratic curves are converted to cubic
+            ones.
+    '''
+    points = [(p.x, p.y, p.on_curve) for p in c]
+    on_curve = [i for i, p in enumerate(points) if p[2]]
+    if not on_curve:
+        return []
+    # start with an on-curve point
+    points = points[on_curve[0]:] + points[:on_curve[0]] + [points[on_curve[0]]]
+    segments = []
+    start = points[0][:2]
+    controls = []
+    for x, y, is_on_curve in points[1:]:
+        if not is_on_curve:
+            controls.append((x, y))
+            continue
+        if c.is_quadratic and len(controls) > 1:
+            # implied on-curve points between the control points
+            for p, q in zip(controls, controls[1:]):
+                mid = ((p[0]+q[0])/2, (p[1]+q[1])/2)
+                segments.append(quadratic_to_cubic(start, p, mid))
+                start = mid
+            controls = controls[-1:]
+        if not controls:
+            segments.append((start, (x, y)))
+        elif len(controls) == 1:
+            segments.append(quadratic_to_cubic(start, controls[0], (x, y)))
         else:
-            eta_unit = 'd.   '
-            eta /= 60*60*24
+            segments.append((start, controls[0], controls[-1], (x, y)))
+        start = (x, y)
+        controls = []
+    return segments
 
-        n = 10 # width of progress bar (max number of '=')
-        sys.stdout.write(
-            '\r[{:{n}}'.format('='*int(n*((i+1)/num_cmds)), n=n)
-            + '] {:>3d}'.format(int(((i+1)/num_cmds)*100)) + '%, '
-            + '{:>{len_cmds}d}'.format(i+1, len_cmds=len(str(num_cmds))) + '/{:d}'.format(num_cmds) + ', '
-            + 'line ' + str(self.last_known_line) + ', '
-            + 'ETA: {:6.3f}'.format(eta) + ' ' + eta_unit
-        )
-        sys.stdout.flush()
+def quadratic_to_cubic(p0, p1, p2):
+    '''return the cubic Bézier curve of a quadratic one
 
-    def to_glyph_name(self, g):
-        '''converts name or code point g to FontForge glyph name
+    Args:
+        p0, p1, p2 (tuple[float]): start point, control point and end point
 
-        If name is unknown, use first character of name and print a warning.
+    Returns:
+        tuple: start point, control points and end point
+    '''
+    return (
+        p0,
+        (p0[0] + 2*(p1[0]-p0[0])/3, p0[1] + 2*(p1[1]-p0[1])/3),
+        (p2[0] + 2*(p1[0]-p2[0])/3, p2[1] + 2*(p1[1]-p2[1])/3),
+        p2,
+    )
 
-        Args:
-            g (str or int): glyph code point or name
+def contour_from_segments(segments):
+    '''converts segments from contour_to_segments() to a closed fontforge
+    contour
 
-        Returns:
-            string: FontForge glyph name
-        '''
-        if isinstance(g, str):
-            if fontforge.unicodeFromName(g) != -1:
-                return g
-            else:
-                try:
-                    # convert name to Unicode character and back to Fontforge glyph name
-                    return fontforge.nameFromUnicode(unicodedata.decimal(unicodedata.lookup(g)))
-                except KeyError:
-                    print('! \'' + g + '´ is not a valid glyph name. \'' + g[0] + '´ is assumed.')
-                    return g[0]
+    Args:
+        segments (list[tuple]): the segments
+
+    Returns:
+        fontforge.contour: the contour
+    '''
+    c = fontforge.contour()
+    c.moveTo(*segments[0][0])
+    for segment in segments:
+        if len(segment) == 2:
+            c.lineTo(*segment[1])
         else:
-            return fontforge.nameFromUnicode(g)
+            c.cubicTo(*segment[1], *segment[2], *segment[3])
+    c.closed = True
+    return c
 
-    def add_contours(self, picture, paths):
-        '''adds `paths` as contours to fontforge layer `picture`
+def contour_to_data(c):
+    '''converts a fontforge contour to data which can be passed to other
+    processes
 
-        Args:
-            picture (str): The name of the picture.
-            paths (list[str]): List of path definitions.
-        '''
-        for path in paths:
-            c = fontforge.contour()
-            p = self.pair_pattern.search(path)
-            c.moveTo(float(p.group(1)), float(p.group(2)))
-            for j in self.join_pattern.finditer(path[p.end():]):
-                if j.group(7) == None: # j.group(7) is cycle
-                    c.cubicTo(
-                        float(j.group(1)), float(j.group(2)),
-                        float(j.group(3)), float(j.group(4)),
-                        float(j.group(5)), float(j.group(6))
-                    )
-                else: # path is closed by connecting to first point `p`
-                    c.cubicTo(
-                        float(j.group(1)), float(j.group(2)),
-                        float(j.group(3)), float(j.group(4)),
-                        float(p.group(1)), float(p.group(2))
-                    )
-                    c.closed = True
-                    break
-            self.pictures[picture] += c
+    Args:
+        c (fontforge.contour): the contour
 
-    def reversed_path(self, path):
-        '''reverses the given cyclic path
+    Returns:
+        tuple: whether the contour is quadratic, whether it is closed and its
+            points (x, y, on_curve, type)
+    '''
+    return (c.is_quadratic, c.closed, [(p.x, p.y, p.on_curve, getattr(p, 'type', None)) for p in c])
 
-        Args:
-            path (str): description of a cyclic path
+def contour_from_data(data):
+    '''converts data from contour_to_data() back to a fontforge contour
 
-        Returns:
-            str: description of the reversed path
-        '''
-        p = self.pair_pattern.search(path).groups()
-        j = self.join_pattern.findall(path)
-        i = len(j)-1
-        reversed_path = '(' + p[0] + ',' + p[1] + ')..controls (' + j[i][2] + ',' + j[i][3] + ') and (' + j[i][0] + ',' + j[i][1] + ')'
-        for i in range(len(j)-2,-1,-1):
-            reversed_path += ' ..(' + j[i][4] + ',' + j[i][5] + ')..controls (' + j[i][2] + ',' + j[i][3] + ') and (' + j[i][0] + ',' + j[i][1] + ')'
-        reversed_path += ' ..cycle'
-        return reversed_path
+    Args:
+        data (tuple): the contour's data
 
-    def remove_overlap(self, pic_name, s=None):
-        '''applies layer.removeOverlap() to picture pic_name
+    Returns:
+        fontforge.contour: the contour
+    '''
+    is_quadratic, closed, points = data
+    c = fontforge.contour(is_quadratic)
+    for x, y, on_curve, point_type in points:
+        if point_type is None:
+            c += fontforge.point(x, y, on_curve)
+        else:
+            c += fontforge.point(x, y, on_curve, point_type)
+    c.closed = closed
+    return c
 
-        scales the image up before and down after applying removeOverlap to
-        overcome problems or inaccuracies of FontForge. Without this, some
-        points might be missing and some contours might be broken.
+def layer_to_data(layer):
+    '''converts a fontforge layer to data which can be passed to other
+    processes
 
-        Args:
-            pic_name (str): name of a picture in self.pictures s (int or float,
-            optional): scale factor to upscale before and downscale after
-            removeOverlap(). Value should be much greater than 1. Defaults to
-            None. None will use self.params['remove-overlap']['scale-factor'].
-        '''
-        if s is None:
-            s = self.params['remove-overlap']['scale-factor']
-        self.pictures[pic_name].transform((s, 0, 0, s, 0, 0))
-        self.pictures[pic_name].removeOverlap()
-        self.pictures[pic_name].transform((1/s, 0, 0, 1/s, 0, 0))
+    Args:
+        layer (fontforge.layer): the layer
 
-    def remove_artefacts(self, layer):
-        '''remove artefacts in pic to remove unnecessary (parts of) contours
+    Returns:
+        list[tuple]: the data of each contour, see contour_to_data()
+    '''
+    return [contour_to_data(c) for c in layer]
 
-        Simplify messes up with the dish_serif of computer modern
-        even when reducing the error_bound. Therefore an own
-        cleanup is done.
+def layer_from_data(data):
+    '''converts data from layer_to_data() back to a fontforge layer
 
-        Args:
-            pic (fontforge.layer): layers whose contours should be cleaned up
-        '''
-        i_c = 0
-        while i_c < len(layer):
-            c = layer[i_c]
-            if c.closed:
-                # check for collinearity c
-                if self.is_collinear(c):
-                    del layer[i_c]
-                    continue # don't increase by 1 below
-                # check for collinearity of loops inside c
-                # search for points with same coords
-                point_threshold = self.params['remove-artefacts']['collinear']['point-threshold']
-                while True:
-                    for i_p1, i_p2 in permutations([i_p for i_p, p in enumerate(c) if p.on_curve], 2):
-                        p1 = c[i_p1]
-                        p2 = c[i_p2]
-                        if 1 < abs(i_p2 - i_p1) < len(c)-1 and abs(p2.x - p1.x) < point_threshold and abs(p2.y - p1.y) < point_threshold:
-                            if i_p1 < i_p2:
-                                if self.is_collinear(c[i_p1:i_p2]):
-                                    # do del c[i_p1+1:i_p2] without "Segmentation fault (core dumped)"
-                                    for i_p_i in range(i_p2-1, i_p1, -1):
-                                        del c[i_p_i]
-                                    break
-                            else: # end/start is between i_p1 i_p2
-                                if self.is_collinear(c[i_p1:]+c[:i_p2]):
-                                    # TODO too many points removed?
-                                    # do del c[i_p1:] without "Segmentation fault (core dumped)"
-                                    for i_p1_i in range(len(c)-1, i_p1-1, -1):
-                                        del c[i_p1_i]
-                                                # do del c[:i_p2-1]
-                                    for i_p2_i in range(i_p2-1, -1, -1):
-                                        del c[i_p2_i]
-                                    break
-                    else:
-                        # if looped over all combinations and
-                        # condition was not, i.e. for loop didn't
-                        # hit break, no collinearity loop is in c
-                        break
+    Args:
+        data (list[tuple]): the layer's data
 
-            i_c += 1
+    Returns:
+        fontforge.layer: the layer
+    '''
+    layer = fontforge.layer()
+    for contour_data in data:
+        layer += contour_from_data(contour_data)
+    return layer
 
-    def is_collinear(self, c):
-        '''checks whether all points in closed contour c are collinear
+def picture_to_data(picture):
+    '''converts a picture to data which can be passed to other processes
 
-        If all points in the contour c are at the same position, c is considered
-        to be collinear.
+    Args:
+        picture (Picture): the picture
 
-        Args:
-            c (fontforge.contour): the contour to be checked for collinearity
+    Returns:
+        list[tuple]: for each contour its count and its data, see
+            contour_to_data()
+    '''
+    return [(count, contour_to_data(c)) for c, count in picture.entries]
 
-        Returns:
-            bool: whether c is collinear or not
-        '''
-        x_mean = sum(p.x for p in c)/len(c)
-        y_mean = sum(p.y for p in c)/len(c)
-        x_var = sum(abs(p.x - x_mean)**2 for p in c)/len(c)
-        y_var = sum(abs(p.y - y_mean)**2 for p in c)/len(c)
-        if x_var < 0.01 and y_var < 0.01:
-            return True
-        if x_var < y_var:
-            # swap x and y to get precise results for very steep or vertical
-            # linear regressions
-            x_mean, y_mean = y_mean, x_mean
-            x_var, y_var = y_var, x_var
-            xy = [(p.y, p.x) for p in c]
-        else:
-            xy = [(p.x, p.y) for p in c]
-        # do a linear regression and check if the largest distance is below threshold
-        beta = sum((x - x_mean)*(y - y_mean) for x, y in xy)/sum((x - x_mean)**2 for x, _ in xy)
-        alpha = y_mean - (beta*x_mean)
-        denominator = sqrt(beta**2 + 1)
-        d_max = max(abs(-beta*x + 1*y - alpha)/denominator for x, y in xy)
-        return d_max < self.params['remove-artefacts']['collinear']['distance-threshold']
+def picture_from_data(data):
+    '''converts data from picture_to_data() back to a picture
+
+    Args:
+        data (list[tuple]): the picture's data
+
+    Returns:
+        Picture: the picture
+    '''
+    return Picture([[contour_from_data(contour_data), count] for count, contour_data in data])
+
+def process_glyph_segment(options, params, segment, pictures):
+    '''processes a glyph's segment of commands in a worker process
+
+    Args:
+        options (dict): options of the Mf2ff object
+        params (dict): parameters of the Mf2ff object
+        segment (list[Command]): the glyph's commands
+        pictures (dict[str, list]): data of the pictures read by the segment,
+            see picture_to_data()
+
+    Returns:
+        tuple[list[tuple], dict[str, list], dict]: the arguments for
+            Mf2ff.add_glyph() of the glyphs shipped out, the data of the
+            pictures assigned by the segment and the times recorded by the
+            profiler (None if option profile isn't set), see Profiler.to_data()
+    '''
+    mf2ff = Mf2ff()
+    mf2ff.options = options
+    mf2ff.params = params
+    mf2ff.profiler = Profiler(options['profile'])
+    mf2ff.font = fontforge.font()
+    mf2ff.set_up_processing()
+    for name, data in pictures.items():
+        mf2ff.pictures[name] = picture_from_data(data)
+    mf2ff.process_commands(None, segment)
+
+    _, writes = mf2ff.picture_accesses(segment)
+    result = (
+        [
+            (glyph_code, layer_to_data(g.layers[1]), g.width, g.texheight, g.texdepth, g.italicCorrection)
+            for glyph_code, g in mf2ff.shipped_glyphs
+        ],
+        {name: picture_to_data(mf2ff.pictures[name]) for name in writes if name in mf2ff.pictures},
+        mf2ff.profiler.to_data() if options['profile'] else None
+    )
+    mf2ff.font.close()
+    mf2ff.proc_glyph.font.close()
+    return result
+
+def build_font(options, font):
+    '''builds a font of a batch, see Mf2ff.run_batch()
+
+    Args:
+        options (dict): options of all fonts
+        font (dict): attributes and options of the font
+
+    Returns:
+        dict: jobname, wall time in seconds, error message, which is None if
+            the font was built, and the output of the font
+    '''
+    font = dict(font)
+    mf2ff = Mf2ff()
+    mf2ff.options.update(options)
+    mf2ff.options.update(font.pop('options', {}))
+    output = io.StringIO()
+    error = None
+    start_time = time()
+    try:
+        for name, value in font.items():
+            if name not in mf2ff.__dict__:
+                raise ValueError('unknown attribute `' + name + '\'')
+            setattr(mf2ff, name, value)
+        if mf2ff.input_file[-3:] == '.mf':
+            mf2ff.input_file = mf2ff.input_file[:-3]
+        if mf2ff.jobname:
+            mf2ff.mf_options.append('-jobname=' + mf2ff.jobname)
+        with contextlib.redirect_stdout(output):
+            mf2ff.run()
+    except SystemExit:
+        # mf2ff exits after printing an error message starting with !
+        messages = [line[2:] for line in output.getvalue().split('\n') if line[:2] == '! ']
+        error = messages[-1] if messages else 'exited'
+    except Exception as e:
+        error = type(e).__name__ + ': ' + str(e)
+    return {
+        'jobname': mf2ff.jobname or mf2ff.input_file,
+        'time': time() - start_time,
+        'error': error,
+        'output': output.getvalue(),
+    }
 
 
 # __main__ part
@@ -1414,11 +4970,11 @@ def parse_arguments(mf2ff):
                         mf2ff.base = args[i+1]
                         i += 1
                 # negatable mf2ff options
-                elif arg in ('cull-at-shipout', 'debug', 'extrema', 'hint', 'is_type',
-                        'otf', 'remove-artifacts', 'sfd', 'stroke-simplify', 'time', 'ttf'):
+                elif arg in ('clean-log', 'cull-at-shipout', 'debug', 'extrema', 'hint', 'incremental', 'is_type',
+                        'otf', 'pipeline', 'profile', 'remove-artifacts', 'sfd', 'stroke-simplify', 'time', 'ttf'):
                     mf2ff.options[arg] = True
-                elif arg in ('no-cull-at-shipout', 'no-debug', 'no-extrema', 'no-hint', 'no-is_type',
-                        'no-otf', 'no-remove-artifacts', 'no-sfd', 'no-stroke-simplify', 'no-time', 'no-ttf'):
+                elif arg in ('no-clean-log', 'no-cull-at-shipout', 'no-debug', 'no-extrema', 'no-hint', 'no-incremental', 'no-is_type',
+                        'no-otf', 'no-pipeline', 'no-profile', 'no-remove-artifacts', 'no-sfd', 'no-stroke-simplify', 'no-time', 'no-ttf'):
                     mf2ff.options[full_arg[4:]] = False
                 # name value option which don't need to be passed to mf (stored in options property)
                 elif arg.split('=', 1)[0] == 'stroke-accuracy':
@@ -1428,6 +4984,83 @@ def parse_arguments(mf2ff):
                         val = args[i+1]
                         i += 1
                     mf2ff.options['stroke-accuracy'] = float(val)
+                elif arg.split('=', 1)[0] == 'jobs':
+                    if '=' in arg:
+                        val = arg.split('=', 1)[1]
+                    else:
+                        val = args[i+1]
+                        i += 1
+                    mf2ff.options['jobs'] = int(val)
+                elif arg.split('=', 1)[0] == 'log-protocol':
+                    if '=' in arg:
+                        val = arg.split('=', 1)[1]
+                    else:
+                        val = args[i+1]
+                        i += 1
+                    mf2ff.options['log-protocol'] = int(val)
+                elif arg.split('=', 1)[0] == 'mf-shards':
+                    if '=' in arg:
+                        val = arg.split('=', 1)[1]
+                    else:
+                        val = args[i+1]
+                        i += 1
+                    mf2ff.options['mf-shards'] = int(val)
+                elif arg.split('=', 1)[0] == 'glyph-cache':
+                    if '=' in arg:
+                        val = arg.split('=', 1)[1]
+                    else:
+                        val = args[i+1]
+                        i += 1
+                    mf2ff.options['glyph-cache'] = val
+                elif arg.split('=', 1)[0] == 'store':
+                    if '=' in arg:
+                        val = arg.split('=', 1)[1]
+                    else:
+                        val = args[i+1]
+                        i += 1
+                    mf2ff.options['store'] = val
+                elif arg.split('=', 1)[0] == 'cprofile':
+                    if '=' in arg:
+                        val = arg.split('=', 1)[1]
+                    else:
+                        val = args[i+1]
+                        i += 1
+                    mf2ff.options['cprofile'] = val
+                elif arg.split('=', 1)[0] == 'base-cache':
+                    if '=' in arg:
+                        val = arg.split('=', 1)[1]
+                    else:
+                        val = args[i+1]
+                        i += 1
+                    mf2ff.options['base-cache'] = val
+                elif arg.split('=', 1)[0] == 'batch':
+                    if '=' in arg:
+                        val = arg.split('=', 1)[1]
+                    else:
+                        val = args[i+1]
+                        i += 1
+                    mf2ff.options['batch'] = val
+                elif arg.split('=', 1)[0] == 'from-log':
+                    if '=' in arg:
+                        val = arg.split('=', 1)[1]
+                    else:
+                        val = args[i+1]
+                        i += 1
+                    mf2ff.options['from-log'] = val
+                elif arg.split('=', 1)[0] == 'transport':
+                    if '=' in arg:
+                        val = arg.split('=', 1)[1]
+                    else:
+                        val = args[i+1]
+                        i += 1
+                    mf2ff.options['transport'] = val
+                # name value pair which don't need to be passed to mf (stored as property)
+                elif arg.split('=', 1)[0] == 'log-first-line':
+                    if '=' in arg:
+                        mf2ff.log_first_line = arg.split('=', 1)[1]
+                    else:
+                        mf2ff.log_first_line = args[i+1]
+                        i += 1
                 # name value option which don't need to be passed to mf (stored as properties)
                 elif arg.split('=', 1)[0] in font_option_names_str + font_option_names_int + font_option_names_float:
                     name = arg.split('=', 1)[0]
@@ -1470,8 +5103,17 @@ def parse_arguments(mf2ff):
                         '\n'
                         'Options:\n'
                         '  -ascent=NUM            set font\'s ascent\n'
+                        '  -base-cache=DIR        set directory for storing precompiled METAFONT bases\n'
+                        '                           containing plain.mf and the redefinitions of mf2ff, so\n'
+                        '                           they are not read again in later runs (default: disabled)\n'
+                        '  -batch=FILE            build the fonts of a JSON manifest in a pool of processes\n'
+                        '                           instead of a single font (default: disabled)\n'
+                        '  -[no-]clean-log        disable/enable removing the commands written by mf2ff from\n'
+                        '                           the log file (default: enabled)\n'
                         '  -comment=STR           set font\'s comment\n'
                         '  -copyright=STR         set font\'s copyright notice\n'
+                        '  -cprofile=FILE         set file the statistics of Python\'s cProfile module are\n'
+                        '                           written to (default: disabled)\n'
                         '  -[no-]cull-at-shipout  disable/enable extra culling at shipout.\n'
                         '                           MF ships out only positive pixels which is\n'
                         '                           equivalent to cullit before shipout. (default: disabled)\n'
@@ -1484,24 +5126,53 @@ def parse_arguments(mf2ff):
                         '  -fontlog=STR           set font\'s log\n'
                         '  -fontname=STR          set font\'s name\n'
                         '  -font-version=STR      set font\'s version\n'
+                        '  -from-log=FILE         process the commands of a raw or gzip-compressed log file\n'
+                        '                           written by an earlier run instead of running METAFONT\n'
+                        '                           (default: disabled)\n'
                         '  -fullname=STR          set font\'s full name\n'
+                        '  -glyph-cache=DIR       set directory for storing processed glyphs, so unchanged\n'
+                        '                           glyphs are not processed again in later runs\n'
                         '  -help                  display this help\n'
                         '  -[no-]hint             disable/enable auto hinting and auto instructing (default: disabled)\n'
+                        '  -[no-]incremental      disable/enable generating only the characters affected by\n'
+                        '                           changes of the input files since the last run with this\n'
+                        '                           option, the other characters are taken from the .sfd file.\n'
+                        '                           Changes outside of the characters make mf2ff generate all\n'
+                        '                           characters. (default: disabled)\n'
                         '  -[no-]is_type          disable/enable definition of is_pen and is_picture (default: disabled)\n'
                         '                           as pen and picture, respectively\n'
                         '  -italicangle=NUM       set font\'s italic angle\n'
+                        '  -jobs=INT              set number of processes used to process the glyphs\n'
+                        '                           (default: 1)\n'
+                        '  -log-first-line=STR    set first line METAFONT was run with when it wrote the log\n'
+                        '                           file of -from-log (default: the current first line)\n'
+                        '  -log-protocol=INT      set version of the protocol used to write the commands to\n'
+                        '                           the log file, 2 is more compact (default: 1)\n'
+                        '  -mf-shards=INT         set number of METAFONT processes the characters are split\n'
+                        '                           up into by their charcode. Pictures must not be passed from\n'
+                        '                           one character to another. (default: 1)\n'
                         '  -[no-]otf              disable/enable OpenType output generation (default: disabled)\n'
+                        '  -[no-]pipeline         disable/enable processing the log file while METAFONT is\n'
+                        '                           still running (default: disabled)\n'
                         '  -ppi=INT               set ppi to INT\n'
+                        '  -[no-]profile          disable/enable writing the wall and CPU time of the phases\n'
+                        '                           and glyphs to jobname.profile.json (default: disabled)\n'
                         '  -[no-]remove-artifacts disable/enable removing of artifacts (default: disabled)'
                         '  -scripts=TUPLE         set scripts for tables,\n'
                         '                           e.g. ((\'latn\',(\'dflt\',)),)\n'
                         '  -[no-]sfd              disable/enable Spline Font Database (FontForge\n'
                         '                           Project) output generation (default: enabled)\n'
+                        '  -store=DIR             set directory of the build store. If METAFONT\'s input files\n'
+                        '                           and all options are the same as in a previous run, the\n'
+                        '                           generated files are copied from there. (default: disabled)\n'
                         '  -stroke-accuracy=NUM   set stroke accuracy, i.e. target for the allowed error in em-units\n'
                         '                           for layer.simplify() during layer.stoke(). Has no effect if\n'
                         '                           stroke-simplify is disabled. (default: 0.25)\n'
                         '  -[no-]stroke-simplify  disable/enable stroke simplification (default: enabled)\n'
                         '  -[no-]time             disable/enable timing (default: disabled)\n'
+                        '  -transport=STR         set file METAFONT writes the commands to, log or gf. With gf\n'
+                        '                           they are written to the GF file as specials, except for\n'
+                        '                           ligtable and fontdimen. (default: log)\n'
                         '  -[no-]ttf              disable/enable TrueType output generation (default: disabled)\n'
                         '  -upos=NUM              set the font\'s underline position\n'
                         '  -uwidth=NUM            set the font\'s underline width\n'
@@ -0,0 +1,68 @@
+import random
+import unittest
+from collections import namedtuple
+from itertools import permutations
+
+from mf2ff import Mf2ff
+
+Point = namedtuple('Point', ['x', 'y', 'on_curve'])
+
+
+def contour(xy):
+    return [Point(x, y, True) for x, y in xy]
+
+
+class TestCollinearLoop(unittest.TestCase):
+    def setUp(self):
+        self.mf2ff = Mf2ff()
+
+    def find_pairwise(self, c, point_threshold):
+        # compares every pair of on-curve points like mf2ff did before
+        for i_p1, i_p2 in permutations([i_p for i_p, p in enumerate(c) if p.on_curve], 2):
+            p1 = c[i_p1]
+            p2 = c[i_p2]
+            if 1 < abs(i_p2 - i_p1) < len(c)-1 and abs(p2.x - p1.x) < point_threshold and abs(p2.y - p1.y) < point_threshold:
+                if i_p1 < i_p2:
+                    loop = c[i_p1:i_p2]
+                else:
+                    loop = c[i_p1:] + c[:i_p2]
+                if self.mf2ff.is_collinear(loop):
+                    return i_p1, i_p2
+        return None
+
+    def test_loop(self):
+        c = contour([(0, 0), (10, 0), (20, 0), (10, 0), (10, 10), (0, 10)])
+        self.assertEqual(self.mf2ff.find_collinear_loop(c, 0.1), (1, 3))
+        self.assertEqual(self.find_pairwise(c, 0.1), (1, 3))
+
+    def test_loop_around_start(self):
+        c = contour([(20, 0), (10, 0), (10, 10), (0, 10), (0, 0), (10, 0)])
+        self.assertEqual(self.mf2ff.find_collinear_loop(c, 0.1), (5, 1))
+        self.assertEqual(self.find_pairwise(c, 0.1), (5, 1))
+
+    def test_no_loop(self):
+        c = contour([(0, 0), (10, 0), (10, 10), (0, 10)])
+        self.assertIsNone(self.mf2ff.find_collinear_loop(c, 0.1))
+
+    def test_threshold_zero(self):
+        c = contour([(0, 0), (10, 0), (20, 0), (10, 0), (10, 10), (0, 10)])
+        self.assertIsNone(self.mf2ff.find_collinear_loop(c, 0))
+        self.assertIsNone(self.mf2ff.find_collinear_loop(c, -1))
+
+    def test_same_as_pairwise(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            # points on a coarse grid, so some of them coincide
+            c = [
+                Point(rng.randint(0, 3) + rng.uniform(-0.05, 0.05), rng.randint(0, 3), rng.random() < 0.8)
+                for _ in range(rng.randint(3, 12))
+            ]
+            for point_threshold in (0.1, 0.5, 1.5):
+                self.assertEqual(
+                    self.mf2ff.find_collinear_loop(c, point_threshold),
+                    self.find_pairwise(c, point_threshold)
+                )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+from mf2ff import Mf2ff
+
+
+class TestBase(unittest.TestCase):
+    def setUp(self):
+        self.mf2ff = Mf2ff()
+        self.mf2ff.input_file = 'font'
+
+    def test_first_line_without_base(self):
+        first_line = self.mf2ff.get_mf_first_line('mode=mfIIff;')
+        self.assertEqual(
+            first_line,
+            '\\ ' + self.mf2ff.get_preloaded_code() + 'mode=mfIIff;input font'
+        )
+
+    def test_first_line_with_base(self):
+        first_line = self.mf2ff.get_mf_first_line('mode=mfIIff;', base='mf2ff-0123')
+        self.assertEqual(first_line, '&mf2ff-0123 \\ mode=mfIIff;input font')
+
+    def test_preloaded_code_depends_on_options(self):
+        code = self.mf2ff.get_preloaded_code()
+        self.mf2ff.options['is_type'] = True
+        self.assertNotEqual(self.mf2ff.get_preloaded_code(), code)
+
+    def test_preloaded_code_does_not_depend_on_selection(self):
+        code = self.mf2ff.get_preloaded_code('__mfIIvec__code__ = 65')
+        self.assertEqual(self.mf2ff.get_preloaded_code('__mfIIvec__code__ = 66'), code)
+        self.assertNotIn('__mfIIvec__code__ = 65', code)
+
+    def test_first_line_with_base_defines_selection(self):
+        first_line = self.mf2ff.get_mf_first_line('', '__mfIIvec__code__ = 65', 'mf2ff-0123')
+        self.assertEqual(
+            first_line,
+            '&mf2ff-0123 \\ def __mfIIvec__selected__ = (__mfIIvec__code__ = 65) enddef;input font'
+        )
+
+if __name__ == '__main__':
+    unittest.main()
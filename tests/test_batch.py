@@ -0,0 +1,43 @@
+import json
+import os
+import tempfile
+import unittest
+
+from mf2ff import Mf2ff
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.mf2ff = Mf2ff()
+        self.mf2ff.options['sfd'] = False
+        M = self.mf2ff.MARKER
+        self.log_path = os.path.join(self.dir.name, 'a.log')
+        with open(self.log_path, 'w') as f:
+            f.write('**\\ test\n' + M + 'picture\n>> "a"\n' + M + '\n')
+        self.manifest_path = os.path.join(self.dir.name, 'manifest.json')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def run_batch(self, fonts):
+        with open(self.manifest_path, 'w') as f:
+            json.dump({'processes': 2, 'fonts': fonts}, f)
+        return self.mf2ff.run_batch(self.manifest_path)
+
+    def test_failed_fonts_are_isolated(self):
+        fonts = [
+            {'jobname': os.path.join(self.dir.name, 'a'), 'log_first_line': '\\ test',
+                'options': {'from-log': self.log_path}},
+            {'jobname': os.path.join(self.dir.name, 'b'),
+                'options': {'from-log': os.path.join(self.dir.name, 'b.log')}},
+            {'jobname': os.path.join(self.dir.name, 'c'), 'unknown': 1},
+        ]
+        results = self.run_batch(fonts)
+        self.assertEqual([result['jobname'] for result in results], [font['jobname'] for font in fonts])
+        self.assertIsNone(results[0]['error'])
+        self.assertEqual(results[1]['error'], 'I can\'t find file: `' + fonts[1]['options']['from-log'] + '\'.')
+        self.assertEqual(results[2]['error'], 'ValueError: unknown attribute `unknown\'')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -39,7 +39,22 @@ class TestCulling(Mf2ffTest):
         self.assertEqual(P[7].y, 100)
 
     def test_cull_1_1(self):
-        self.fail('result of glyph B not OK')
+        g = self.font['B']
+        l = g.layers[1]
+        self.assertEqual(l.isEmpty(), False)
+        self.assertEqual(len(l), 1)
+
+        c = l[0]
+        P = [p for p in c if p.on_curve]
+
+        self.assertEqual(len(P), 6)
+        self.assertEqual(c.closed, True)
+        self.assertEqual(c.isClockwise(), True)
+
+        self.assertEqual(
+            sorted((p.x, p.y) for p in P),
+            [(100, 200), (100, 300), (200, 100), (200, 200), (300, 100), (300, 300)]
+        )
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,81 @@
+import io
+import unittest
+
+from mf2ff import Mf2ff, format_scaled, read_gf_specials
+
+
+def xxx(s):
+    return bytes([239, len(s)]) + s.encode('latin-1')
+
+def yyy(n):
+    return bytes([243]) + round(n*65536).to_bytes(4, 'big', signed=True)
+
+def command(name, *values):
+    return xxx('@@' + name) + b''.join(values) + xxx('@@')
+
+def path(cyclic, length, *numbers):
+    return xxx(('@c' if cyclic else '@o') + str(length)) + b''.join(yyy(n) for n in numbers)
+
+PRE = bytes([247, 131, 4]) + b'test'
+POST = bytes([248]) + bytes(28)
+
+
+class TestReadGfSpecials(unittest.TestCase):
+    def test_other_commands_are_skipped(self):
+        gf = (PRE + xxx('a') + bytes([68, 65, 0, 1, 0, 1]) + bytes([64, 3, 1, 69])
+            + bytes([244]) + yyy(1) + POST + xxx('b'))
+        self.assertEqual(list(read_gf_specials(io.BytesIO(gf))), ['a', 65536])
+
+    def test_chunk_boundaries(self):
+        gf = PRE + xxx('abcdef') + yyy(-2.5) + xxx('g') + POST
+        self.assertEqual(
+            list(read_gf_specials(io.BytesIO(gf), chunk_size=3)),
+            ['abcdef', -163840, 'g']
+        )
+
+    def test_truncated_file(self):
+        gf = PRE + xxx('a') + xxx('bcd')[:-1]
+        self.assertEqual(list(read_gf_specials(io.BytesIO(gf))), ['a'])
+
+
+class TestReadGfCommands(unittest.TestCase):
+    def read(self, gf):
+        return list(Mf2ff().read_gf_commands(io.BytesIO(PRE + gf + POST)))
+
+    def test_values_are_shown_like_in_the_log_file(self):
+        gf = (
+            command('addto', xxx('@sa'))
+            + command('turningcheck', yyy(0))
+            + command('doublepath', path(False, 1, 0, 0, 1, 1, 2, 2, 3, 3))
+            + command('withpen', path(True, 1, 0, 0, 0, 0, 0, 0))
+            + command('keeping', xxx('@p') + yyy(1) + yyy(4095.99998))
+            + command('char', path(True, 1, 0, 0, 0, 0, 0, 0), yyy(65), xxx('@t'))
+        )
+        self.assertEqual(self.read(gf), [
+            ('addto', '', '"a"'),
+            ('turningcheck', '', '0'),
+            ('doublepath', '', '(0,0)..controls (1,1) and (2,2) ..(3,3)'),
+            ('withpen', '', '(0,0)..controls (0,0) and (0,0) ..cycle'),
+            ('keeping', '', '(1,4095.99998)'),
+            ('char', '', '(0,0)..controls (0,0) and (0,0) ..cycle>> 65>> true'),
+        ])
+
+    def test_commands_are_parsed(self):
+        mf2ff = Mf2ff()
+        shipout = command('shipout', *(yyy(n) for n in (65, 0, 500, 700, 0, 0, 500, 0, 0, 0)))
+        cmds = list(mf2ff.parse_commands(mf2ff.read_gf_commands(io.BytesIO(PRE + shipout + POST))))
+        self.assertEqual(cmds[0].value, (65, 0, 500, 700, 0, 0, 500, 0, 0, 0))
+        self.assertIsNone(cmds[0].line)
+
+
+class TestFormatScaled(unittest.TestCase):
+    def test_format_scaled(self):
+        self.assertEqual(format_scaled(0), '0')
+        self.assertEqual(format_scaled(65536), '1')
+        self.assertEqual(format_scaled(32768), '0.5')
+        self.assertEqual(format_scaled(-180879), '-2.76')
+        self.assertEqual(format_scaled(1), '0.00002')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+from mf2ff import Command, Mf2ff
+
+
+class TestGlyphCacheKey(unittest.TestCase):
+    def setUp(self):
+        self.mf2ff = Mf2ff()
+        self.segment = [self.mf2ff.parse_command(cmd) for cmd in (
+            ('addto', '', '"currentpicture"'),
+            ('contour', '12', '(0,0)..controls (1,1) and (2,2) ..cycle'),
+            ('shipout', '', '65>> 0>> 1>> 1>> 0>> 0>> 1>> 0>> 0>> 0'),
+            ('pic', '', '"currentpicture"'),
+        )]
+
+    def test_line_numbers_are_ignored(self):
+        moved = [Command(cmd.name, cmd.line+3 if cmd.line else None, cmd.body, cmd.value) for cmd in self.segment]
+        self.assertEqual(
+            self.mf2ff.get_glyph_cache_key(self.segment, {}),
+            self.mf2ff.get_glyph_cache_key(moved, {})
+        )
+
+    def test_commands_pictures_and_options_change_key(self):
+        key = self.mf2ff.get_glyph_cache_key(self.segment, {})
+        changed = self.segment[:1] + [self.mf2ff.parse_command(('contour', '12', '(0,0)..controls (1,1) and (2,3) ..cycle'))] + self.segment[2:]
+        self.assertNotEqual(key, self.mf2ff.get_glyph_cache_key(changed, {}))
+        self.assertNotEqual(key, self.mf2ff.get_glyph_cache_key(self.segment, {'serif': []}))
+        self.mf2ff.options['stroke-accuracy'] = 0.1
+        self.assertNotEqual(key, self.mf2ff.get_glyph_cache_key(self.segment, {}))
+
+    def test_output_options_dont_change_key(self):
+        key = self.mf2ff.get_glyph_cache_key(self.segment, {})
+        self.mf2ff.options['otf'] = True
+        self.mf2ff.options['jobs'] = 4
+        self.assertEqual(key, self.mf2ff.get_glyph_cache_key(self.segment, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
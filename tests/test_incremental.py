@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import unittest
+
+import fontforge
+
+from mf2ff import Mf2ff, hash_lines
+
+
+class TestChangedCharcodes(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.mf2ff = Mf2ff()
+        self.mf2ff.jobname = os.path.join(self.dir.name, 'font')
+        self.path = os.path.join(self.dir.name, 'font.mf')
+        self.lines = [
+            'mode_setup;',
+            'beginchar("A", 10, 10, 0);',
+            'fill unitsquare scaled 10;',
+            'endchar;',
+            'beginchar("B", 10, 10, 0);',
+            'fill unitsquare scaled 5;',
+            'endchar;',
+            'end',
+        ]
+        self.write(self.lines)
+        with open(self.mf2ff.jobname + '.sfd', 'w') as f:
+            f.write('')
+        with open(self.mf2ff.jobname + '.deps.json', 'w') as f:
+            json.dump({
+                'settings': 'settings',
+                'files': {self.path: hash_lines(self.path)},
+                'chars': [[65, self.path, 2, 4], [66, self.path, 5, 7]],
+            }, f)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, lines):
+        with open(self.path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def test_unchanged(self):
+        self.assertEqual(self.mf2ff.get_changed_charcodes('settings'), set())
+
+    def test_changed_character(self):
+        self.write(self.lines[:5] + ['fill unitsquare scaled 6;', 'fill unitsquare;'] + self.lines[6:])
+        self.assertEqual(self.mf2ff.get_changed_charcodes('settings'), {66})
+
+    def test_changed_outside_of_characters(self):
+        self.write(['mode_setup; u := 2;'] + self.lines[1:])
+        self.assertIsNone(self.mf2ff.get_changed_charcodes('settings'))
+
+    def test_inserted_between_characters(self):
+        self.write(self.lines[:4] + ['% the letter B'] + self.lines[4:])
+        self.assertIsNone(self.mf2ff.get_changed_charcodes('settings'))
+
+    def test_changed_settings(self):
+        self.assertIsNone(self.mf2ff.get_changed_charcodes('other settings'))
+
+
+
+class TestFontMetrics(unittest.TestCase):
+    def setUp(self):
+        self.mf2ff = Mf2ff()
+        self.mf2ff.font = fontforge.font()
+        self.mf2ff.font.ascent = 800
+        self.mf2ff.font.descent = 200
+
+    def test_metrics_survive_partial_rebuild(self):
+        # The font of the previous run is reopened and only B is generated.
+        self.mf2ff.rebuilt_charcodes = {66}
+        self.mf2ff.set_font_properties()
+        self.mf2ff.update_ascent_and_descent(500, 100)
+        self.assertEqual((self.mf2ff.font.ascent, self.mf2ff.font.descent), (800, 200))
+        self.mf2ff.update_ascent_and_descent(900, 100)
+        self.assertEqual((self.mf2ff.font.ascent, self.mf2ff.font.descent), (900, 200))
+
+    def test_given_metrics_in_partial_rebuild(self):
+        self.mf2ff.rebuilt_charcodes = {66}
+        self.mf2ff.ascent = 700
+        self.mf2ff.set_font_properties()
+        self.assertEqual((self.mf2ff.font.ascent, self.mf2ff.font.descent), (700, 200))
+
+    def test_full_build(self):
+        self.mf2ff.rebuilt_charcodes = None
+        self.mf2ff.set_font_properties()
+        self.mf2ff.update_ascent_and_descent(500, 100)
+        self.assertEqual((self.mf2ff.font.ascent, self.mf2ff.font.descent), (500, 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from array import array
+
+from mf2ff import Command, Mf2ff, Path
+
+
+class TestParseCommand(unittest.TestCase):
+    def setUp(self):
+        self.mf2ff = Mf2ff()
+
+    def test_names_and_numbers(self):
+        parse = self.mf2ff.parse_command
+        self.assertEqual(parse(('addto', '', '"currentpicture"')), Command('addto', None, '"currentpicture"', 'currentpicture'))
+        self.assertEqual(parse(('picture', '', '"a">> "b"')).value, ['a', 'b'])
+        self.assertEqual(parse(('withweight', '3', '-1')), Command('withweight', 3, '-1', -1.0))
+        self.assertEqual(parse(('dropping', '', '(1,4095.99998)')).value, (1.0, 4095.99998))
+        self.assertEqual(parse(('shipout', '', '65>> 0>> 1>> 2>> 3>> 4>> 5>> 6>> 7>> 8')).value, (65, 0, 1, 2, 3, 4, 5, 6, 7, 8))
+        self.assertIsNone(parse(('eq', '', 'eq')).value)
+
+    def test_paths(self):
+        path = self.mf2ff.parse_path('(0,0)..controls (1,0) and (2,1) ..(2,2)..controls (1,2) and (0,1) ..cycle')
+        self.assertTrue(path.cyclic)
+        self.assertEqual(len(path), 2)
+        self.assertEqual(path.knots(), [(0, 0), (2, 2), (0, 0)])
+        path = self.mf2ff.parse_path('(0,0)..controls (1,0) and (2,1) ..(2,2)')
+        self.assertFalse(path.cyclic)
+        self.assertEqual(path.coords, array('d', [0, 0, 1, 0, 2, 1, 2, 2]))
+
+    def test_reversed_path(self):
+        path = self.mf2ff.parse_path('(0,0)..controls (1,0) and (2,1) ..(2,2)..controls (1,2) and (0,1) ..cycle')
+        self.assertEqual(
+            path.reversed(),
+            Path(array('d', [0, 0, 0, 1, 1, 2, 2, 2, 2, 1, 1, 0, 0, 0]), True)
+        )
+        self.assertEqual(path.reversed().reversed(), path)
+
+    def test_transforms(self):
+        path = self.mf2ff.parse_path('(1,2)..controls (3,4) and (5,6) ..(7,8)')
+        self.assertEqual(path.shifted(-1, -2).coords, array('d', [0, 0, 2, 2, 4, 4, 6, 6]))
+        self.assertEqual(path.transformed(1, 2, 1, 0, 0, 1).coords, path.shifted(1, 2).coords)
+        self.assertEqual(path.transformed(0, 0, 0, -1, 1, 0).knots(), [(-2, 1), (-8, 7)])
+
+class TestPens(unittest.TestCase):
+    def setUp(self):
+        self.mf2ff = Mf2ff()
+        self.mf2ff.pens = {}
+
+    def test_pens_are_classified_once(self):
+        points = ['(5,0)', '(3.5,3.5)', '(0,5)', '(-3.5,3.5)', '(-5,0)', '(-3.5,-3.5)', '(0,-5)', '(3.5,-3.5)']
+        circle = ''.join(p + '..controls (0,0) and (0,0) ..' for p in points) + 'cycle'
+        pen = self.mf2ff.get_pen(circle)
+        self.assertEqual(pen.kind, 'elliptical')
+        self.assertEqual(pen.args, (10, 10, 3.141592653589793))
+        self.assertIs(self.mf2ff.get_pen(circle), pen)
+        self.assertEqual(self.mf2ff.get_pen('(0,0) .. cycle').kind, 'null')
+
+
+if __name__ == '__main__':
+    unittest.main()
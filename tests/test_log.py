@@ -0,0 +1,284 @@
+import gzip
+import io
+import os
+import tempfile
+import unittest
+
+from mf2ff import Mf2ff, SourceTracker, open_log
+
+
+class TestReadCommands(unittest.TestCase):
+    def setUp(self):
+        self.mf2ff = Mf2ff()
+        self.mf2ff.mf_first_line = '\\ message "@mf2vec@"; input test'
+        self.M = self.mf2ff.MARKER
+
+    def read(self, log):
+        return list(self.mf2ff.read_commands(io.StringIO(log)))
+
+    def test_commands_after_first_line(self):
+        M = self.M
+        log = (
+            'This is METAFONT\n'
+            '**' + self.mf2ff.mf_first_line + '\n'
+            '(test.mf\n'
+            + M + 'picture\n>> "a"\n' + M + '\n'
+            + M + 'end\n>> 10\n' + M + ')\n'
+        )
+        self.assertEqual(self.read(log), [('picture', '', '"a"'), ('end', '', '10')])
+
+    def test_wrapped_lines(self):
+        M = self.M
+        log = (
+            '**' + self.mf2ff.mf_first_line[:10] + '\n' + self.mf2ff.mf_first_line[10:] + '\n'
+            + M[:3] + '\n' + M[3:] + 'contour\n>> Path at line 12:\n(0,0)..controls (1,1) and (2,\n2) ..cycle\n' + M + '\n'
+        )
+        self.assertEqual(
+            self.read(log),
+            [('contour', '12', '(0,0)..controls (1,1) and (2,2) ..cycle')]
+        )
+
+    def test_errors_are_skipped(self):
+        M = self.M
+        log = (
+            '**' + self.mf2ff.mf_first_line + '\n'
+            + M + 'withweight\n'
+            '! Undefined coordinate.\n'
+            '<to be read again>\n'
+            'l.3 fill z1--z2\n'
+            '               ;\n'
+            'A help message.\n'
+            '\n'
+            '>> 1\n' + M + '\n'
+        )
+        self.assertEqual(self.read(log), [
+            ('error', '3', '! Undefined coordinate.\n<to be read again>\nl.3 fill z1--z2\n               ;\nA help message.\n'),
+            ('withweight', '', '1'),
+        ])
+
+
+class TestLogProtocol(unittest.TestCase):
+    def setUp(self):
+        self.mf2ff = Mf2ff()
+        self.mf2ff.mf_first_line = '\\ test'
+
+    def test_compact_protocol_is_negotiated(self):
+        M = Mf2ff.LOG_PROTOCOLS[2]
+        pen = '(0,0)..controls (0,0) and (0,0) ..cycle'
+        log = (
+            '**' + self.mf2ff.mf_first_line + '\n'
+            + M + 'addto>> "a"' + M + M + 'turningcheck>> 0' + M
+            + M + 'doublepath>> Path at line 3:\n(0,0)..controls (1,1) and (2,2) ..(3,3)' + M
+            + M + 'withpen>> ' + pen + M + '\n'
+            + M + 'addto>> "a"' + M + M + 'turningcheck>> 2' + M + M + 'turningnumber>> 1' + M
+            + M + 'contour>> Path at line 4:\n(0,0)..controls (1,1) and (2,2) ..cycle' + M
+            + M + 'withpen' + M + '\n'
+        )
+        cmds = list(self.mf2ff.read_commands(io.StringIO(log)))
+        self.assertEqual(self.mf2ff.log_protocol, 2)
+        self.assertEqual([cmd[0] for cmd in cmds], [
+            'addto', 'turningcheck', 'doublepath', 'withpen',
+            'addto', 'turningcheck', 'turningnumber', 'contour', 'withpen'
+        ])
+        self.assertEqual(cmds[-1], ('withpen', '', pen))
+
+
+class TestErrors(unittest.TestCase):
+    def setUp(self):
+        self.mf2ff = Mf2ff()
+
+    def parse(self, cmds):
+        return [cmd.name for cmd in self.mf2ff.parse_commands(cmds)]
+
+    def test_errors_belong_to_next_shipout(self):
+        cmds = [
+            ('error', '2', '! Outside.\nl.2 x\n'),
+            ('char', '3', '(0,0)..cycle>> 65>> true'),
+            ('error', '4', '! Undefined coordinate.\nl.4 fill z1--z2\n'),
+            ('shipout', '', '65>> 1>> 1>> 1>> 0>> 0>> 1>> 0>> 0>> 0'),
+            ('error', '', '! Without line.\nl.\n'),
+        ]
+        self.assertEqual(self.parse(cmds), ['char', 'shipout'])
+        self.assertEqual(
+            [(e['charcode'], e['line'], e['message']) for e in self.mf2ff.errors],
+            [(None, 2, 'Outside.'), (321, 4, 'Undefined coordinate.'), (None, None, 'Without line.')]
+        )
+
+    def test_errors_in_characters_not_generated(self):
+        cmds = [
+            ('char', '3', '(0,0)..cycle>> 66>> false'),
+            ('error', '4', '! Undefined coordinate.\nl.4 fill z1--z2\n'),
+            ('endchar', '5', '(0,0)..cycle'),
+            ('skip', '', ''),
+            ('char', '7', '(0,0)..cycle>> 67>> true'),
+            ('shipout', '', '67>> 0>> 1>> 1>> 0>> 0>> 1>> 0>> 0>> 0'),
+        ]
+        self.assertEqual(self.parse(cmds), ['char', 'endchar', 'skip', 'char', 'shipout'])
+        self.assertEqual([e['charcode'] for e in self.mf2ff.errors], [66])
+
+
+
+class TestCleanLog(unittest.TestCase):
+    def setUp(self):
+        self.mf2ff = Mf2ff()
+        self.mf2ff.mf_first_line = '\\ message "@mf2vec@"; input test'
+        self.M = self.mf2ff.MARKER
+
+    def clean(self, log):
+        return ''.join(self.mf2ff.clean_log(io.StringIO(log)))
+
+    def test_commands_are_removed(self):
+        M = self.M
+        log = (
+            'This is METAFONT\n'
+            '**' + self.mf2ff.mf_first_line + '\n'
+            '(test.mf\n'
+            + M + 'picture\n>> "a"\n' + M + '\n'
+            + M + 'end\n>> 10\n' + M + ')\n'
+        )
+        self.assertEqual(self.clean(log), 'This is METAFONT\n**(test.mf)\n')
+
+    def test_wrapped_lines(self):
+        M = self.M
+        log = (
+            '**' + self.mf2ff.mf_first_line[:10] + '\n' + self.mf2ff.mf_first_line[10:] + '\n'
+            '(test.mf\n'
+            + M[:3] + '\n' + M[3:] + 'contour\n>> Path at line 12:\n(0,0)..controls (1,1) and (2,\n2) ..cycle\n' + M + '\n'
+            'Output written\n'
+        )
+        self.assertEqual(self.clean(log), '**(test.mf\nOutput written\n')
+
+    def test_incomplete_command_is_kept(self):
+        M = self.M
+        log = '**' + self.mf2ff.mf_first_line + '\n(test.mf\n' + M + 'withweight\n>> 1\n'
+        self.assertEqual(self.clean(log), '**(test.mf\n' + M + 'withweight\n>> 1\n')
+
+    def test_write_clean_log(self):
+        M = self.M
+        with tempfile.TemporaryDirectory() as dir_name:
+            log_path = os.path.join(dir_name, 'test.log')
+            with open(log_path, 'w') as f:
+                f.write('**' + self.mf2ff.mf_first_line + '\n(test.mf\n' + M + 'end\n>> 10\n' + M + ')\n')
+            self.mf2ff.write_clean_log(log_path, log_path)
+            with open(log_path, 'r') as f:
+                self.assertEqual(f.read(), '**(test.mf)\n')
+            self.assertEqual(os.listdir(dir_name), ['test.log'])
+
+
+class TestOpenLog(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.mf2ff = Mf2ff()
+        self.mf2ff.mf_first_line = '\\ message "@mf2vec@"; input test'
+        M = self.mf2ff.MARKER
+        self.log = (
+            '**' + self.mf2ff.mf_first_line + '\n'
+            + M + 'picture\n>> "a"\n' + M + '\n'
+        )
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def replay(self, path):
+        log_file, size = open_log(path)
+        with log_file:
+            cmds = list(self.mf2ff.read_commands(log_file))
+        return cmds, size
+
+    def test_raw_log(self):
+        path = os.path.join(self.dir.name, 'test.log')
+        with open(path, 'w') as f:
+            f.write(self.log)
+        self.assertEqual(self.replay(path), ([('picture', '', '"a"')], len(self.log)))
+
+    def test_gzip_log(self):
+        path = os.path.join(self.dir.name, 'test.log.gz')
+        with gzip.open(path, 'wt') as f:
+            f.write(self.log)
+        self.assertEqual(self.replay(path), ([('picture', '', '"a"')], len(self.log)))
+
+
+class FakeProcess():
+    '''METAFONT process writing the next chunk to its log file at every
+    poll() until all chunks are written
+    '''
+    def __init__(self, path, chunks):
+        self.path = path
+        self.chunks = list(chunks)
+        self.returncode = None
+        self.killed = False
+
+    def poll(self):
+        if self.chunks:
+            with open(self.path, 'a') as f:
+                f.write(self.chunks.pop(0))
+            return None
+        if self.returncode is None:
+            self.returncode = 0
+        return self.returncode
+
+    def kill(self):
+        self.killed = True
+        self.returncode = -9
+
+    def wait(self):
+        return self.returncode
+
+
+class TestFollowLog(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'test.log')
+        self.mf2ff = Mf2ff()
+        self.mf2ff.params['pipeline']['poll-interval'] = 0
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_complete_lines(self):
+        process = FakeProcess(self.path, ['', 'This is', ' METAFONT\n**', 'input test\n(test.mf', '', ')'])
+        lines = list(self.mf2ff.follow_log(self.path, process))
+        # the last line is yielded when the process is finished
+        self.assertEqual(lines, ['This is METAFONT\n', '**input test\n', '(test.mf)'])
+        self.assertFalse(process.killed)
+
+    def test_close_kills_process(self):
+        process = FakeProcess(self.path, ['This is METAFONT\n', '**input test\n', '(test.mf)\n'])
+        lines = self.mf2ff.follow_log(self.path, process)
+        self.assertEqual(next(lines), 'This is METAFONT\n')
+        lines.close()
+        self.assertTrue(process.killed)
+
+
+class TestSourceTracker(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        for name in ('font.mf', 'base.mf'):
+            with open(os.path.join(self.dir.name, name), 'w') as f:
+                f.write('\n')
+        self.mf2ff = Mf2ff()
+        self.mf2ff.mf_first_line = '\\ message "@mf2vec@"; input font'
+        self.M = self.mf2ff.MARKER
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_char_lines(self):
+        M = self.M
+        log = (
+            '**' + self.mf2ff.mf_first_line + '\n'
+            '(./font.mf (./base.mf\n'
+            'a message (with parentheses))\n'
+            + M + 'char\n>> Path at line 3:\n(0,0)..cycle\n>> 65\n>> true\n' + M + '\n'
+            + M + 'endchar\n>> Path at line 7:\n(0,0)..cycle\n' + M + '\n'
+            + M + 'char\n>> Path at line 9:\n(0,0)..cycle\n>> 66\n>> true\n' + M + '\n'
+            + M + 'endchar\n>> Path at line 12:\n(0,0)..cycle\n' + M + ')\n'
+        )
+        sources = SourceTracker(self.dir.name)
+        cmds = list(self.mf2ff.read_commands(io.StringIO(log), sources=sources))
+        self.assertEqual([cmd[0] for cmd in cmds], ['char', 'endchar', 'char', 'endchar'])
+        path = os.path.normpath(os.path.join(self.dir.name, 'font.mf'))
+        self.assertEqual(sources.chars, [[65, path, 3, 7], [66, path, 9, 12]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import contextlib
+import io
+import unittest
+
+import fontforge
+
+from mf2ff import Mf2ff, Picture
+
+
+def square(x, y, size=10):
+    c = fontforge.contour()
+    c.moveTo(x, y)
+    c.lineTo(x+size, y)
+    c.lineTo(x+size, y+size)
+    c.lineTo(x, y+size)
+    c.closed = True
+    return c
+
+
+def points(c):
+    return [(p.x, p.y) for p in c]
+
+
+class TestPicture(unittest.TestCase):
+    def setUp(self):
+        self.a = square(0, 0)
+        self.b = square(20, 0)
+
+    def test_counts(self):
+        picture = Picture()
+        picture.add(self.a, 3)
+        picture.add(self.b)
+        self.assertEqual(len(picture), 4)
+        layer = picture.to_layer()
+        self.assertEqual(len(layer), 4)
+        self.assertEqual([points(c) for c in layer], [points(self.a)]*3 + [points(self.b)])
+
+    def test_counts_below_one_are_dropped(self):
+        picture = Picture()
+        picture.add(self.a, 0)
+        picture.add(self.b, -1)
+        self.assertEqual(picture.entries, [])
+        self.assertEqual(len(picture), 0)
+
+    def test_from_layer(self):
+        layer = fontforge.layer()
+        layer += self.a
+        layer += self.b
+        picture = Picture.from_layer(layer, 2)
+        self.assertEqual([count for _, count in picture.entries], [2, 2])
+        self.assertEqual(len(picture), 4)
+
+    def test_reversed_keeps_counts(self):
+        picture = Picture()
+        picture.add(self.a, 2)
+        reversed_picture = picture.reversed()
+        self.assertEqual([count for _, count in reversed_picture.entries], [2])
+        self.assertEqual(len(reversed_picture), 2)
+        self.assertNotEqual(reversed_picture.entries[0][0].isClockwise(), self.a.isClockwise())
+        # the contour of the original picture isn't changed
+        self.assertIs(picture.entries[0][0], self.a)
+        self.assertEqual(points(self.a), [(0, 0), (10, 0), (10, 10), (0, 10)])
+
+    def test_iadd_copies_entries(self):
+        picture = Picture()
+        picture.add(self.a, 2)
+        other = Picture()
+        other += picture
+        other.entries[0][1] = 5
+        other.add(self.b)
+        self.assertEqual(len(picture), 2)
+        self.assertEqual(len(other), 6)
+        # the contours are shared
+        self.assertIs(other.entries[0][0], self.a)
+
+
+class TestWeightedAddto(unittest.TestCase):
+    def setUp(self):
+        self.mf2ff = Mf2ff()
+        self.mf2ff.font = fontforge.font()
+        self.mf2ff.set_up_processing()
+
+    def tearDown(self):
+        self.mf2ff.font.close()
+
+    def test_weight_counts(self):
+        cmds = [
+            ('picture', '', '"currentpicture"'),
+            ('addto', '', '"currentpicture"'), ('turningcheck', '', '2'), ('turningnumber', '', '1'),
+            ('contour', '1', '(0,0)..controls (0,0) and (10,0) ..(10,0)..controls (10,0) and (10,10) ..(10,10)..controls (10,10) and (0,0) ..cycle'),
+            ('withweight', '', '3'),
+            ('addto', '', '"currentpicture"'), ('turningcheck', '', '2'), ('turningnumber', '', '1'),
+            ('contour', '2', '(20,0)..controls (20,0) and (30,0) ..(30,0)..controls (30,0) and (30,10) ..(30,10)..controls (30,10) and (20,0) ..cycle'),
+            ('withweight', '', '-2'),
+        ]
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.mf2ff.process_commands(None, self.mf2ff.parse_commands(cmds))
+        picture = self.mf2ff.pictures['currentpicture']
+        self.assertEqual(len(picture), 5)
+        self.assertEqual([count for _, count in picture.entries], [3, 2])
+        self.assertEqual(len(picture.to_layer()), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
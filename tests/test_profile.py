@@ -0,0 +1,47 @@
+import unittest
+
+from mf2ff import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def test_disabled(self):
+        profiler = Profiler()
+        self.assertIsNone(profiler.start())
+        profiler.add('stroke', profiler.start())
+        profiler.add_command('shipout', profiler.start(), 65)
+        self.assertEqual(profiler.phases, {})
+        self.assertEqual(profiler.glyphs, {})
+
+    def test_glyph_times(self):
+        profiler = Profiler(True)
+        for name, glyph_code in (('addto', None), ('addto', None), ('shipout', 65), ('shipout', 66)):
+            profiler.add_command(name, profiler.start(), glyph_code)
+        self.assertEqual(profiler.phases['command addto'][0], 2)
+        self.assertEqual(profiler.phases['command shipout'][0], 2)
+        self.assertEqual(sorted(profiler.glyphs), [65, 66])
+        self.assertGreaterEqual(profiler.glyphs[65][0], profiler.phases['command addto'][1])
+
+    def test_tokenize_is_excluded(self):
+        profiler = Profiler(True)
+        start = profiler.start()
+        self.assertEqual(list(profiler.tokenize(range(3))), [0, 1, 2])
+        wall, _ = profiler.add('command addto', start)
+        # getting the three items and the end
+        self.assertEqual(profiler.phases['tokenize'][0], 4)
+        self.assertEqual(profiler.tokenize_times[0], profiler.phases['tokenize'][1])
+        self.assertAlmostEqual(wall + profiler.tokenize_times[0], profiler.add('total', start)[0], places=2)
+
+    def test_merge_and_report(self):
+        profiler = Profiler(True)
+        profiler.add('stroke', profiler.start())
+        worker = Profiler(True)
+        worker.add('stroke', worker.start())
+        worker.add_command('shipout', worker.start(), 65)
+        profiler.merge(worker.to_data())
+        report = profiler.report()
+        self.assertEqual(report['phases']['stroke']['count'], 2)
+        self.assertEqual(list(report['glyphs']), ['65'])
+        self.assertIn('total', report)
+
+if __name__ == '__main__':
+    unittest.main()
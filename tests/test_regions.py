@@ -0,0 +1,106 @@
+import unittest
+
+from mf2ff import Regions, flatten_segment, overlapping_groups
+
+
+def square(x0, y0, x1, y1):
+    # clockwise square as lines, i.e. a square adding to the values
+    corners = [(x0, y0), (x0, y1), (x1, y1), (x1, y0)]
+    return [(corners[i], corners[(i+1) % 4]) for i in range(4)]
+
+
+class TestRegions(unittest.TestCase):
+    def boundary(self, curves, keep):
+        regions = Regions(curves, 1/4, 1/16)
+        return [[segment[0] for segment in contour] for contour in regions.boundary(keep)]
+
+    def test_values(self):
+        curves = [(1, square(100, 100, 300, 300)), (1, square(100, 100, 200, 200))]
+        self.assertEqual(
+            self.boundary(curves, lambda value: value == 1),
+            [[(100, 200), (100, 300), (300, 300), (300, 100), (200, 100), (200, 200)]]
+        )
+        self.assertEqual(
+            self.boundary(curves, lambda value: value == 2),
+            [[(100, 100), (100, 200), (200, 200), (200, 100)]]
+        )
+        self.assertEqual(
+            self.boundary(curves, lambda value: value >= 1),
+            [[(100, 100), (100, 300), (300, 300), (300, 100)]]
+        )
+
+    def test_counts_and_holes(self):
+        self.assertEqual(
+            self.boundary([(2, square(0, 0, 10, 10))], lambda value: value == 2),
+            [[(0, 0), (0, 10), (10, 10), (10, 0)]]
+        )
+        self.assertEqual(self.boundary([(2, square(0, 0, 10, 10))], lambda value: value == 1), [])
+        # The inner square is a separate set of edges inside the outer one.
+        curves = [(1, square(0, 0, 100, 100)), (1, square(40, 40, 60, 60))]
+        self.assertEqual(
+            self.boundary(curves, lambda value: value == 1),
+            [[(0, 0), (0, 100), (100, 100), (100, 0)], [(40, 40), (60, 40), (60, 60), (40, 60)]]
+        )
+
+    def test_curves_are_kept(self):
+        k = 55.23
+        circle = [
+            ((0, 0), (0, k), (100-k, 100), (100, 100)),
+            ((100, 100), (100+k, 100), (200, k), (200, 0)),
+            ((200, 0), (200, -k), (100+k, -100), (100, -100)),
+            ((100, -100), (100-k, -100), (0, -k), (0, 0)),
+        ]
+        regions = Regions([(1, circle), (1, square(150, -20, 300, 20))], 1/256, 1/16)
+        contours = regions.boundary(lambda value: value == 2)
+        self.assertEqual(len(contours), 1)
+        # three lines of the square and the parts of two curves of the circle
+        self.assertEqual(sorted(len(segment) for segment in contours[0]), [2, 2, 2, 4, 4])
+
+    def test_nearly_parallel_edges(self):
+        # The long edges of the triangles cross close together, the parts
+        # split at the rounded intersections cross each other again.
+        def triangle(a, b, c):
+            return [(a, b), (b, c), (c, a)]
+        curves = [
+            (1, triangle((0.75, 0), (0.75, 2), (5.25, 0.75))),
+            (1, triangle((0.75, 0.25), (0.75, 2.25), (5.5, 0.25))),
+            (1, triangle((0.25, 0.75), (0.25, 2.75), (5.5, 0))),
+        ]
+        regions = Regions(curves, 1/4, 1/16)
+        # The values of the regions on both sides of every edge differ by
+        # the edge's jump, which only holds if no edges cross.
+        for h in regions.index:
+            self.assertEqual(
+                regions.value_left_of((h[1], h[0])),
+                regions.value_left_of(h) - regions.jump(h)
+            )
+        # all three triangles overlap near their left sides
+        self.assertEqual(len(regions.boundary(lambda value: value == 3)), 1)
+
+
+class TestFlattenSegment(unittest.TestCase):
+    def test_flatness(self):
+        line = ((0, 0), (1, 0), (2, 0), (3, 0))
+        self.assertEqual(flatten_segment(line, 0.1), [(1.0, (3, 0))])
+        curve = ((0, 0), (0, 100), (100, 100), (100, 0))
+        coarse = flatten_segment(curve, 10)
+        fine = flatten_segment(curve, 0.1)
+        self.assertLess(len(coarse), len(fine))
+        self.assertEqual(fine[-1], (1.0, (100, 0)))
+        self.assertEqual([t for t, _ in fine], sorted(t for t, _ in fine))
+
+
+class TestOverlappingGroups(unittest.TestCase):
+    def test_groups(self):
+        boxes = [
+            (0, 0, 10, 10), # i's stem
+            (0, 20, 10, 30), # i's dot
+            (5, 5, 15, 15), # overlaps the stem
+            (14, 14, 20, 20), # overlaps the stem via the previous box
+        ]
+        self.assertEqual(overlapping_groups(boxes), [[0, 2, 3], [1]])
+        self.assertEqual(overlapping_groups([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+import fontforge
+
+import mf2ff
+from mf2ff import Mf2ff, layer_to_data
+
+SQUARE = '(-5,-5)..controls (-5,-5) and (5,-5) ..(5,-5)..controls (5,-5) and (5,5) ..(5,5)..controls (5,5) and (-5,5) ..(-5,5)..controls (-5,5) and (-5,-5) ..cycle'
+
+# A assigns the picture serif, B reads it, followed by the font's tables
+COMMANDS = (
+    ('picture', '', '"serif"'),
+    ('pic_eqn', '', '"serif"'), ('as', '', ''), ('pic', '', '"nullpicture"'),
+    ('addto', '', '"serif"'), ('turningcheck', '', '2'), ('turningnumber', '', '1'), ('contour', '3', SQUARE),
+    ('pic_eqn', '', '"currentpicture"'), ('as', '', ''), ('pic', '', '"nullpicture"'),
+    ('addto', '', '"currentpicture"'), ('also', '', '"serif"'),
+    ('shipout', '', '65>> 0>> 10>> 7>> 0>> 0>> 10>> 0>> 0>> 0'), ('pic', '', '"currentpicture"'),
+    ('pic_eqn', '', '"currentpicture"'), ('as', '', ''), ('pic', '', '"nullpicture"'),
+    ('addto', '', '"currentpicture"'), ('also', '', '"serif"'),
+    ('shipout', '', '66>> 0>> 10>> 7>> 0>> 0>> 10>> 0>> 0>> 0'), ('pic', '', '"currentpicture"'),
+    ('ligtable', '', '1>> "A"'), (':', '', '"B"'), ('kern', '', '1>> "C"'),
+    ('fontdimen', '', '1>> 1'), (':', '', '1>> 2'),
+    ('end', '', '10'),
+)
+
+
+class TestSegments(unittest.TestCase):
+    def setUp(self):
+        self.mf2ff = Mf2ff()
+        self.cmds = [self.mf2ff.parse_command(cmd) for cmd in COMMANDS]
+
+    def test_split_segments(self):
+        segments = [(is_glyph, [cmd.name for cmd in segment]) for is_glyph, segment in self.mf2ff.split_segments(self.cmds)]
+        self.assertEqual(segments, [
+            (True, ['picture', 'pic_eqn', 'as', 'pic', 'addto', 'turningcheck', 'turningnumber', 'contour',
+                'pic_eqn', 'as', 'pic', 'addto', 'also', 'shipout', 'pic']),
+            (True, ['pic_eqn', 'as', 'pic', 'addto', 'also', 'shipout', 'pic']),
+            (False, ['ligtable', ':', 'kern']),
+            (False, ['fontdimen', ':']),
+            (False, ['end']),
+        ])
+
+    def test_commands_without_shipout(self):
+        segments = list(self.mf2ff.split_segments(self.cmds[:8] + self.cmds[22:]))
+        self.assertEqual([(is_glyph, len(segment)) for is_glyph, segment in segments],
+            [(False, 8), (False, 3), (False, 2), (False, 1)])
+
+    def test_picture_accesses(self):
+        segments = [segment for _, segment in self.mf2ff.split_segments(self.cmds)]
+        self.assertEqual(self.mf2ff.picture_accesses(segments[0]), ({'nullpicture'}, {'serif', 'currentpicture'}))
+        self.assertEqual(self.mf2ff.picture_accesses(segments[1]), ({'nullpicture', 'serif'}, {'currentpicture'}))
+        self.assertEqual(self.mf2ff.picture_accesses(segments[2]), (set(), set()))
+
+    def test_complex_picture_expression(self):
+        segment = [self.mf2ff.parse_command(cmd) for cmd in (
+            ('pic_eqn', '', '"a"'), ('as', '', ''), ('pic', '', '"b"'), ('pl', '', ''), ('pic', '', '"c"'),
+        )]
+        reads, writes = self.mf2ff.picture_accesses(segment)
+        self.assertEqual(reads, {'a', 'b', 'c'})
+        self.assertEqual(writes, {'a', 'b', 'c'})
+
+    def test_waits_for_pending_picture(self):
+        calls = []
+        def process(options, params, segment, pictures):
+            calls.append(pictures)
+            if len(calls) == 1:
+                return [], {'serif': [], 'currentpicture': []}, None
+            return [], {'currentpicture': []}, None
+        self.mf2ff.pictures = {}
+        with mock.patch('mf2ff.process_glyph_segment', process), contextlib.redirect_stdout(io.StringIO()):
+            self.mf2ff.process_commands_in_segments(0, self.cmds[:22])
+        # B gets the picture serif assigned by the segment of A
+        self.assertEqual(calls, [{}, {'serif': []}])
+
+
+class TestJobs(unittest.TestCase):
+    def generate(self, jobs):
+        m = Mf2ff()
+        m.options['jobs'] = jobs
+        m.font = fontforge.font()
+        m.set_up_processing()
+        with contextlib.redirect_stdout(io.StringIO()):
+            m.process_commands_in_segments(0, m.parse_commands(COMMANDS))
+        glyphs = {
+            glyph_code: (layer_to_data(g.layers[1]), g.width, g.texheight, g.texdepth, g.italicCorrection)
+            for glyph_code, g in m.shipped_glyphs
+        }
+        m.font.close()
+        return glyphs
+
+    def test_same_glyphs(self):
+        glyphs = self.generate(1)
+        self.assertEqual(sorted(glyphs), [65, 66])
+        self.assertTrue(glyphs[66][0])
+        self.assertEqual(glyphs, self.generate(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+from mf2ff import Mf2ff
+
+CONTOUR = '(0,0)..controls (1,1) and (2,2) ..cycle'
+
+BEFORE = [
+    ('picture', '1', '"serif"'),
+    ('addto', '', '"serif"'), ('contour', '2', CONTOUR),
+]
+AFTER = [
+    ('ligtable', '', '1>> "A"'), (':', '', '"B"'), ('kern', '', '1>> "C"'),
+    ('end', '', '10'),
+]
+
+# the characters as written by the shard generating them and by the others
+A = [
+    ('char', '3', '(0,0)..cycle>> 65>> true'),
+    ('addto', '', '"currentpicture"'), ('contour', '4', CONTOUR),
+    ('shipout', '', '65>> 0>> 10>> 7>> 0>> 0>> 10>> 0>> 0>> 0'), ('pic', '', '"currentpicture"'),
+    ('endchar', '5', '(0,0)..cycle'),
+]
+A_QUIET = [
+    ('char', '3', '(0,0)..cycle>> 65>> false'),
+    ('skip', '', ''),
+    ('endchar', '5', '(0,0)..cycle'),
+]
+# B is never shipped out
+B = [
+    ('char', '6', '(0,0)..cycle>> 66>> true'),
+    ('error', '7', '! Isolated expression.\n<to be read again> \n;\nl.7 x;'),
+    ('addto', '', '"currentpicture"'), ('also', '', '"serif"'),
+    ('endchar', '8', '(0,0)..cycle'),
+]
+B_QUIET = [
+    ('char', '6', '(0,0)..cycle>> 66>> false'),
+    ('error', '7', '! Isolated expression.\n<to be read again> \n;\nl.7 x;'),
+    ('endchar', '8', '(0,0)..cycle'),
+]
+C = [
+    ('char', '9', '(0,0)..cycle>> 67>> true'),
+    ('addto', '', '"currentpicture"'), ('contour', '10', CONTOUR),
+    ('error', '11', '! Strange path (turning number is zero).\nl.11 fill z;'),
+    ('shipout', '', '67>> 0>> 10>> 7>> 0>> 0>> 10>> 0>> 0>> 0'), ('pic', '', '"currentpicture"'),
+    ('endchar', '12', '(0,0)..cycle'),
+]
+C_QUIET = [
+    ('char', '9', '(0,0)..cycle>> 67>> false'),
+    ('error', '11', '! Strange path (turning number is zero).\nl.11 fill z;'),
+    ('skip', '', ''),
+    ('endchar', '12', '(0,0)..cycle'),
+]
+
+
+class TestMergeShards(unittest.TestCase):
+    def setUp(self):
+        self.mf2ff = Mf2ff()
+
+    def merge(self, shards):
+        # the shards' commands are generators like the ones of read_commands()
+        return list(self.mf2ff.merge_shards([iter(cmds) for cmds in shards]))
+
+    def test_two_shards(self):
+        self.assertEqual(self.merge([
+            BEFORE + A_QUIET + B + C_QUIET + AFTER,
+            BEFORE + A + B_QUIET + C + AFTER,
+        ]), BEFORE + A + B + C + AFTER)
+
+    def test_three_shards(self):
+        self.assertEqual(self.merge([
+            BEFORE + A_QUIET + B + C_QUIET + AFTER,
+            BEFORE + A_QUIET + B_QUIET + C + AFTER,
+            BEFORE + A + B_QUIET + C_QUIET + AFTER,
+        ]), BEFORE + A + B + C + AFTER)
+
+    def test_character_not_selected(self):
+        # A run generating only the changed characters, C didn't change.
+        self.assertEqual(self.merge([
+            BEFORE + A_QUIET + B + C_QUIET + AFTER,
+            BEFORE + A + B_QUIET + C_QUIET + AFTER,
+        ]), BEFORE + A + B + C_QUIET + AFTER)
+
+    def test_errors_belong_to_characters(self):
+        cmds = self.mf2ff.parse_commands(self.merge([
+            BEFORE + A_QUIET + B + C_QUIET + AFTER,
+            BEFORE + A + B_QUIET + C + AFTER,
+        ]))
+        list(cmds)
+        self.assertEqual([(error['charcode'], error['line']) for error in self.mf2ff.errors], [(None, 7), (67, 11)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mf2ff import Mf2ff
+
+
+class TestStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.dir.name, 'font.mf')
+        self.write(self.input_path, 'beginchar("A", 10, 10, 0); endchar;')
+        self.mf2ff = Mf2ff()
+        self.mf2ff.jobname = os.path.join(self.dir.name, 'font')
+        self.mf2ff.options['store'] = os.path.join(self.dir.name, 'store')
+        self.write(self.mf2ff.jobname + '.sfd', 'SplineFontDB: 3.0')
+        self.write(self.mf2ff.jobname + '.log', 'This is METAFONT')
+        self.errors = [{'charcode': 65, 'line': 1, 'message': 'Undefined coordinate', 'text': ''}]
+        self.write(self.mf2ff.jobname + '.errors.json', json.dumps(self.errors))
+        self.write(self.mf2ff.jobname + '.fls', 'PWD ' + self.dir.name + '\nINPUT ./font.mf\n')
+        self.key = self.mf2ff.get_store_key('')
+        self.mf2ff.add_to_store(self.key, self.mf2ff.jobname + '.fls', self.mf2ff.jobname + '.log')
+        os.remove(self.mf2ff.jobname + '.sfd')
+        os.remove(self.mf2ff.jobname + '.log')
+        os.remove(self.mf2ff.jobname + '.errors.json')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def test_restore(self):
+        self.assertTrue(self.mf2ff.restore_from_store(self.key))
+        with open(self.mf2ff.jobname + '.sfd', 'r') as f:
+            self.assertEqual(f.read(), 'SplineFontDB: 3.0')
+        with open(self.mf2ff.jobname + '.log', 'r') as f:
+            self.assertEqual(f.read(), 'This is METAFONT')
+
+    def test_restored_errors(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertTrue(self.mf2ff.restore_from_store(self.key))
+        self.assertEqual(self.mf2ff.errors, self.errors)
+        self.assertIn('1 METAFONT errors, see ' + self.mf2ff.jobname + '.errors.json', output.getvalue())
+
+    def test_changed_input_file(self):
+        self.write(self.input_path, 'beginchar("B", 10, 10, 0); endchar;')
+        self.assertFalse(self.mf2ff.restore_from_store(self.key))
+        self.assertFalse(os.path.exists(self.mf2ff.jobname + '.sfd'))
+
+    def test_changed_options(self):
+        self.mf2ff.options['otf'] = True
+        self.assertNotEqual(self.key, self.mf2ff.get_store_key(''))
+        self.mf2ff.options['otf'] = False
+        self.mf2ff.options['jobs'] = 4
+        self.assertEqual(self.key, self.mf2ff.get_store_key(''))
+
+    def test_restore_in_other_directory(self):
+        # A copy of the sources in another directory shares the store.
+        other_dir = os.path.join(self.dir.name, 'other')
+        os.mkdir(other_dir)
+        shutil.copyfile(self.input_path, os.path.join(other_dir, 'font.mf'))
+        self.mf2ff.cwd = self.dir.name
+        self.mf2ff.mf_options = ['-interaction=batchmode', '-output-directory=' + self.dir.name]
+        self.mf2ff.input_file = self.input_path
+        self.write(self.mf2ff.jobname + '.sfd', 'SplineFontDB: 3.0')
+        self.write(self.mf2ff.jobname + '.log', 'This is METAFONT')
+        key = self.mf2ff.get_store_key('')
+        self.mf2ff.add_to_store(key, self.mf2ff.jobname + '.fls', self.mf2ff.jobname + '.log')
+        other = Mf2ff()
+        other.cwd = other_dir
+        other.mf_options = ['-interaction=batchmode', '-output-directory=' + other_dir]
+        other.input_file = os.path.join(other_dir, 'font.mf')
+        other.jobname = os.path.join(other_dir, 'font')
+        other.options['store'] = self.mf2ff.options['store']
+        self.assertEqual(other.get_store_key(''), key)
+        self.assertTrue(other.restore_from_store(key))
+        with open(other.jobname + '.sfd', 'r') as f:
+            self.assertEqual(f.read(), 'SplineFontDB: 3.0')
+
+
+if __name__ == '__main__':
+    unittest.main()
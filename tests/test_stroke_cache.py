@@ -0,0 +1,76 @@
+import unittest
+
+import fontforge
+
+from mf2ff import Mf2ff
+
+CIRCLE = ''.join(p + '..controls (0,0) and (0,0) ..' for p in (
+    '(5,0)', '(3.5,3.5)', '(0,5)', '(-3.5,3.5)', '(-5,0)', '(-3.5,-3.5)', '(0,-5)', '(3.5,-3.5)'
+)) + 'cycle'
+SQUARE = '(-5,-5)..controls (-5,-5) and (5,-5) ..(5,-5)..controls (5,-5) and (5,5) ..(5,5)..controls (5,5) and (-5,5) ..(-5,5)..controls (-5,5) and (-5,-5) ..cycle'
+
+
+def points(layer):
+    return [[(round(p.x, 3), round(p.y, 3), p.on_curve) for p in c] for c in layer]
+
+
+class TestStrokeCache(unittest.TestCase):
+    def setUp(self):
+        self.mf2ff = Mf2ff()
+        self.mf2ff.font = fontforge.font()
+        self.mf2ff.set_up_processing()
+        self.pen = self.mf2ff.get_pen(CIRCLE)
+        self.path = self.mf2ff.parse_path('(10,20)..controls (30,40) and (50,40) ..(70,20)')
+
+    def tearDown(self):
+        self.mf2ff.font.close()
+
+    def stroke(self, path, pen=None, stroke_kwargs=None):
+        return self.mf2ff.stroke_paths([path], pen or self.pen, stroke_kwargs or {})
+
+    def counts(self):
+        return self.mf2ff.stroke_cache_hits, self.mf2ff.stroke_cache_misses
+
+    def test_shifted_path(self):
+        layer = self.stroke(self.path)
+        shifted = self.stroke(self.path.shifted(100.5, -30))
+        self.assertEqual(self.counts(), (1, 1))
+        layer.transform((1, 0, 0, 1, 100.5, -30))
+        self.assertEqual(points(shifted), points(layer))
+        # the cached layer isn't changed by the caller
+        shifted.transform((1, 0, 0, 1, 1000, 1000))
+        self.assertEqual(points(self.stroke(self.path.shifted(100.5, -30))), points(layer))
+
+    def test_key(self):
+        self.stroke(self.path)
+        self.stroke(self.mf2ff.parse_path('(10,20)..controls (30,40) and (50,41) ..(70,20)'))
+        self.stroke(self.path, self.mf2ff.get_pen(SQUARE))
+        self.stroke(self.path, stroke_kwargs={'removeoverlap': 'contour'})
+        self.assertEqual(self.counts(), (0, 4))
+        self.stroke(self.path, self.mf2ff.get_pen(SQUARE))
+        self.assertEqual(self.counts(), (1, 4))
+
+    def test_least_recently_used_are_dropped(self):
+        self.mf2ff.params['stroke-cache']['size'] = 2
+        paths = [self.mf2ff.parse_path('(0,0)..controls (10,10) and (20,10) ..(30,' + str(k) + ')') for k in range(3)]
+        self.stroke(paths[0])
+        self.stroke(paths[1])
+        self.stroke(paths[0])
+        self.stroke(paths[2]) # drops paths[1]
+        self.assertEqual(len(self.mf2ff.stroke_cache), 2)
+        self.assertEqual(self.counts(), (1, 3))
+        self.stroke(paths[0])
+        self.assertEqual(self.counts(), (2, 3))
+        self.stroke(paths[1])
+        self.assertEqual(self.counts(), (2, 4))
+
+    def test_disabled(self):
+        self.mf2ff.params['stroke-cache']['size'] = 0
+        self.stroke(self.path)
+        self.stroke(self.path)
+        self.assertEqual(self.counts(), (0, 0))
+        self.assertEqual(len(self.mf2ff.stroke_cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()